@@ -12,6 +12,7 @@ from alembic import context
 from src.infrastructure.database.models import Base
 # Импортируем URL, который мы загрузили из .env файла
 from src.infrastructure.database.session import DATABASE_URL
+from src.infrastructure.database.portable import install_sqlite_pragmas
 
 # --- 2. КОНФИГУРАЦИЯ ---
 config = context.config
@@ -24,6 +25,11 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    # Служебная таблица migrations/online.py не описана в моделях: без фильтра autogenerate предложит ее удалить
+    return not (type_ == "table" and name == "migration_checkpoints")
+
+
 # --- 3. ЛОГИКА МИГРАЦИЙ ---
 
 def do_run_migrations(connection: Connection) -> None:
@@ -35,7 +41,10 @@ def do_run_migrations(connection: Connection) -> None:
         connection=connection,
         target_metadata=target_metadata,
         # compare_type=True заставляет Alembic замечать изменения типов колонок (String -> Integer)
-        compare_type=True
+        compare_type=True,
+        include_object=include_object,
+        # SQLite не умеет ALTER для ограничений и колонок: autogenerate пишет batch_alter_table (копия таблицы)
+        render_as_batch=connection.dialect.name == "sqlite"
     )
 
     with context.begin_transaction():
@@ -60,6 +69,8 @@ async def run_migrations_online() -> None:
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
+    # SQLite: те же PRAGMA и функции (casefold в индексах users), что у приложения
+    install_sqlite_pragmas(connectable)
 
     # 4. Подключаемся и запускаем миграции
     async with connectable.connect() as connection:
@@ -0,0 +1,250 @@
+"""
+Помощники для миграций без остановки записи в большие таблицы (tasks, comments).
+
+    from migrations.online import create_index_concurrently, backfill, set_not_null
+
+    def upgrade() -> None:
+        op.add_column('tasks', sa.Column('score', sa.Integer(), nullable=True))   # мгновенно: без DEFAULT
+        backfill('tasks_score', 'tasks', set_="score = 0", where="score IS NULL")
+        set_not_null('tasks', 'score')
+        create_index_concurrently('ix_tasks_score', 'tasks', ['score'])
+
+Каждая пачка backfill — отдельная короткая транзакция вне транзакции миграции: блокировки строк держатся
+миллисекунды, и TaskRepository.save не ждет до конца миграции. Прогресс пишется в migration_checkpoints,
+поэтому прерванная миграция при повторном `alembic upgrade` продолжает с последней пачки.
+Пачка может выполниться дважды (сбой между UPDATE и записью чекпоинта), поэтому set_/where должны быть
+идемпотентными. Колонки, которые пишет приложение, backfill трогать не должен: он не увеличивает version задачи.
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from src.core.config import getenv
+from src.infrastructure.database.portable import UtcDateTime, utc_now
+
+BACKFILL_BATCH_SIZE = int(getenv("BACKFILL_BATCH_SIZE", "5000"))
+BACKFILL_PAUSE = float(getenv("BACKFILL_PAUSE", "0.05"))
+# Пачка, которая ждет чужую блокировку дольше этого, отменяется и повторяется — а не копит очередь за собой
+BACKFILL_LOCK_TIMEOUT_MS = int(getenv("BACKFILL_LOCK_TIMEOUT_MS", "2000"))
+
+# Служебная таблица помощников: создается при первом backfill, autogenerate ее не трогает (env.py)
+checkpoints = sa.Table(
+    "migration_checkpoints", sa.MetaData(),
+    sa.Column("name", sa.String(200), primary_key=True),
+    sa.Column("table_name", sa.String(100), nullable=False),
+    sa.Column("last_key", sa.String(100), nullable=True),
+    sa.Column("rows_done", sa.BigInteger, server_default=sa.text("0"), nullable=False),
+    sa.Column("batches", sa.Integer, server_default=sa.text("0"), nullable=False),
+    sa.Column("started_at", UtcDateTime(), server_default=utc_now(), nullable=False),
+    sa.Column("updated_at", UtcDateTime(), server_default=utc_now(), nullable=False),
+    sa.Column("finished_at", UtcDateTime(), nullable=True),
+)
+
+
+# lock_not_available (lock_timeout), deadlock_detected; в SQLite — "database is locked" после busy_timeout
+LOCK_CONFLICT_SQLSTATES = ("55P03", "40P01")
+
+
+def _is_postgres() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def _lock_conflict(error: sa.exc.DBAPIError) -> bool:
+    return getattr(error.orig, "sqlstate", None) in LOCK_CONFLICT_SQLSTATES or "database is locked" in str(error.orig)
+
+
+# --- ИНДЕКСЫ ---
+def create_index_concurrently(
+        name: str,
+        table: str,
+        columns: List[Union[str, sa.TextClause]],
+        unique: bool = False,
+        where: Optional[str] = None,
+        **kw
+) -> None:
+    """
+    CREATE INDEX CONCURRENTLY: строится без блокировки записи, но не может идти внутри транзакции,
+    поэтому выполняется в autocommit-блоке. В SQLite — обычный CREATE INDEX.
+    kw уходят в op.create_index как есть (postgresql_using, postgresql_ops и т.д.).
+    """
+    predicate = sa.text(where) if where else None
+    if not _is_postgres():
+        op.create_index(name, table, columns, unique=unique, sqlite_where=predicate, **kw)
+        return
+    with op.get_context().autocommit_block():
+        if not op.get_context().as_sql:
+            # Прерванный CONCURRENTLY оставляет INVALID-индекс, который IF NOT EXISTS счел бы готовым
+            invalid = op.get_bind().execute(sa.text(
+                "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ), {"name": name}).scalar()
+            if invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            name, table, columns, unique=unique, if_not_exists=True,
+            postgresql_concurrently=True, postgresql_where=predicate, **kw
+        )
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    if not _is_postgres():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+# --- NOT NULL ---
+def set_not_null(table: str, column: str) -> None:
+    """
+    NOT NULL на заполненной колонке без долгой ACCESS EXCLUSIVE блокировки:
+    CHECK NOT VALID (мгновенно) -> VALIDATE (сканирует, но запись не блокирует) -> SET NOT NULL (берет проверку из CHECK).
+    """
+    if not _is_postgres():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, nullable=False)
+        return
+    check = f"{table}_{column}_not_null"
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID")
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+    op.alter_column(table, column, nullable=False)
+    op.drop_constraint(check, table, type_="check")
+
+
+# --- BACKFILL ---
+def backfill(
+        name: str,
+        table: str,
+        set_: str,
+        where: str = "TRUE",
+        key: str = "id",
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        pause: float = BACKFILL_PAUSE,
+        max_batch_seconds: float = 1.0,
+        max_retries: int = 5
+) -> int:
+    """
+    UPDATE {table} SET {set_} WHERE {where} пачками по первичному ключу (keyset, без OFFSET).
+    Между пачками пауза pause; пачка дольше max_batch_seconds уменьшает следующие вдвое.
+    Завершенный backfill с тем же name повторно не выполняется. Возвращает число измененных строк.
+    """
+    context = op.get_context()
+    if context.as_sql:
+        # Офлайн (--sql) пачки не посчитать: отдаем один UPDATE, пусть его выполнит DBA
+        op.execute(f"UPDATE {table} SET {set_} WHERE {where}")
+        return 0
+
+    with context.autocommit_block():
+        connection = op.get_bind()
+        checkpoints.create(connection, checkfirst=True)
+        state = connection.execute(sa.select(checkpoints).where(checkpoints.c.name == name)).mappings().first()
+        if state is None:
+            connection.execute(sa.insert(checkpoints).values(name=name, table_name=table))
+            last_key, rows_done, batches = None, 0, 0
+        elif state["finished_at"] is not None:
+            print(f"  backfill {name}: already finished ({state['rows_done']} rows)")
+            return state["rows_done"]
+        else:
+            last_key, rows_done, batches = state["last_key"], state["rows_done"], state["batches"]
+            print(f"  backfill {name}: resuming after {key}={last_key} ({rows_done} rows done)")
+
+        if _is_postgres():
+            connection.execute(sa.text(f"SET lock_timeout = {BACKFILL_LOCK_TIMEOUT_MS}"))
+            # Оценка из статистики: count(*) по большой таблице сам по себе долгий
+            total = connection.execute(sa.text(
+                "SELECT greatest(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+            ), {"table": table}).scalar()
+        else:
+            total = connection.execute(sa.text(f"SELECT count(*) FROM {table}")).scalar()
+
+        after = f"WHERE {key} > :last" if last_key is not None else ""
+        started = time.perf_counter()
+        scanned = 0
+        try:
+            while True:
+                # Верхняя граница пачки: batch_size следующих ключей по индексу PK
+                upper = connection.execute(sa.text(
+                    # max() через ORDER BY: у uuid в Postgres нет агрегата max
+                    f"SELECT {key} FROM (SELECT {key} FROM {table} {after} ORDER BY {key} LIMIT :n) batch "
+                    f"ORDER BY {key} DESC LIMIT 1"
+                ), {"last": last_key, "n": batch_size}).scalar()
+                if upper is None:
+                    break
+                bounds = f"{key} > :last AND {key} <= :upper" if last_key is not None else f"{key} <= :upper"
+
+                for attempt in range(max_retries + 1):
+                    batch_started = time.perf_counter()
+                    try:
+                        updated = connection.execute(
+                            sa.text(f"UPDATE {table} SET {set_} WHERE {bounds} AND ({where})"),
+                            {"last": last_key, "upper": upper}
+                        ).rowcount
+                        break
+                    except sa.exc.DBAPIError as e:
+                        # Блокировку держит живая транзакция приложения — уступаем и пробуем снова
+                        if attempt == max_retries or not _lock_conflict(e):
+                            raise
+                        print(f"  backfill {name}: batch retry {attempt + 1} ({e.orig})")
+                        time.sleep(pause + 0.1 * 2 ** attempt)
+                elapsed = time.perf_counter() - batch_started
+
+                last_key, rows_done, batches = str(upper), rows_done + updated, batches + 1
+                scanned += batch_size
+                connection.execute(
+                    sa.update(checkpoints).where(checkpoints.c.name == name)
+                    .values(last_key=last_key, rows_done=rows_done, batches=batches, updated_at=utc_now())
+                )
+                after = f"WHERE {key} > :last"
+
+                rate = scanned / max(time.perf_counter() - started, 1e-9)
+                print(
+                    f"  backfill {name}: batch {batches}, {rows_done} rows updated, "
+                    f"~{min(scanned, total) if total else scanned:,}/{total:,} scanned this run, {rate:,.0f} rows/s"
+                )
+
+                if elapsed > max_batch_seconds and batch_size > 100:
+                    batch_size //= 2
+                time.sleep(pause)
+
+            connection.execute(
+                sa.update(checkpoints).where(checkpoints.c.name == name)
+                .values(finished_at=utc_now(), updated_at=utc_now())
+            )
+        finally:
+            if _is_postgres():
+                connection.execute(sa.text("RESET lock_timeout"))
+    print(f"  backfill {name}: done, {rows_done} rows in {batches} batches")
+    return rows_done
+
+
+def reset_backfill(name: str) -> None:
+    """Для downgrade: следующий upgrade выполнит backfill заново."""
+    if op.get_context().as_sql or not sa.inspect(op.get_bind()).has_table(checkpoints.name):
+        return
+    op.execute(sa.delete(checkpoints).where(checkpoints.c.name == name))
+
+
+async def main() -> None:
+    """python -m migrations.online — состояние backfill-миграций (в том числе идущих прямо сейчас)."""
+    from src.infrastructure.database.session import AsyncSessionLocal, engine
+
+    argparse.ArgumentParser(description="Show progress of batched migration backfills").parse_args()
+    try:
+        async with AsyncSessionLocal() as session:
+            exists = await session.run_sync(lambda s: sa.inspect(s.connection()).has_table(checkpoints.name))
+            rows = (await session.execute(sa.select(checkpoints).order_by(checkpoints.c.started_at))).mappings().all() if exists else []
+        for row in rows:
+            state = f"finished {row['finished_at']:%Y-%m-%d %H:%M}" if row["finished_at"] else f"in progress, at {row['last_key']}"
+            print(f"{row['name']} ({row['table_name']}): {row['rows_done']} rows, {row['batches']} batches, {state}")
+        if not rows:
+            print("No backfills recorded.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""task_dependencies
+
+Revision ID: 0d6f2a8c4b15
+Revises: e5a8b3c1d920
+Create Date: 2026-10-18 15:20:44.281943
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.portable import utc_now
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d6f2a8c4b15'
+down_revision: Union[str, Sequence[str], None] = 'e5a8b3c1d920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # batch: SQLite добавляет внешний ключ только пересозданием таблицы, в Postgres это обычный ALTER
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Uuid(), nullable=True))
+        batch_op.create_foreign_key('fk_tasks_parent_id', 'tasks', ['parent_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index(batch_op.f('ix_tasks_parent_id'), ['parent_id'], unique=False)
+    op.add_column('tasks_archive', sa.Column('parent_id', sa.Uuid(), nullable=True))
+
+    op.create_table('task_dependencies',
+    sa.Column('task_id', sa.Uuid(), nullable=False),
+    sa.Column('depends_on_id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=utc_now(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['depends_on_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id', 'depends_on_id')
+    )
+    op.create_index(op.f('ix_task_dependencies_depends_on_id'), 'task_dependencies', ['depends_on_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_task_dependencies_depends_on_id'), table_name='task_dependencies')
+    op.drop_table('task_dependencies')
+    op.drop_column('tasks_archive', 'parent_id')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tasks_parent_id'))
+        batch_op.drop_constraint('fk_tasks_parent_id', type_='foreignkey')
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,36 @@
+"""department_shards
+
+Revision ID: 1c9e4b7a3d58
+Revises: f6a1c8d3e250
+Create Date: 2026-10-19 19:05:33.127640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.portable import utc_now
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c9e4b7a3d58'
+down_revision: Union[str, Sequence[str], None] = 'f6a1c8d3e250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('department_shards',
+    sa.Column('department_id', sa.Uuid(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=utc_now(), nullable=True),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('department_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('department_shards')
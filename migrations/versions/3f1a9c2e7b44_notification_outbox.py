@@ -0,0 +1,47 @@
+"""notification_outbox
+
+Revision ID: 3f1a9c2e7b44
+Revises: 759b4d5ca7a9
+Create Date: 2026-10-18 10:02:11.415208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.portable import utc_now
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2e7b44'
+down_revision: Union[str, Sequence[str], None] = '759b4d5ca7a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('recipient_email', sa.String(length=255), nullable=True),
+    sa.Column('recipient_id', sa.Uuid(), nullable=True),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.String(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=utc_now(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=utc_now(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_pending', 'notification_outbox', ['next_attempt_at'], unique=False, postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_pending', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
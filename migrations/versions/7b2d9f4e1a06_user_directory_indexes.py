@@ -0,0 +1,48 @@
+"""user_directory_indexes
+
+Revision ID: 7b2d9f4e1a06
+Revises: 1c9e4b7a3d58
+Create Date: 2026-10-19 21:40:12.518304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2d9f4e1a06'
+down_revision: Union[str, Sequence[str], None] = '1c9e4b7a3d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    postgres = op.get_context().dialect.name == "postgresql"
+    if postgres:
+        # Trusted-расширение (PG 13+): владельцу БД суперпользователь не нужен
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # users читают при каждом логине — индексы строим без блокировки записи
+    create_index_concurrently('ix_users_full_name_id', 'users', ['full_name', 'id'])
+    for column in ('full_name', 'email'):
+        if postgres:
+            create_index_concurrently(
+                f'ix_users_{column}_trgm', 'users', [sa.text(f'lower({column}) gin_trgm_ops')], postgresql_using='gin'
+            )
+        else:
+            # Встроенный lower() в SQLite не знает кириллицы. casefold() регистрирует на соединении
+            # portable.install_sqlite_pragmas (и migrations/env.py)
+            create_index_concurrently(f'ix_users_{column}_casefold', 'users', [sa.text(f'casefold({column})')])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # pg_trgm не удаляем: расширением могут пользоваться и другие объекты БД
+    for column in ('email', 'full_name'):
+        drop_index_concurrently(f'ix_users_{column}_trgm', 'users')
+        drop_index_concurrently(f'ix_users_{column}_casefold', 'users')
+    drop_index_concurrently('ix_users_full_name_id', 'users')
@@ -0,0 +1,55 @@
+"""user_workload
+
+Revision ID: 7e3c9b1d5a62
+Revises: 0d6f2a8c4b15
+Create Date: 2026-10-19 09:12:37.514208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3c9b1d5a62'
+down_revision: Union[str, Sequence[str], None] = '0d6f2a8c4b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_workload',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('open_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('weighted_load', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('deadline_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('deadline_sum', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_users_department_id'), 'users', ['department_id'], unique=False)
+
+    # Начальное заполнение — единственный раз, когда счетчики считаются агрегатом
+    if op.get_context().dialect.name == 'postgresql':
+        deadline_epoch = "extract(epoch FROM deadline)::bigint"
+    else:
+        deadline_epoch = "CAST((julianday(deadline) - 2440587.5) * 86400 AS INTEGER)"
+    op.execute(f"""
+        INSERT INTO user_workload (user_id, open_count, weighted_load, deadline_count, deadline_sum)
+        SELECT executor_id,
+               count(*),
+               sum(CASE priority WHEN 'low' THEN 1 WHEN 'medium' THEN 2 WHEN 'high' THEN 4 WHEN 'critical' THEN 8 ELSE 2 END),
+               count(deadline),
+               coalesce(sum({deadline_epoch}), 0)
+        FROM tasks
+        WHERE executor_id IS NOT NULL AND status NOT IN ('done', 'cancelled')
+        GROUP BY executor_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_department_id'), table_name='users')
+    op.drop_table('user_workload')
@@ -0,0 +1,46 @@
+"""activity_log
+
+Revision ID: 8b2d4e6f1a37
+Revises: 3f1a9c2e7b44
+Create Date: 2026-10-18 11:24:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.portable import utc_now
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a37'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2e7b44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('activity_log',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=utc_now(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Uuid(), nullable=False),
+    sa.Column('actor_id', sa.Uuid(), nullable=True),
+    sa.Column('action', sa.String(length=50), nullable=False),
+    sa.Column('old_value', sa.String(), nullable=True),
+    sa.Column('new_value', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_activity_entity', 'activity_log', ['entity_id', 'created_at'], unique=False)
+    # Страховочная секция: сюда попадут строки, если месячная секция еще не создана (в SQLite секций нет)
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute("CREATE TABLE activity_log_default PARTITION OF activity_log DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_activity_entity', table_name='activity_log')
+    op.drop_table('activity_log')
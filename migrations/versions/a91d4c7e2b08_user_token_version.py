@@ -0,0 +1,28 @@
+"""user_token_version
+
+Revision ID: a91d4c7e2b08
+Revises: 7e3c9b1d5a62
+Create Date: 2026-10-19 10:41:05.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91d4c7e2b08'
+down_revision: Union[str, Sequence[str], None] = '7e3c9b1d5a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,30 @@
+"""task_version
+
+Revision ID: b3f8e2a6d417
+Revises: a91d4c7e2b08
+Create Date: 2026-10-19 12:03:26.740195
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8e2a6d417'
+down_revision: Union[str, Sequence[str], None] = 'a91d4c7e2b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('tasks_archive', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tasks_archive', 'version')
+    op.drop_column('tasks', 'version')
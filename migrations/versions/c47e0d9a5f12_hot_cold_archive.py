@@ -0,0 +1,73 @@
+"""hot_cold_archive
+
+Revision ID: c47e0d9a5f12
+Revises: 8b2d4e6f1a37
+Create Date: 2026-10-18 12:41:37.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.portable import utc_now
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47e0d9a5f12'
+down_revision: Union[str, Sequence[str], None] = '8b2d4e6f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индексы горячих таблиц под сортировку списков
+    op.create_index('ix_tasks_created_at', 'tasks', ['created_at'], unique=False)
+    op.create_index('ix_comments_task_created', 'comments', ['task_id', 'created_at'], unique=False)
+
+    # Холодное хранилище: секционировано по годам created_at, секции создает архиватор
+    op.create_table('tasks_archive',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('owner_id', sa.Uuid(), nullable=False),
+    sa.Column('executor_id', sa.Uuid(), nullable=True),
+    sa.Column('target_dept_id', sa.Uuid(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('priority', sa.String(length=20), nullable=False),
+    sa.Column('deadline', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=utc_now(), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_tasks_archive_owner', 'tasks_archive', ['owner_id'], unique=False)
+    op.create_index('ix_tasks_archive_dept', 'tasks_archive', ['target_dept_id'], unique=False)
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute("CREATE TABLE tasks_archive_default PARTITION OF tasks_archive DEFAULT")
+
+    op.create_table('comments_archive',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.Column('task_id', sa.Uuid(), nullable=False),
+    sa.Column('author_id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_comments_archive_task', 'comments_archive', ['task_id', 'created_at'], unique=False)
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute("CREATE TABLE comments_archive_default PARTITION OF comments_archive DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_archive_task', table_name='comments_archive')
+    op.drop_table('comments_archive')
+    op.drop_index('ix_tasks_archive_dept', table_name='tasks_archive')
+    op.drop_index('ix_tasks_archive_owner', table_name='tasks_archive')
+    op.drop_table('tasks_archive')
+    op.drop_index('ix_comments_task_created', table_name='comments')
+    op.drop_index('ix_tasks_created_at', table_name='tasks')
@@ -0,0 +1,56 @@
+"""task_comment_activity
+
+Revision ID: d28e7f4a9c61
+Revises: b3f8e2a6d417
+Create Date: 2026-10-19 14:21:08.315482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.database.portable import utc_now
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd28e7f4a9c61'
+down_revision: Union[str, Sequence[str], None] = 'b3f8e2a6d417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOW = utc_now()
+
+
+def _backfill(tasks: str, comments: str) -> None:
+    greatest = 'GREATEST' if op.get_context().dialect.name == 'postgresql' else 'max'
+    # Без комментариев последняя активность — последняя правка задачи
+    op.execute(f"UPDATE {tasks} SET last_activity_at = updated_at")
+    op.execute(f"""
+        UPDATE {tasks} AS t
+        SET comment_count = c.n, last_activity_at = {greatest}(t.updated_at, c.last_at)
+        FROM (SELECT task_id, count(*) AS n, max(created_at) AS last_at FROM {comments} GROUP BY task_id) c
+        WHERE c.task_id = t.id
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite не добавляет через ALTER колонку с неконстантным DEFAULT — там таблица пересоздается
+    recreate = 'always' if op.get_context().dialect.name == 'sqlite' else 'auto'
+    for table in ('tasks', 'tasks_archive'):
+        with op.batch_alter_table(table, recreate=recreate) as batch_op:
+            batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+            batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(timezone=True), server_default=NOW, nullable=False))
+    _backfill('tasks', 'comments')
+    _backfill('tasks_archive', 'comments_archive')
+    op.create_index(op.f('ix_tasks_last_activity_at'), 'tasks', ['last_activity_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tasks_last_activity_at'), table_name='tasks')
+    for table in ('tasks_archive', 'tasks'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('last_activity_at')
+            batch_op.drop_column('comment_count')
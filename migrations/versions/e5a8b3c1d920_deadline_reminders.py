@@ -0,0 +1,46 @@
+"""deadline_reminders
+
+Revision ID: e5a8b3c1d920
+Revises: c47e0d9a5f12
+Create Date: 2026-10-18 13:55:49.630271
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.core.config import getenv
+from src.infrastructure.database.portable import UtcDateTime
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8b3c1d920'
+down_revision: Union[str, Sequence[str], None] = 'c47e0d9a5f12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('reminder_stage', sa.SmallInteger(), server_default=sa.text('0'), nullable=False))
+    # Уже наступившие стадии у существующих задач считаем отработанными: иначе первый старт планировщика
+    # разослал бы OVERDUE по всем историческим открытым задачам с прошедшим дедлайном
+    tasks = sa.table('tasks', sa.column('deadline', UtcDateTime()), sa.column('status', sa.String), sa.column('reminder_stage', sa.SmallInteger))
+    open_deadline = sa.and_(tasks.c.deadline.isnot(None), tasks.c.status.notin_(['done', 'cancelled']))
+    now = datetime.now(timezone.utc)
+    lead = timedelta(minutes=float(getenv("DEADLINE_REMINDER_LEAD_MINUTES", "60")))
+    op.execute(tasks.update().where(open_deadline, tasks.c.deadline <= now).values(reminder_stage=2))
+    op.execute(
+        tasks.update()
+        .where(open_deadline, tasks.c.deadline > now, tasks.c.deadline <= now + lead)
+        .values(reminder_stage=1)
+    )
+    op.create_index('ix_tasks_open_deadline', 'tasks', ['deadline'], unique=False, postgresql_where=sa.text("deadline IS NOT NULL AND status NOT IN ('done', 'cancelled')"), sqlite_where=sa.text("deadline IS NOT NULL AND status NOT IN ('done', 'cancelled')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_open_deadline', table_name='tasks')
+    op.drop_column('tasks', 'reminder_stage')
@@ -0,0 +1,64 @@
+from typing import Annotated, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.api.dependencies import get_current_user, get_analytics
+from src.api.schemas import CycleTimeReport, ThroughputReport, WorkloadReport
+from src.domain.entities import User, UserRole
+from src.infrastructure.services.analytics import AnalyticsCache
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def _scope(user: User, department_id: Optional[UUID]) -> Optional[UUID]:
+    """
+    Какой отдел считать. Админ — любой или всю компанию (None), менеджер — только свой.
+    """
+    if user.role == UserRole.ADMIN:
+        return department_id
+    if user.role == UserRole.MANAGER and user.department_id:
+        if department_id and department_id != user.department_id:
+            raise HTTPException(status_code=403, detail="Managers can only see analytics of their own department")
+        return user.department_id
+    raise HTTPException(status_code=403, detail="Analytics is available to Admins and Managers only")
+
+
+def _weeks(analytics: AnalyticsCache, weeks: int) -> int:
+    if weeks > analytics.max_weeks:
+        raise HTTPException(status_code=400, detail=f"weeks must be <= {analytics.max_weeks}")
+    return weeks
+
+
+@router.get("/cycle-time", response_model=CycleTimeReport)
+async def cycle_time(
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        department_id: Optional[UUID] = None,
+        weeks: int = Query(12, ge=1)
+):
+    """Время от создания задачи до DONE: среднее, перцентили и медиана по неделям."""
+    scope = _scope(current_user, department_id)
+    return await analytics.report(scope, "cycle_time", _weeks(analytics, weeks))
+
+
+@router.get("/throughput", response_model=ThroughputReport)
+async def throughput(
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        department_id: Optional[UUID] = None,
+        weeks: int = Query(12, ge=1)
+):
+    """Число закрытых (DONE) задач по неделям."""
+    scope = _scope(current_user, department_id)
+    return await analytics.report(scope, "throughput", _weeks(analytics, weeks))
+
+
+@router.get("/workload", response_model=WorkloadReport)
+async def workload(
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        department_id: Optional[UUID] = None
+):
+    """Открытые и просроченные задачи по исполнителям и отделам."""
+    scope = _scope(current_user, department_id)
+    return await analytics.report(scope, "workload")
@@ -1,25 +1,49 @@
-from typing import Annotated, List
+import base64
+import json
+from typing import Annotated, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_db_session, get_current_user
-from src.api.schemas import UserRegister, UserRead, Token, UserAdminUpdate
+from src.api.dependencies import (
+    get_db_session, get_current_user, get_outbox, get_activity_log, get_token_versions
+)
+from src.api.schemas import UserRegister, UserRead, Token, UserAdminUpdate, UserPage
 from src.core.security import get_password_hash, verify_password, create_access_token, create_password_reset_token
-from src.domain.entities import User, UserRole
+from src.domain.entities import User, UserRole, Notification, NotificationKind, ActivityEvent, ActivityAction
 from src.infrastructure.database.models import UserModel, DepartmentModel
-from src.infrastructure.repositories.user_repository import UserRepository
+from src.infrastructure.repositories.user_repository import UserRepository, UserCursor
+from src.infrastructure.repositories.outbox_repository import OutboxRepository
+from src.infrastructure.services.activity_log import ActivityLogWriter
+from src.infrastructure.services.token_versions import TokenVersionCache
 from pydantic import BaseModel, EmailStr
+from src.core.config import getenv
 
 router = APIRouter(prefix="/auth", tags=["Authentication & Roles"])
 
+PUBLIC_BASE_URL = getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+
 
 class PasswordResetRequest(BaseModel):
     email: EmailStr
 
 
+def _encode_cursor(cursor: Optional[UserCursor]) -> Optional[str]:
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps([cursor[0], str(cursor[1])]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> UserCursor:
+    try:
+        name, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(name), UUID(user_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register_user(
         user_data: UserRegister,
@@ -65,52 +89,81 @@ async def login_for_access_token(
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
-    access_token = create_access_token(data={"sub": user.email})
+    # Всё, что нужно для авторизации запроса, едет в токене: get_current_user не ходит в БД
+    access_token = create_access_token(data={
+        "sub": user.email,
+        "uid": str(user.id),
+        "role": user.role.value,
+        "dept": str(user.department_id) if user.department_id else None,
+        "name": user.full_name,
+        "ver": user.token_version
+    })
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/forgot-password")
 async def forgot_password(
         request: PasswordResetRequest,
-        session: Annotated[AsyncSession, Depends(get_db_session)]
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        outbox: Annotated[OutboxRepository, Depends(get_outbox)]
 ):
     user_repo = UserRepository(session)
     user = await user_repo.get_by_email(request.email)
 
     if user:
         token = create_password_reset_token(user.email)
-        print(f"\n[EMAIL MOCK] Password Reset Link: http://localhost:8000/reset-password?token={token}\n")
+        # Письмо отправит фоновый диспетчер outbox, запрос доставку не ждет
+        outbox.enqueue(Notification(
+            kind=NotificationKind.PASSWORD_RESET,
+            recipient_email=user.email,
+            subject="Password reset",
+            body=f"Password Reset Link: {PUBLIC_BASE_URL}/reset-password?token={token}"
+        ))
+        await session.commit()
 
     return {"message": "If the email exists, a reset link has been sent."}
 
 
 @router.get("/me", response_model=UserRead)
 async def read_users_me(
+        session: Annotated[AsyncSession, Depends(get_db_session)],
         current_user: Annotated[User, Depends(get_current_user)]
 ):
-    return current_user
+    # Профиль — из БД: в токене только то, что нужно для авторизации
+    user = await UserRepository(session).get_by_id(current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 
-@router.get("/users", response_model=List[UserRead])
-async def list_all_users(
+@router.get("/users", response_model=UserPage)
+async def list_users(
         session: Annotated[AsyncSession, Depends(get_db_session)],
-        current_user: Annotated[User, Depends(get_current_user)]
+        current_user: Annotated[User, Depends(get_current_user)],
+        q: Annotated[Optional[str], Query(max_length=100)] = None,
+        role: Optional[UserRole] = None,
+        department_id: Optional[UUID] = None,
+        is_active: Optional[bool] = None,
+        fuzzy: bool = False,
+        cursor: Optional[str] = None,
+        limit: Annotated[int, Query(ge=1, le=200)] = 50
 ):
-    """Список всех пользователей (для Админа)."""
-    if current_user.role != UserRole.ADMIN:
+    """
+    Справочник пользователей постранично (по алфавиту, курсор вместо offset) с фильтрами и поиском
+    по имени/email. Админ видит всех; менеджер — только свой отдел (например, выбрать исполнителя).
+    """
+    if current_user.role == UserRole.MANAGER:
+        if current_user.department_id is None or department_id not in (None, current_user.department_id):
+            raise HTTPException(status_code=403, detail="Managers can only browse their own department")
+        department_id = current_user.department_id
+    elif current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await session.execute(select(UserModel))
-    models = result.scalars().all()
-
-    # Ручной маппинг для надежности
-    return [
-        UserRead(
-            id=m.id, email=m.email, full_name=m.full_name,
-            role=UserRole(m.role), department_id=m.department_id,
-            is_active=m.is_active, created_at=m.created_at
-        ) for m in models
-    ]
+    users, next_cursor = await UserRepository(session).search(
+        limit=limit, after=_decode_cursor(cursor) if cursor else None, query=q,
+        role=role, department_id=department_id, is_active=is_active, fuzzy=fuzzy
+    )
+    return {"items": users, "next_cursor": _encode_cursor(next_cursor)}
 
 
 @router.patch("/users/{user_id}", response_model=UserRead)
@@ -118,6 +171,8 @@ async def update_user_admin(
         user_id: UUID,
         update_data: UserAdminUpdate,
         session: Annotated[AsyncSession, Depends(get_db_session)],
+        activity_log: Annotated[ActivityLogWriter, Depends(get_activity_log)],
+        token_versions: Annotated[TokenVersionCache, Depends(get_token_versions)],
         current_user: Annotated[User, Depends(get_current_user)]
 ):
     """
@@ -153,6 +208,8 @@ async def update_user_admin(
             raise HTTPException(status_code=400, detail="Founder cannot change their own role.")
 
     # 4. Применение обновлений
+    previous_role = target_user.role
+    previous_department = target_user.department_id
 
     # Роль
     if update_data.role:
@@ -171,7 +228,27 @@ async def update_user_admin(
             raise HTTPException(status_code=400, detail=f"Department {update_data.department_id} does not exist")
         target_user.department_id = update_data.department_id
 
+    # Роль и отдел зашиты в токен: старые токены отзываем, пользователь перелогинится с новыми правами
+    if target_user.role != previous_role or target_user.department_id != previous_department:
+        target_user.token_version += 1
+
     await session.commit()
     await session.refresh(target_user)
+    token_versions.bump(target_user.id, target_user.token_version)
+
+    # 5. Журнал действий (буферизованная запись, запрос не ждет)
+    if target_user.role != previous_role:
+        activity_log.record(ActivityEvent(
+            entity_type="user", entity_id=target_user.id, actor_id=current_user.id,
+            action=ActivityAction.USER_ROLE_CHANGED,
+            old_value=previous_role, new_value=target_user.role
+        ))
+    if target_user.department_id != previous_department:
+        activity_log.record(ActivityEvent(
+            entity_type="user", entity_id=target_user.id, actor_id=current_user.id,
+            action=ActivityAction.USER_DEPARTMENT_CHANGED,
+            old_value=str(previous_department) if previous_department else None,
+            new_value=str(target_user.department_id)
+        ))
 
     return UserRead.model_validate(target_user)
\ No newline at end of file
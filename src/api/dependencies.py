@@ -1,49 +1,165 @@
-from typing import Annotated, AsyncGenerator
-from fastapi import Depends, HTTPException, status
+import time
+from typing import Annotated, AsyncGenerator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from uuid import UUID
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.database.session import AsyncSessionLocal
-from src.core.security import SECRET_KEY, ALGORITHM
+from src.infrastructure.database.sharding import ShardSet
+from src.core.security import decode_access_token
+from src.core.concurrency import concurrency_limiter
+from src.core.config import getenv
 from src.infrastructure.repositories.user_repository import UserRepository
 from src.infrastructure.repositories.task_repository import TaskRepository
-from src.domain.entities import User
-from src.domain.interfaces import ITaskRepository  # ИСПРАВЛЕНО
+from src.infrastructure.repositories.cached_task_repository import CachedTaskRepository, TaskCache
+from src.infrastructure.repositories.sharded_task_repository import ShardedTaskRepository
+from src.infrastructure.repositories.outbox_repository import OutboxRepository
+from src.infrastructure.services.activity_log import ActivityLogWriter
+from src.infrastructure.services.deadline_scheduler import DeadlineScheduler
+from src.infrastructure.services.dependency_graph import DependencyGraphCache
+from src.infrastructure.services.analytics import AnalyticsCache
+from src.infrastructure.services.similarity import SimilarityIndex
+from src.infrastructure.services.token_versions import TokenVersionCache
+from src.infrastructure.services.idempotency import IdempotencyStore
+from src.infrastructure.services.ai_service import AIService
+from src.infrastructure.services.loaders import RequestLoaders
+from src.domain.entities import User, UserRole
+from src.domain.interfaces import ITaskRepository
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
+        # Берем соединение из пула сразу и замеряем ожидание — это сигнал для лимитера нагрузки
+        started = time.perf_counter()
+        await session.connection()
+        concurrency_limiter.record_checkout(time.perf_counter() - started)
         yield session
 
 
+TASK_CACHE_ENABLED = getenv("TASK_CACHE_ENABLED", "true").lower() == "true"
+
+
+def get_task_cache(request: Request) -> TaskCache:
+    return request.app.state.task_cache
+
+
+def get_shards(request: Request) -> Optional[ShardSet]:
+    # None — шардирование выключено (TASK_SHARD_URLS пуст), все задачи в основной БД
+    return getattr(request.app.state, "shards", None)
+
+
 async def get_task_repo(
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        cache: Annotated[TaskCache, Depends(get_task_cache)],
+        shards: Annotated[Optional[ShardSet], Depends(get_shards)]
+) -> AsyncGenerator[ITaskRepository, None]:
+    repository = ShardedTaskRepository(shards, session) if shards else TaskRepository(session)
+    try:
+        # Кэширующий декоратор включается конфигом; роуты работают с ITaskRepository и разницы не видят
+        yield CachedTaskRepository(repository, cache) if TASK_CACHE_ENABLED else repository
+    finally:
+        if shards:
+            await repository.close()
+
+
+async def get_outbox(
         session: Annotated[AsyncSession, Depends(get_db_session)]
-) -> TaskRepository:
-    return TaskRepository(session)
+) -> OutboxRepository:
+    # Та же сессия, что и у репозиториев запроса: уведомление коммитится вместе с изменением
+    return OutboxRepository(session)
+
+
+def get_activity_log(request: Request) -> ActivityLogWriter:
+    # Писатель журнала один на процесс, создается в lifespan
+    return request.app.state.activity_log
+
+
+def get_deadline_scheduler(request: Request) -> DeadlineScheduler:
+    return request.app.state.deadline_scheduler
+
+
+def get_dependency_graph(request: Request) -> DependencyGraphCache:
+    return request.app.state.dependency_graph
+
+
+def get_analytics(request: Request) -> AnalyticsCache:
+    return request.app.state.analytics
+
+
+def get_similarity_index(request: Request) -> SimilarityIndex:
+    return request.app.state.similarity_index
+
+
+def get_token_versions(request: Request) -> TokenVersionCache:
+    return request.app.state.token_versions
+
+
+def get_idempotency(request: Request) -> IdempotencyStore:
+    return request.app.state.idempotency
+
+
+def get_ai_service(request: Request) -> AIService:
+    # Один сервис на процесс: статистика задержек провайдеров копится между запросами
+    return request.app.state.ai_service
+
+
+def _user_from_claims(payload: dict) -> User:
+    # Подпись проверена, claims выпустили мы сами — валидация pydantic здесь лишняя
+    return User.model_construct(
+        id=UUID(payload["uid"]),
+        email=payload["sub"],
+        hashed_password="",
+        full_name=payload.get("name", ""),
+        role=UserRole(payload["role"]),
+        is_active=True,
+        department_id=UUID(payload["dept"]) if payload.get("dept") else None,
+        token_version=payload["ver"]
+    )
 
 
 async def get_current_user(
         token: Annotated[str, Depends(oauth2_scheme)],
-        session: Annotated[AsyncSession, Depends(get_db_session)]
+        token_versions: Annotated[TokenVersionCache, Depends(get_token_versions)]
 ) -> User:
+    """
+    Пользователь из claims токена — без запроса в БД (сессия здесь даже не открывается).
+    Отзыв: токен с ver меньше текущей версии пользователя отклоняется.
+    Токены старого формата (только sub) пока принимаются через БД — до истечения их срока.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = decode_access_token(token)
     except JWTError:
         raise credentials_exception
+    # Токен сброса пароля подписан тем же ключом, но для входа не годится
+    if payload.get("sub") is None or payload.get("type") == "password_reset":
+        raise credentials_exception
 
-    user_repo = UserRepository(session)
-    user = await user_repo.get_by_email(email)
-    if user is None:
+    if "uid" in payload:
+        user = _user_from_claims(payload)
+        if user.token_version < token_versions.current(user.id):
+            raise credentials_exception
+        return user
+
+    async with AsyncSessionLocal() as session:
+        user = await UserRepository(session).get_by_email(payload["sub"])
+    if user is None or not user.is_active or user.token_version > 0:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+
+async def get_loaders(
+        repository: Annotated[ITaskRepository, Depends(get_task_repo)],
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        current_user: Annotated[User, Depends(get_current_user)]
+) -> RequestLoaders:
+    # Новые на каждый запрос: кэш загрузчиков не переживает запрос и не обходит RBAC другого пользователя
+    return RequestLoaders(repository, session, current_user)
@@ -0,0 +1,116 @@
+import logging
+import re
+import time
+import uuid
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.concurrency import AdaptiveConcurrencyLimiter
+from src.core.log import request_id_var
+
+# Маршруты, которые не должны "задыхаться" вместе с остальными: healthcheck и вход в систему
+PRIORITY_PATHS = ("/health", "/auth/token", "/auth/me")
+# Статика не ходит в БД — её не ограничиваем
+UNLIMITED_PATHS = ("/static", "/favicon.ico")
+# Чужой X-Request-ID принимаем, только если он похож на идентификатор (не раздувает и не ломает логи)
+_REQUEST_ID = re.compile(r"[\w\-.:]{1,64}")
+
+access_logger = logging.getLogger("src.access")
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI-middleware поверх AdaptiveConcurrencyLimiter.
+    Лишние запросы получают 503 сразу, а не висят в очереди пула соединений.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: AdaptiveConcurrencyLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/" or scope["path"].startswith(UNLIMITED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        priority = scope["path"].startswith(PRIORITY_PATHS)
+        if not self.limiter.try_acquire(priority=priority):
+            await self._reject(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except PoolTimeoutError:
+            # Пул исчерпан: резко снижаем лимит и отвечаем 503 вместо 500
+            self.limiter.record_overload()
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=503,
+            content={"detail": "Server is overloaded, please retry later"},
+            headers={"Retry-After": "1"}
+        )
+        await response(scope, receive, send)
+
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """gzip для ответов API выше порога. Статика уже лежит в памяти в сжатом виде — её пропускаем."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and (scope["path"] == "/" or scope["path"].startswith("/static")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class RequestIdMiddleware:
+    """
+    X-Request-ID: берется из запроса (прокси, клиент) или генерируется, попадает во все логи запроса
+    и возвращается в ответе. Каждый запрос пишется в access-лог на уровне DEBUG (с сэмплированием).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if access_logger.isEnabledFor(logging.DEBUG):
+                access_logger.debug(
+                    "%s %s %s", scope["method"], scope["path"], status,
+                    extra={"status": status, "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+                )
+            request_id_var.reset(token)
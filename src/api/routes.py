@@ -1,44 +1,228 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Annotated, List
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Annotated, Awaitable, Callable, List, Optional
 from uuid import UUID
 from src.api.schemas import (
     TaskCreate, TaskRead, TaskAssign,
-    CommentCreate, CommentRead, TaskStatusUpdate
+    CommentCreate, CommentRead, TaskStatusUpdate, ActivityRead,
+    TaskDependencyCreate, BlockerRead, SimilarTaskRead, TaskCreatedRead, ExecutorSuggestion,
+    TaskBatchRequest, TaskBatchRead, TaskFullRead
+)
+from src.domain.entities import (
+    Task, User, Comment, TaskStatus, TaskPriority, TaskSort, Notification, NotificationKind,
+    ActivityEvent, ActivityAction, UserRole
+)
+from src.api.dependencies import (
+    get_db_session, get_current_user, get_outbox, get_activity_log, get_deadline_scheduler,
+    get_dependency_graph, get_analytics, get_similarity_index, get_task_repo, get_task_cache, get_idempotency,
+    get_ai_service, get_loaders, get_shards
 )
-from src.domain.entities import Task, User, Comment, TaskStatus
-from src.api.dependencies import get_db_session, get_current_user
 from src.infrastructure.repositories.task_repository import TaskRepository
+from src.infrastructure.repositories.cached_task_repository import TaskCache
+from src.infrastructure.repositories.outbox_repository import OutboxRepository
+from src.infrastructure.repositories.activity_repository import ActivityRepository
+from src.infrastructure.repositories.dependency_repository import DependencyRepository
+from src.infrastructure.repositories.workload_repository import WorkloadRepository
+from src.infrastructure.repositories.user_repository import UserRepository
+from src.infrastructure.services.dependency_graph import DependencyGraphCache
+from src.infrastructure.services.analytics import AnalyticsCache
+from src.infrastructure.services.similarity import SimilarityIndex
+from src.infrastructure.services.ai_service import AIService
+from src.infrastructure.services.loaders import RequestLoaders
+from src.infrastructure.services.idempotency import (
+    IdempotencyStore, IdempotencyKeyReused, IdempotencyInProgress, StoredResponse, fingerprint
+)
+from src.core.config import getenv
+from src.domain.graph import CycleError
+from src.domain.interfaces import ConcurrentModificationError
+from sqlalchemy.exc import IntegrityError
+from src.infrastructure.services.activity_log import ActivityLogWriter
+from src.infrastructure.services.deadline_scheduler import DeadlineScheduler
+from src.infrastructure.services.import_service import TaskImporter
+from src.infrastructure.services.export_service import (
+    ExportFormat, MEDIA_TYPES, to_csv, to_ndjson, to_parquet, parquet_available
+)
+from src.infrastructure.database.session import AsyncSessionLocal
+from src.infrastructure.database.sharding import ShardSet
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 
-# Вспомогательная функция для получения репозитория
-async def get_task_repo(session: Annotated[AsyncSession, Depends(get_db_session)]) -> TaskRepository:
-    return TaskRepository(session)
+async def get_workload_repo(session: Annotated[AsyncSession, Depends(get_db_session)]) -> WorkloadRepository:
+    return WorkloadRepository(session)
+
+
+# Порог "возможного дубликата" при создании задачи
+DUPLICATE_MIN_SCORE = float(getenv("DUPLICATE_MIN_SCORE", "0.45"))
+SHARDED_DEPENDENCY_ERROR = "Dependencies are supported only between tasks stored in the primary database"
+
+
+async def _similar_visible(
+        repository: TaskRepository,
+        similarity: SimilarityIndex,
+        user: User,
+        task: Task,
+        limit: int,
+        min_score: float = 0.0
+) -> List[SimilarTaskRead]:
+    """Ближайшие соседи из индекса, отфильтрованные по RBAC одним IN-запросом."""
+    # Берем кандидатов с запасом: часть отсеется правами доступа
+    candidates = [
+        (task_id, score) for task_id, score in similarity.similar(task.title, task.description, limit * 5, exclude=task.id)
+        if score >= min_score
+    ]
+    visible = {t.id: t for t in await repository.get_visible(user, [task_id for task_id, _ in candidates])}
+    return [
+        SimilarTaskRead(**visible[task_id].model_dump(), score=round(score, 4))
+        for task_id, score in candidates if task_id in visible
+    ][:limit]
+
+
+def _etag(task: Task) -> str:
+    return f'"{task.version}"'
+
+
+def _if_match_fails(task: Task, if_match: Optional[str]) -> bool:
+    return if_match is not None and if_match.strip() != "*" and _etag(task) not in [v.strip() for v in if_match.split(",")]
 
 
-@router.post("/", response_model=TaskRead, status_code=status.HTTP_201_CREATED)
+async def _get_for_update(
+        repository: TaskRepository, task_cache: TaskCache, task_id: UUID, if_match: Optional[str]
+) -> Task:
+    """
+    Задача для изменения (или 404). Кэш процесса может отставать от соседнего воркера на TASK_CACHE_TTL.
+    Без If-Match клиент версию не знает (SPA), и устаревшая копия дала бы ложный 409 — читаем из БД сразу.
+    С If-Match берем копию из кэша и перечитываем из БД, только если версия не совпала, прежде чем отвечать 412.
+    """
+    if if_match is None:
+        task_cache.invalidate(task_id)
+    task = await repository.get_by_id(task_id)
+    if task is not None and _if_match_fails(task, if_match):
+        task_cache.invalidate(task_id)
+        task = await repository.get_by_id(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+def _check_if_match(task: Task, if_match: Optional[str]) -> None:
+    """If-Match с устаревшей версией — 412 сразу, до любых изменений."""
+    if _if_match_fails(task, if_match):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified; reload it and retry",
+            headers={"ETag": _etag(task)}
+        )
+
+
+async def _save_versioned(repository: TaskRepository, task: Task, if_match: Optional[str]) -> Task:
+    """
+    Условная запись по версии. Проигравший гонку получает 412, если прислал If-Match (клиент явно
+    работает с версиями), иначе 409. Откат транзакции заодно отменяет outbox и счетчики нагрузки.
+    """
+    try:
+        return await repository.save(task)
+    except ConcurrentModificationError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if if_match else status.HTTP_409_CONFLICT,
+            detail="Task was modified concurrently; reload it and retry"
+        )
+
+
+async def _idempotent(
+        store: IdempotencyStore,
+        user: User,
+        key: str,
+        request_fingerprint: str,
+        produce: Callable[[], Awaitable[BaseModel]],
+        response: Response,
+        status_code: int
+) -> JSONResponse:
+    """Первый ответ на Idempotency-Key сохраняется; повторы (и одновременные дубли) получают его же."""
+    async def stored() -> StoredResponse:
+        body = jsonable_encoder(await produce())
+        headers = {k: v for k, v in response.headers.items() if k.lower() == "etag"}
+        return StoredResponse(status_code, body, request_fingerprint, headers)
+
+    try:
+        result, replayed = await store.run(user.id, key, request_fingerprint, stored)
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(
+        result.body, status_code=result.status_code,
+        headers={**result.headers, "Idempotent-Replayed": "true" if replayed else "false"}
+    )
+
+
+@router.post("/", response_model=TaskCreatedRead, status_code=status.HTTP_201_CREATED)
 async def create_task(
         task_data: TaskCreate,
         repository: Annotated[TaskRepository, Depends(get_task_repo)],
-        current_user: Annotated[User, Depends(get_current_user)]
+        activity_log: Annotated[ActivityLogWriter, Depends(get_activity_log)],
+        scheduler: Annotated[DeadlineScheduler, Depends(get_deadline_scheduler)],
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        similarity: Annotated[SimilarityIndex, Depends(get_similarity_index)],
+        idempotency: Annotated[IdempotencyStore, Depends(get_idempotency)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        response: Response,
+        check_duplicates: bool = False,
+        idempotency_key: Annotated[Optional[str], Header()] = None
 ):
-    """Создание задачи. Только авторизованные пользователи."""
-    try:
-        domain_entity = Task(
-            owner_id=current_user.id,
-            target_dept_id=task_data.target_dept_id or current_user.department_id,
-            title=task_data.title,
-            description=task_data.description,
-            priority=task_data.priority,
-            deadline=task_data.deadline
-        )
-    except (ValueError, ValidationError) as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    """
+    Создание задачи. Только авторизованные пользователи.
+    check_duplicates=true — в ответе будут похожие задачи, которые видит пользователь (возможные дубликаты).
+    Idempotency-Key — повтор запроса с тем же ключом вернет первый ответ, а не создаст вторую задачу.
+    """
+    async def produce() -> TaskCreatedRead:
+        if task_data.parent_id and not await repository.get_by_id(task_data.parent_id):
+            raise HTTPException(status_code=400, detail="Parent task not found")
 
-    return await repository.save(domain_entity)
+        try:
+            domain_entity = Task(
+                owner_id=current_user.id,
+                target_dept_id=task_data.target_dept_id or current_user.department_id,
+                parent_id=task_data.parent_id,
+                title=task_data.title,
+                description=task_data.description,
+                priority=task_data.priority,
+                deadline=task_data.deadline
+            )
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        saved = await repository.save(domain_entity)
+        response.headers["ETag"] = _etag(saved)
+        activity_log.record(ActivityEvent(
+            entity_type="task", entity_id=saved.id, actor_id=current_user.id,
+            action=ActivityAction.TASK_CREATED, new_value=saved.status.value
+        ))
+        scheduler.schedule(saved.id, saved.deadline)
+        analytics.invalidate(saved.target_dept_id)
+        similarity.add(saved.id, saved.title, saved.description)
+
+        duplicates = []
+        if check_duplicates and similarity.ready:
+            duplicates = await _similar_visible(repository, similarity, current_user, saved, 5, DUPLICATE_MIN_SCORE)
+        return TaskCreatedRead(**saved.model_dump(), possible_duplicates=duplicates)
+
+    if idempotency_key is None:
+        return await produce()
+    request_fingerprint = fingerprint("POST /tasks/", task_data.model_dump_json(), check_duplicates)
+    return await _idempotent(
+        idempotency, current_user, idempotency_key, request_fingerprint, produce, response, status.HTTP_201_CREATED
+    )
 
 
 @router.get("/", response_model=List[TaskRead])
@@ -46,10 +230,161 @@ async def list_tasks(
         repository: Annotated[TaskRepository, Depends(get_task_repo)],
         current_user: Annotated[User, Depends(get_current_user)],
         limit: int = 10,
-        offset: int = 0
+        offset: int = 0,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[TaskPriority] = None,
+        sort: TaskSort = TaskSort.CREATED_AT,
+        include_archived: bool = False
+):
+    """
+    Список задач. Видимость зависит от роли (RBAC). Архив читается только по include_archived=true.
+    comment_count и last_activity_at приходят в каждой задаче — странице списка не нужны запросы за комментариями.
+    """
+    return await repository.get_all(
+        user=current_user, limit=limit, offset=offset, status=status, priority=priority,
+        include_archived=include_archived, sort=sort
+    )
+
+
+@router.post("/batch", response_model=TaskBatchRead)
+async def get_tasks_batch(
+        batch: TaskBatchRequest,
+        loaders: Annotated[RequestLoaders, Depends(get_loaders)]
 ):
-    """Список задач. Видимость зависит от роли (RBAC)."""
-    return await repository.get_all(user=current_user, limit=limit, offset=offset)
+    """
+    Несколько задач экрана одним запросом: с комментариями, авторами, исполнителями и отделами.
+    Вместо десятков запросов SPA — по одному SQL на тип сущности. Недоступные задачи молча пропускаются.
+    """
+    return await loaders.bundle(batch.task_ids, batch.include_comments)
+
+
+@router.get("/export")
+async def export_tasks(
+        current_user: Annotated[User, Depends(get_current_user)],
+        format: ExportFormat = ExportFormat.CSV,
+        with_comment_counts: bool = False,
+        batch_size: Annotated[int, Query(ge=100, le=50000)] = 5000
+):
+    """
+    Потоковая выгрузка всех видимых задач (RBAC) в CSV / NDJSON / Parquet.
+    Серверный курсор + отдача по пачкам: память не растет с размером выгрузки.
+    """
+    # После StreamingResponse статус 200 уже отправлен: ошибку импорта клиент увидел бы как обрезанный файл
+    if format == ExportFormat.PARQUET and not parquet_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Parquet export requires pyarrow")
+    columns = TaskRepository.EXPORT_COLUMNS + (["comment_count"] if with_comment_counts else [])
+
+    async def body():
+        # Своя сессия: сессия из зависимостей закрывается до того, как начнется отдача тела
+        async with AsyncSessionLocal() as session:
+            batches = TaskRepository(session).stream_rows(
+                current_user, batch_size=batch_size, with_comment_counts=with_comment_counts
+            )
+            if format == ExportFormat.CSV:
+                chunks = to_csv(batches, columns)
+            elif format == ExportFormat.NDJSON:
+                chunks = to_ndjson(batches)
+            else:
+                chunks = to_parquet(batches, columns)
+            async for chunk in chunks:
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format.value}"'}
+    )
+
+
+@router.post("/import")
+async def import_tasks(
+        file: UploadFile,
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        task_cache: Annotated[TaskCache, Depends(get_task_cache)],
+        shards: Annotated[Optional[ShardSet], Depends(get_shards)],
+        scheduler: Annotated[DeadlineScheduler, Depends(get_deadline_scheduler)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        batch_size: Annotated[int, Query(ge=100, le=100000)] = 10000
+):
+    """
+    Массовый импорт задач из CSV (миграция со старого трекера). Только для ADMIN.
+    Строки без owner_id получают владельцем текущего пользователя; ошибочные строки возвращаются в отчете.
+    При шардировании импортируются только задачи отделов основной БД, остальные строки попадают в отчет.
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only Admins can import tasks")
+
+    report = await TaskImporter(
+        session, default_owner_id=current_user.id, batch_size=batch_size,
+        shard_for=shards.shard_for if shards else None
+    ).run(file.file)
+    # Импорт идет мимо инкрементальных счетчиков нагрузки — пересчитываем их целиком (по всем шардам)
+    await WorkloadRepository(session).rebuild(shards)
+    analytics.invalidate_all()
+    task_cache.clear()
+    # Дедлайны импортированных задач внутри горизонта иначе ждали бы следующей перезагрузки кучи
+    # (до DEADLINE_HORIZON_HOURS), и напоминание "скоро дедлайн" успело бы устареть
+    await scheduler.reload()
+    return report.as_dict()
+
+
+@router.get("/due", response_model=List[TaskRead])
+async def list_due_tasks(
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        within: Annotated[int, Query(ge=1, le=24 * 90, description="Окно в часах")] = 24,
+        limit: int = 50
+):
+    """Открытые задачи, у которых дедлайн наступит в ближайшие `within` часов (RBAC)."""
+    until = datetime.now(timezone.utc) + timedelta(hours=within)
+    return await repository.get_due(user=current_user, until=until, limit=limit)
+
+
+@router.get("/overdue", response_model=List[TaskRead])
+async def list_overdue_tasks(
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        limit: int = 50
+):
+    """Открытые задачи с прошедшим дедлайном (RBAC)."""
+    return await repository.get_overdue(user=current_user, limit=limit)
+
+
+@router.get("/{task_id}", response_model=TaskRead)
+async def get_task(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        response: Response,
+        if_none_match: Annotated[Optional[str], Header()] = None
+):
+    """Одна задача (RBAC). ETag — версия задачи: её передают в If-Match при изменении, в If-None-Match — для 304."""
+    found = await repository.get_visible(current_user, [task_id])
+    if not found:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task = found[0]
+    if if_none_match is not None and _etag(task) in [v.strip() for v in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": _etag(task)})
+    response.headers["ETag"] = _etag(task)
+    return task
+
+
+@router.get("/{task_id}/full", response_model=TaskFullRead)
+async def get_task_full(
+        task_id: UUID,
+        loaders: Annotated[RequestLoaders, Depends(get_loaders)]
+):
+    """Задача вместе с комментариями, упомянутыми пользователями и отделом (RBAC)."""
+    bundle = await loaders.bundle([task_id])
+    if not bundle["tasks"]:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {
+        "task": bundle["tasks"][0],
+        "comments": bundle["comments"][task_id],
+        "users": bundle["users"],
+        "department": bundle["departments"][0] if bundle["departments"] else None,
+    }
 
 
 @router.patch("/{task_id}/assign", response_model=TaskRead)
@@ -57,24 +392,99 @@ async def assign_executor(
         task_id: UUID,
         assign_data: TaskAssign,
         repository: Annotated[TaskRepository, Depends(get_task_repo)],
-        current_user: Annotated[User, Depends(get_current_user)]
+        outbox: Annotated[OutboxRepository, Depends(get_outbox)],
+        workload: Annotated[WorkloadRepository, Depends(get_workload_repo)],
+        activity_log: Annotated[ActivityLogWriter, Depends(get_activity_log)],
+        graph: Annotated[DependencyGraphCache, Depends(get_dependency_graph)],
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        task_cache: Annotated[TaskCache, Depends(get_task_cache)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        response: Response,
+        if_match: Annotated[Optional[str], Header()] = None
 ):
-    """Назначить исполнителя. Доступно только Админу или Владельцу задачи."""
-    task = await repository.get_by_id(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    """Назначить исполнителя. Доступно только Админу или Владельцу задачи. If-Match — версия из ETag."""
+    task = await _get_for_update(repository, task_cache, task_id, if_match)
 
     # Проверка прав: админ или автор
     if current_user.role != "admin" and task.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to assign this task")
+    _check_if_match(task, if_match)
+
+    executor = await UserRepository(repository.session).get_by_id(assign_data.executor_id)
+    if executor is None or not executor.is_active:
+        raise HTTPException(status_code=400, detail="Executor not found or inactive")
 
+    previous_executor = task.executor_id
+    before = task.model_copy()
     try:
         # Вызываем логику из сущности Domain
         task.assign_executor(assign_data.executor_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return await repository.save(task)
+    # Счетчики нагрузки старого и нового исполнителя — в том же коммите, что и задача
+    await workload.apply(before, task)
+
+    # Уведомление уйдет в одном коммите с задачей (внутри repository.save)
+    outbox.enqueue(Notification(
+        kind=NotificationKind.TASK_ASSIGNED,
+        recipient_id=task.executor_id,
+        subject=f"You have been assigned: {task.title}",
+        body=f"Task '{task.title}' has been assigned to you by {current_user.full_name}."
+    ))
+    saved = await _save_versioned(repository, task, if_match)
+    response.headers["ETag"] = _etag(saved)
+    graph.status_changed(saved.id, saved.status)
+    analytics.invalidate(saved.target_dept_id)
+    activity_log.record(ActivityEvent(
+        entity_type="task", entity_id=task.id, actor_id=current_user.id,
+        action=ActivityAction.EXECUTOR_ASSIGNED,
+        old_value=str(previous_executor) if previous_executor else None,
+        new_value=str(task.executor_id)
+    ))
+    return saved
+
+
+@router.patch("/{task_id}/status", response_model=TaskRead)
+async def update_task_status(
+        task_id: UUID,
+        status_data: TaskStatusUpdate,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        workload: Annotated[WorkloadRepository, Depends(get_workload_repo)],
+        activity_log: Annotated[ActivityLogWriter, Depends(get_activity_log)],
+        graph: Annotated[DependencyGraphCache, Depends(get_dependency_graph)],
+        analytics: Annotated[AnalyticsCache, Depends(get_analytics)],
+        task_cache: Annotated[TaskCache, Depends(get_task_cache)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        response: Response,
+        if_match: Annotated[Optional[str], Header()] = None
+):
+    """Смена статуса. Доступно Админу, Владельцу и Исполнителю задачи. If-Match — версия из ETag."""
+    task = await _get_for_update(repository, task_cache, task_id, if_match)
+
+    if current_user.role != UserRole.ADMIN and current_user.id not in (task.owner_id, task.executor_id):
+        raise HTTPException(status_code=403, detail="Not authorized to change status of this task")
+    _check_if_match(task, if_match)
+
+    previous_status = task.status
+    before = task.model_copy()
+    try:
+        task.update_status(status_data.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await workload.apply(before, task)
+
+    saved = await _save_versioned(repository, task, if_match)
+    response.headers["ETag"] = _etag(saved)
+    graph.status_changed(saved.id, saved.status)
+    analytics.invalidate(saved.target_dept_id)
+    activity_log.record(ActivityEvent(
+        entity_type="task", entity_id=task.id, actor_id=current_user.id,
+        action=ActivityAction.STATUS_CHANGED,
+        old_value=previous_status.value, new_value=task.status.value
+    ))
+    return saved
 
 
 @router.post("/{task_id}/comments", response_model=CommentRead)
@@ -82,45 +492,242 @@ async def add_comment(
         task_id: UUID,
         comment_data: CommentCreate,
         repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        outbox: Annotated[OutboxRepository, Depends(get_outbox)],
+        idempotency: Annotated[IdempotencyStore, Depends(get_idempotency)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        response: Response,
+        idempotency_key: Annotated[Optional[str], Header()] = None
+):
+    """Добавить комментарий (чат внутри задачи). Idempotency-Key — как у создания задачи."""
+    async def produce() -> CommentRead:
+        task = await repository.get_by_id(task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        new_comment = Comment(
+            task_id=task.id,
+            author_id=current_user.id,
+            text=comment_data.text
+        )
+
+        # Оповещаем автора и исполнителя задачи (кроме самого комментатора)
+        for recipient_id in {task.owner_id, task.executor_id} - {None, current_user.id}:
+            outbox.enqueue(Notification(
+                kind=NotificationKind.TASK_COMMENTED,
+                recipient_id=recipient_id,
+                subject=f"New comment on: {task.title}",
+                body=f"{current_user.full_name}: {new_comment.text}"
+            ))
+        return CommentRead.model_validate(await repository.add_comment(new_comment))
+
+    if idempotency_key is None:
+        return await produce()
+    request_fingerprint = fingerprint(f"POST /tasks/{task_id}/comments", comment_data.model_dump_json())
+    return await _idempotent(
+        idempotency, current_user, idempotency_key, request_fingerprint, produce, response, status.HTTP_200_OK
+    )
+
+
+@router.get("/{task_id}/comments", response_model=List[CommentRead])
+async def get_comments(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        include_archived: bool = False
+):
+    """Получить историю чата."""
+    return await repository.get_comments(task_id, include_archived=include_archived)
+
+
+@router.get("/{task_id}/history", response_model=List[ActivityRead])
+async def get_task_history(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        activity_log: Annotated[ActivityLogWriter, Depends(get_activity_log)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        limit: int = 100
+):
+    """История изменений задачи (статусы, назначения). Только для тех, кому видна сама задача (RBAC)."""
+    if not await repository.get_visible(current_user, [task_id]):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    stored = await ActivityRepository(session).get_history(task_id, limit=limit)
+    # Добавляем события, которые еще не успели сброситься из буфера
+    stored_ids = {e.id for e in stored}
+    pending = [e for e in activity_log.pending_for(task_id) if e.id not in stored_ids]
+    return (stored + pending)[:limit]
+
+
+@router.get("/{task_id}/suggest-executors", response_model=List[ExecutorSuggestion])
+async def suggest_executors(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        workload: Annotated[WorkloadRepository, Depends(get_workload_repo)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Кандидаты в исполнители из отдела задачи: от самых свободных к самым загруженным
+    (открытые задачи, нагрузка с учетом приоритета, давление дедлайнов).
+    Доступно Админу, Владельцу задачи и Менеджеру отдела задачи.
+    """
+    task = await repository.get_by_id(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    is_dept_manager = current_user.role == UserRole.MANAGER and current_user.department_id == task.target_dept_id
+    if current_user.role != UserRole.ADMIN and task.owner_id != current_user.id and not is_dept_manager:
+        raise HTTPException(status_code=403, detail="Not authorized to assign this task")
+    if task.target_dept_id is None:
+        raise HTTPException(status_code=400, detail="Task has no target department")
+
+    # Владелец не может быть исполнителем своей задачи (Task.assign_executor)
+    return await workload.suggest(task.target_dept_id, exclude=[task.owner_id], limit=limit)
+
+
+@router.get("/{task_id}/similar", response_model=List[SimilarTaskRead])
+async def get_similar_tasks(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        similarity: Annotated[SimilarityIndex, Depends(get_similarity_index)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        limit: int = Query(10, ge=1, le=50)
+):
+    """Похожие по тексту задачи (локальный векторный индекс), только видимые пользователю."""
+    tasks = await repository.get_visible(current_user, [task_id])
+    if not tasks:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not similarity.ready:
+        raise HTTPException(status_code=503, detail="Similarity index is still building", headers={"Retry-After": "5"})
+    return await _similar_visible(repository, similarity, current_user, tasks[0], limit)
+
+
+@router.get("/{task_id}/subtasks", response_model=List[TaskRead])
+async def list_subtasks(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        current_user: Annotated[User, Depends(get_current_user)]
+):
+    """Подзадачи задачи, видимые пользователю (RBAC)."""
+    if not await repository.get_visible(current_user, [task_id]):
+        raise HTTPException(status_code=404, detail="Task not found")
+    subtasks = await repository.get_subtasks(task_id)
+    visible = {t.id for t in await repository.get_visible(current_user, [t.id for t in subtasks])}
+    return [t for t in subtasks if t.id in visible]
+
+
+@router.post("/{task_id}/dependencies", status_code=status.HTTP_201_CREATED)
+async def add_dependency(
+        task_id: UUID,
+        dependency: TaskDependencyCreate,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        graph: Annotated[DependencyGraphCache, Depends(get_dependency_graph)],
+        shards: Annotated[Optional[ShardSet], Depends(get_shards)],
+        current_user: Annotated[User, Depends(get_current_user)]
+):
+    """
+    Задача task_id не может быть завершена раньше depends_on_id. Циклы запрещены.
+    Граф зависимостей живет в основной БД: обе задачи должны быть на шарде 0.
+    """
+    tasks = {t.id: t for t in await repository.get_many([task_id, dependency.depends_on_id])}
+    task = tasks.get(task_id)
+    if not task or dependency.depends_on_id not in tasks:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if current_user.role != UserRole.ADMIN and task.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to change dependencies of this task")
+    if shards and any(shards.shard_for(t.target_dept_id) != 0 for t in tasks.values()):
+        raise HTTPException(status_code=400, detail=SHARDED_DEPENDENCY_ERROR)
+
+    dependencies = DependencyRepository(session)
+    try:
+        await dependencies.add(task_id, dependency.depends_on_id)
+    except CycleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        await session.rollback()
+        if await dependencies.exists(task_id, dependency.depends_on_id):
+            raise HTTPException(status_code=409, detail="Dependency already exists")
+        # Ребра нет — нарушен внешний ключ: задача живет не в основной БД (карта шардов устарела)
+        raise HTTPException(status_code=400, detail=SHARDED_DEPENDENCY_ERROR)
+
+    graph.edge_added(task_id, dependency.depends_on_id, {t.id: t.status for t in tasks.values()})
+    return {"task_id": task_id, "depends_on_id": dependency.depends_on_id}
+
+
+@router.delete("/{task_id}/dependencies/{depends_on_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_dependency(
+        task_id: UUID,
+        depends_on_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        session: Annotated[AsyncSession, Depends(get_db_session)],
+        graph: Annotated[DependencyGraphCache, Depends(get_dependency_graph)],
         current_user: Annotated[User, Depends(get_current_user)]
 ):
-    """Добавить комментарий (чат внутри задачи)."""
     task = await repository.get_by_id(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    if current_user.role != UserRole.ADMIN and task.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to change dependencies of this task")
+
+    if not await DependencyRepository(session).remove(task_id, depends_on_id):
+        raise HTTPException(status_code=404, detail="Dependency not found")
+    graph.edge_removed(task_id, depends_on_id)
 
-    new_comment = Comment(
-        task_id=task.id,
-        author_id=current_user.id,
-        text=comment_data.text
+
+@router.get("/{task_id}/blockers", response_model=List[BlockerRead])
+async def get_blockers(
+        task_id: UUID,
+        repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        graph: Annotated[DependencyGraphCache, Depends(get_dependency_graph)],
+        current_user: Annotated[User, Depends(get_current_user)]
+):
+    """
+    Все незавершенные задачи, которые (транзитивно) блокируют task_id. Обход графа — в памяти.
+    Блокеры, которые пользователь не видит (RBAC), в ответ не попадают.
+    """
+    if not await repository.get_visible(current_user, [task_id]):
+        raise HTTPException(status_code=404, detail="Task not found")
+    depths = (await graph.get()).blockers(task_id)
+    tasks = await repository.get_visible(current_user, list(depths))
+    return sorted(
+        (BlockerRead(**t.model_dump(), depth=depths[t.id]) for t in tasks),
+        key=lambda b: (b.depth, b.created_at)
     )
-    return await repository.add_comment(new_comment)
 
 
-@router.get("/{task_id}/comments", response_model=List[CommentRead])
-async def get_comments(
+@router.get("/{task_id}/critical-path", response_model=List[TaskRead])
+async def get_critical_path(
         task_id: UUID,
         repository: Annotated[TaskRepository, Depends(get_task_repo)],
+        graph: Annotated[DependencyGraphCache, Depends(get_dependency_graph)],
         current_user: Annotated[User, Depends(get_current_user)]
 ):
-    """Получить историю чата."""
-    return await repository.get_comments(task_id)
+    """
+    Самая длинная цепочка незавершенных зависимостей до task_id (от первой задачи к самой task_id).
+    Невидимые пользователю звенья (RBAC) пропускаются.
+    """
+    path = (await graph.get()).critical_path(task_id)
+    tasks = {t.id: t for t in await repository.get_visible(current_user, path)}
+    if task_id not in tasks:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return [tasks[node] for node in path if node in tasks]
 
 
 @router.post("/{task_id}/analyze")
 async def analyze_task(
         task_id: UUID,
         repository: Annotated[TaskRepository, Depends(get_task_repo)],
-        current_user: Annotated[User, Depends(get_current_user)]
+        current_user: Annotated[User, Depends(get_current_user)],
+        ai: Annotated[AIService, Depends(get_ai_service)]
 ):
     """AI-анализ задачи и всех комментариев к ней."""
-    from src.infrastructure.services.ai_service import AIService
-
     task = await repository.get_by_id(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     comments = await repository.get_comments(task_id)
-    ai = AIService()
     advice = await ai.analyze_task_context(task.title, task.description, comments)
     return {"task_id": task.id, "ai_advice": advice}
\ No newline at end of file
@@ -1,9 +1,9 @@
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import Dict, List, Optional
 from decimal import Decimal
 from pydantic import BaseModel, EmailStr, Field
-from src.domain.entities import UserRole, TaskStatus, TaskPriority, Currency
+from src.domain.entities import UserRole, TaskStatus, TaskPriority, Currency, ActivityAction
 
 
 # --- TOKEN ---
@@ -47,6 +47,28 @@ class UserRead(BaseModel):
         from_attributes = True
 
 
+class UserDirectoryRead(UserRead):
+    # Из БД, уже проверенный при регистрации: EmailStr на каждой строке страницы заметно замедлял ответ
+    email: str
+
+
+class UserPage(BaseModel):
+    items: List[UserDirectoryRead]
+    # Передается в ?cursor= за следующей страницей; null — страниц больше нет
+    next_cursor: Optional[str] = None
+
+
+class UserBriefRead(BaseModel):
+    """Автор/исполнитель в составных ответах: без email — их видят все, кому видна задача."""
+    id: UUID
+    full_name: str
+    role: UserRole
+    department_id: Optional[UUID]
+
+    class Config:
+        from_attributes = True
+
+
 class UserAdminUpdate(BaseModel):
     """
     Схема для полного управления пользователем со стороны Админа.
@@ -82,6 +104,7 @@ class TaskCreate(BaseModel):
     budget: Decimal = Field(default=Decimal("0.0"))
     currency: Currency = Currency.USD
     executor_id: Optional[UUID] = None
+    parent_id: Optional[UUID] = None
 
 
 class TaskUpdate(BaseModel):
@@ -106,6 +129,7 @@ class TaskRead(BaseModel):
     owner_id: UUID
     executor_id: Optional[UUID]
     target_dept_id: Optional[UUID]
+    parent_id: Optional[UUID] = None
     status: TaskStatus
     priority: TaskPriority
     deadline: Optional[datetime]
@@ -113,11 +137,122 @@ class TaskRead(BaseModel):
     updated_at: datetime
     budget: Decimal
     currency: Currency
+    # Совпадает с ETag ответа; передавайте в If-Match при изменении задачи
+    version: int
+    comment_count: int
+    last_activity_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TaskDependencyCreate(BaseModel):
+    depends_on_id: UUID
+
+
+class BlockerRead(TaskRead):
+    # 1 — прямой блокер, 2 — блокер блокера и т.д.
+    depth: int
+
+
+class SimilarTaskRead(TaskRead):
+    # Косинусная близость текста задач, 0..1
+    score: float
+
+
+class ExecutorSuggestion(BaseModel):
+    id: UUID
+    full_name: str
+    email: str
+    open_count: int
+    # Сумма весов приоритетов открытых задач (low=1 ... critical=8)
+    weighted_load: int
+    deadline_pressure: float
+    # Меньше — свободнее
+    score: float
+
+
+class TaskCreatedRead(TaskRead):
+    # Заполняется только при create_task?check_duplicates=true
+    possible_duplicates: List[SimilarTaskRead] = []
+
+
+class TaskBatchRequest(BaseModel):
+    task_ids: List[UUID] = Field(..., min_length=1, max_length=100)
+    include_comments: bool = True
+
+
+class TaskBatchRead(BaseModel):
+    """Задачи экрана одним ответом: связанные пользователи и отделы — списками без повторов."""
+    tasks: List[TaskRead]
+    comments: Dict[UUID, List[CommentRead]]
+    users: List[UserBriefRead]
+    departments: List[DepartmentRead]
+
+
+class TaskFullRead(BaseModel):
+    task: TaskRead
+    comments: List[CommentRead]
+    users: List[UserBriefRead]
+    department: Optional[DepartmentRead]
+
+
+# --- ACTIVITY ---
+class ActivityRead(BaseModel):
+    id: UUID
+    actor_id: Optional[UUID]
+    action: ActivityAction
+    old_value: Optional[str]
+    new_value: Optional[str]
+    created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+# --- ANALYTICS ---
+class CycleTimeWeek(BaseModel):
+    week_start: datetime
+    count: int
+    p50: Optional[float]
+
+
+class CycleTimeReport(BaseModel):
+    # Все значения — в часах
+    count: int
+    mean_hours: Optional[float]
+    p50: Optional[float]
+    p75: Optional[float]
+    p90: Optional[float]
+    p95: Optional[float]
+    weekly: List[CycleTimeWeek]
+
+
+class ThroughputWeek(BaseModel):
+    week_start: datetime
+    done: int
+
+
+class ThroughputReport(BaseModel):
+    total: int
+    weekly_mean: float
+    weekly: List[ThroughputWeek]
+
+
+class WorkloadRow(BaseModel):
+    # id исполнителя или отдела; None — не назначен / без отдела
+    id: Optional[UUID]
+    open: int
+    overdue: int
+
+
+class WorkloadReport(BaseModel):
+    open: int
+    overdue: int
+    by_executor: List[WorkloadRow]
+    by_department: List[WorkloadRow]
+
+
 class OrderPublicRead(BaseModel):
     id: UUID
     title: str
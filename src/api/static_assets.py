@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+try:
+    import brotli  # опционально: без него отдаем только gzip
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path("src/static")
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Сжимать есть смысл только текст; картинки и шрифты уже сжаты
+COMPRESSIBLE = {".html", ".js", ".css", ".json", ".svg", ".txt", ".map"}
+# Ссылки вида /static/app.js внутри HTML/CSS переписываются на версию с хешем
+STATIC_REF = re.compile(r"/static/([\w./-]+\.\w+)")
+
+
+@dataclass
+class Asset:
+    """Один статический файл со всеми вариантами кодирования, целиком в памяти."""
+    logical_name: str
+    fingerprinted_name: str
+    digest: str
+    media_type: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # encoding -> body ("identity", "gzip", "br")
+
+
+def _fingerprint(name: str, digest: str) -> str:
+    path = Path(name)
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+def _compress(body: bytes, suffix: str) -> Dict[str, bytes]:
+    variants = {"identity": body}
+    if suffix in COMPRESSIBLE:
+        variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11)
+    # Сжатый вариант, который не меньше оригинала, не нужен
+    return {enc: data for enc, data in variants.items() if enc == "identity" or len(data) < len(body)}
+
+
+def build_assets(source: Path = STATIC_DIR) -> Dict[str, Asset]:
+    """
+    Снимает отпечатки (sha256) со всех файлов статики и заранее сжимает их.
+    Сначала обрабатываются не-HTML файлы, чтобы HTML можно было переписать на имена с хешем.
+    """
+    files = sorted(
+        (p for p in source.rglob("*") if p.is_file() and DIST_DIR not in p.parents),
+        key=lambda p: p.suffix == ".html"
+    )
+    assets: Dict[str, Asset] = {}
+    for path in files:
+        logical = path.relative_to(source).as_posix()
+        body = path.read_bytes()
+        if path.suffix in (".html", ".css"):
+            body = STATIC_REF.sub(
+                lambda m: f"/static/{assets[m.group(1)].fingerprinted_name}" if m.group(1) in assets else m.group(0),
+                body.decode("utf-8")
+            ).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        assets[logical] = Asset(
+            logical_name=logical,
+            fingerprinted_name=_fingerprint(logical, digest),
+            digest=digest,
+            media_type=mimetypes.guess_type(logical)[0] or "application/octet-stream",
+            variants=_compress(body, path.suffix)
+        )
+    return assets
+
+
+def write_dist(assets: Dict[str, Asset], target: Path = DIST_DIR) -> None:
+    """Build-time шаг: кладет app.<hash>.js, app.<hash>.js.gz, .br и manifest.json в dist."""
+    target.mkdir(parents=True, exist_ok=True)
+    suffixes = {"identity": "", "gzip": ".gz", "br": ".br"}
+    for asset in assets.values():
+        for encoding, data in asset.variants.items():
+            out = target / (asset.fingerprinted_name + suffixes[encoding])
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_bytes(data)
+    manifest = {
+        a.logical_name: {
+            "file": a.fingerprinted_name, "digest": a.digest,
+            "media_type": a.media_type, "encodings": sorted(a.variants)
+        } for a in assets.values()
+    }
+    (target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def load_dist(target: Path = DIST_DIR) -> Optional[Dict[str, Asset]]:
+    manifest_path = target / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    suffixes = {"identity": "", "gzip": ".gz", "br": ".br"}
+    assets = {}
+    for logical, meta in json.loads(manifest_path.read_text(encoding="utf-8")).items():
+        assets[logical] = Asset(
+            logical_name=logical,
+            fingerprinted_name=meta["file"],
+            digest=meta["digest"],
+            media_type=meta["media_type"],
+            variants={enc: (target / (meta["file"] + suffixes[enc])).read_bytes() for enc in meta["encodings"]}
+        )
+    return assets
+
+
+class StaticAssetStore:
+    """Раздача статики из памяти: выбор кодировки по Accept-Encoding, сильные ETag, immutable-кэш."""
+
+    def __init__(self, assets: Dict[str, Asset]):
+        self.by_name: Dict[str, tuple] = {}
+        for asset in assets.values():
+            # Имя с хешем никогда не меняет содержимое — кэшируем навсегда
+            self.by_name[asset.fingerprinted_name] = (asset, True)
+            # Логическое имя (например, index.html) может смениться при деплое — только ревалидация
+            self.by_name[asset.logical_name] = (asset, False)
+
+    @classmethod
+    def load(cls) -> "StaticAssetStore":
+        # Если build-шаг не запускали, собираем то же самое в памяти при старте
+        return cls(load_dist() or build_assets())
+
+    @staticmethod
+    def _pick_encoding(asset: Asset, accept_encoding: str) -> str:
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in asset.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, name: str, request: Request) -> Response:
+        entry = self.by_name.get(name)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        asset, immutable = entry
+
+        encoding = self._pick_encoding(asset, request.headers.get("accept-encoding", ""))
+        # Сильный ETag: у каждого варианта кодирования свое тело, значит и свой тег
+        etag = f'"{asset.digest}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "public, max-age=31536000, immutable" if immutable else "no-cache",
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=asset.variants[encoding], media_type=asset.media_type, headers=headers)
+
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/static/{path:path}")
+async def serve_static(path: str, request: Request):
+    return request.app.state.static_assets.response(path, request)
+
+
+@router.get("/")
+async def read_index(request: Request):
+    return request.app.state.static_assets.response("index.html", request)
+
+
+def main() -> None:
+    """python -m src.api.static_assets — build-time шаг перед деплоем."""
+    assets = build_assets()
+    write_dist(assets)
+    for asset in assets.values():
+        sizes = ", ".join(f"{enc}={len(data)}B" for enc, data in sorted(asset.variants.items()))
+        print(f"{asset.logical_name} -> {asset.fingerprinted_name} ({sizes})")
+    if brotli is None:
+        print("brotli is not installed: only gzip variants were built", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,116 @@
+import asyncio
+import logging
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from contextlib import asynccontextmanager
-from src.infrastructure.database.session import engine
+from sqlalchemy.orm import configure_mappers
+from src.infrastructure.database.session import engine, AsyncSessionLocal, warm_up_pool
+from src.core.security import warm_up_password_hashing
+from src.core.startup import StartupReport
+from src.core.log import setup_logging, shutdown_logging, log_stats
+from src.core.config import getenv
+from src.infrastructure.services.notification_service import build_notification_sender
+from src.infrastructure.services.outbox_dispatcher import OutboxDispatcher
+from src.infrastructure.services.activity_log import ActivityLogWriter
+from src.infrastructure.services.archiver import ArchiveJob
+from src.infrastructure.services.activity_reconciler import ActivityReconcileJob
+from src.infrastructure.services.deadline_scheduler import DeadlineScheduler
+from src.infrastructure.services.dependency_graph import DependencyGraphCache
+from src.infrastructure.services.analytics import AnalyticsCache
+from src.infrastructure.services.similarity import SimilarityIndex
+from src.infrastructure.services.token_versions import TokenVersionCache
+from src.infrastructure.services.idempotency import IdempotencyStore
+from src.infrastructure.services.ai_service import AIService
+from src.infrastructure.services.ai_providers import build_ai_providers
+from src.infrastructure.database.sharding import ShardSet, SHARD_URLS
+from src.infrastructure.repositories.cached_task_repository import TaskCache
+from src.core.concurrency import concurrency_limiter
+from src.api.middleware import LoadSheddingMiddleware, ApiGZipMiddleware, RequestIdMiddleware
+from src.api.static_assets import StaticAssetStore, router as static_router
 from src.api.routes import router as tasks_router
 from src.api.auth_routes import router as auth_router
 from src.api.department_routes import router as dept_router
+from src.api.analytics_routes import router as analytics_router
+
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # JSON-логи через очередь и поток-писатель: запись в stdout не блокирует event loop
+    setup_logging()
+    report = StartupReport()
+
+    # --- WARM-UP: всё, за что иначе заплатил бы первый запрос ---
+    with report.phase("db_pool"):
+        await warm_up_pool()
+    with report.phase("serializers"):
+        # Маппинги SQLAlchemy и JSON-схемы pydantic строятся лениво — собираем их заранее
+        configure_mappers()
+        app.openapi()
+    with report.phase("password_hashing"):
+        await asyncio.to_thread(warm_up_password_hashing)
+    with report.phase("static_assets"):
+        # Статика целиком в памяти: отпечатки и gzip/br-варианты готовы до первого запроса
+        app.state.static_assets = await asyncio.to_thread(StaticAssetStore.load)
+
+    # --- BACKGROUND WORKERS ---
+    with report.phase("background_workers"):
+        # Фоновая доставка уведомлений из outbox
+        app.state.outbox_dispatcher = OutboxDispatcher(AsyncSessionLocal, build_notification_sender())
+        app.state.outbox_dispatcher.start()
+        # Буферизованный журнал действий
+        app.state.activity_log = ActivityLogWriter(AsyncSessionLocal)
+        await app.state.activity_log.start()
+        # Периодический перенос завершенных задач в архив (если включен)
+        app.state.archive_job = ArchiveJob(AsyncSessionLocal)
+        app.state.archive_job.start()
+        # Сверка comment_count / last_activity_at с таблицей comments
+        app.state.activity_reconcile_job = ActivityReconcileJob(AsyncSessionLocal)
+        app.state.activity_reconcile_job.start()
+        # Напоминания о дедлайнах: куча таймеров перечитывается из БД при старте
+        app.state.deadline_scheduler = DeadlineScheduler(AsyncSessionLocal)
+        await app.state.deadline_scheduler.start()
+    if SHARD_URLS:
+        with report.phase("shards"):
+            # Карта "отдел -> шард" и пулы шардов задач (шард 0 — основная БД)
+            app.state.shards = ShardSet(AsyncSessionLocal)
+            await app.state.shards.start()
+    with report.phase("token_versions"):
+        # Карта версий токенов: отзыв проверяется без запроса в БД
+        app.state.token_versions = TokenVersionCache(AsyncSessionLocal)
+        await app.state.token_versions.start()
+    with report.phase("dependency_graph"):
+        app.state.dependency_graph = DependencyGraphCache(AsyncSessionLocal)
+        await app.state.dependency_graph.reload()
+    # Кэш задач и комментариев для CachedTaskRepository (TASK_CACHE_ENABLED)
+    app.state.task_cache = TaskCache()
+    # Снимки для отчетов грузятся лениво, по первому запросу отдела
+    app.state.analytics = AnalyticsCache(AsyncSessionLocal)
+    # Индекс похожих задач: с диска + догонка из БД, в фоне
+    app.state.similarity_index = SimilarityIndex(AsyncSessionLocal)
+    app.state.similarity_index.start()
+    # Ответы на запросы с Idempotency-Key: LRU в памяти + таблица с TTL и фоновой очисткой
+    app.state.idempotency = IdempotencyStore(AsyncSessionLocal)
+    app.state.idempotency.start()
+    # AI-провайдеры по AI_PROVIDERS: hedging и запасной провайдер, статистика задержек на весь процесс
+    app.state.ai_service = AIService(build_ai_providers())
+
+    app.state.startup_report = report.summary()
+    logger.info(str(report), extra=report.summary())
     yield
+    await app.state.idempotency.stop()
+    await app.state.similarity_index.stop()
+    await app.state.token_versions.stop()
+    await app.state.deadline_scheduler.stop()
+    await app.state.activity_reconcile_job.stop()
+    await app.state.archive_job.stop()
+    await app.state.outbox_dispatcher.stop()
+    # Гарантированный сброс журнала до закрытия пула соединений
+    await app.state.activity_log.stop()
+    if SHARD_URLS:
+        await app.state.shards.stop()
     await engine.dispose()
+    # Последним: поток-писатель дописывает всё, что фоновые воркеры успели залогировать при остановке
+    await asyncio.to_thread(shutdown_logging)
 
 app = FastAPI(
     title="Enterprise AI Task Manager",
@@ -18,19 +118,35 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 0. Сброс нагрузки при исчерпании пула БД
+app.add_middleware(LoadSheddingMiddleware, limiter=concurrency_limiter)
+# Сжатие крупных JSON-ответов API
+app.add_middleware(ApiGZipMiddleware, minimum_size=int(getenv("GZIP_MIN_SIZE", "1024")))
+# Внешний слой: X-Request-ID виден в логах всех остальных middleware и роутов
+app.add_middleware(RequestIdMiddleware)
+
 # 1. Подключаем API
 app.include_router(auth_router)
 app.include_router(dept_router)
 app.include_router(tasks_router)
+app.include_router(analytics_router)
 
-# 2. Подключаем папку со статикой (css, js, html)
-# Создай папку src/static руками, если её нет!
-app.mount("/static", StaticFiles(directory="src/static"), name="static")
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "concurrency": concurrency_limiter.stats(),
+        "outbox": app.state.outbox_dispatcher.stats(),
+        "deadlines": app.state.deadline_scheduler.stats(),
+        "activity_log": app.state.activity_log.stats(),
+        "task_cache": app.state.task_cache.stats(),
+        "logging": log_stats(),
+        "ai": app.state.ai_service.stats(),
+        "startup": app.state.startup_report
+    }
 
-# 3. Главная страница (отдает наш index.html)
-@app.get("/")
-async def read_index():
-    return FileResponse("src/static/index.html")
+# 2. Статика и главная страница (index.html) — из памяти, с отпечатками и предсжатием
+app.include_router(static_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,82 @@
+import time
+from src.core.config import getenv
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD-лимитер одновременных запросов.
+    Лимит растет на 1 за "окно" успешных запросов и умножается на backoff,
+    как только ожидание соединения из пула превышает целевое (или пул отдал таймаут).
+    """
+
+    def __init__(
+            self,
+            initial_limit: int,
+            min_limit: int,
+            max_limit: int,
+            priority_reserve: int,
+            target_checkout_wait: float,
+            backoff: float = 0.9,
+            decrease_cooldown: float = 1.0
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.priority_reserve = priority_reserve
+        self.target_checkout_wait = target_checkout_wait
+        self.backoff = backoff
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        self.rejected = 0
+        self._last_decrease = 0.0
+
+    # --- ADMISSION ---
+    def try_acquire(self, priority: bool = False) -> bool:
+        """Пускает запрос, если есть свободный слот. Приоритетные маршруты получают резерв сверху."""
+        capacity = int(self.limit) + (self.priority_reserve if priority else 0)
+        if self.in_flight >= capacity:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    # --- FEEDBACK ---
+    def record_checkout(self, wait_seconds: float) -> None:
+        """Сигнал от get_db_session: сколько запрос ждал соединение из пула."""
+        if wait_seconds > self.target_checkout_wait:
+            self._decrease()
+        else:
+            # Additive increase: +1 к лимиту примерно за каждые `limit` быстрых выдач
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def record_overload(self) -> None:
+        """Пул не выдал соединение за pool_timeout — сбрасываем лимит без ожидания."""
+        self._decrease(force=True)
+
+    def _decrease(self, force: bool = False) -> None:
+        now = time.monotonic()
+        # Не режем лимит на каждом медленном запросе одной и той же волны
+        if not force and now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+
+concurrency_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=int(getenv("CONCURRENCY_INITIAL_LIMIT", "20")),
+    min_limit=int(getenv("CONCURRENCY_MIN_LIMIT", "4")),
+    max_limit=int(getenv("CONCURRENCY_MAX_LIMIT", "200")),
+    priority_reserve=int(getenv("CONCURRENCY_PRIORITY_RESERVE", "5")),
+    target_checkout_wait=float(getenv("CONCURRENCY_TARGET_CHECKOUT_WAIT_MS", "50")) / 1000,
+)
@@ -0,0 +1,8 @@
+import os
+from dotenv import load_dotenv
+
+# .env читается ровно один раз на процесс — остальные модули берут переменные отсюда
+load_dotenv()
+
+getenv = os.getenv
+environ = os.environ
@@ -0,0 +1,160 @@
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from src.core.config import getenv, environ
+
+LOG_LEVEL = getenv("LOG_LEVEL", "INFO").upper()
+# Доля DEBUG-событий, которые доходят до вывода (access-лог запросов и т.п.); WARNING и выше — всегда
+LOG_DEBUG_SAMPLE_RATE = float(getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+# Очередь к потоку-писателю: при переполнении запись отбрасывается, а не ждет медленный stdout
+LOG_QUEUE_SIZE = int(getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Идентификатор текущего HTTP-запроса (RequestIdMiddleware); у фоновых задач — None
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Поля LogRecord, которые не являются пользовательскими extra
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+_SECRET_NAME = re.compile(r"(password|passwd|secret|token|api_?key|authorization|credential)", re.IGNORECASE)
+_SECRET_PATTERNS = (
+    # Authorization: Bearer <jwt> и голые JWT в тексте
+    re.compile(r"(?i)(bearer\s+)[\w\-.~+/]+=*"),
+    re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]+"),
+    # password=..., "token": "...", api_key: ...
+    re.compile(r"(?i)((?:password|secret|token|api_?key)[\"']?\s*[:=]\s*[\"']?)[^\s\"',;&]+"),
+)
+REDACTED = "***"
+
+
+class Redactor:
+    """Вычищает секреты: значения секретных переменных окружения, токены и пары key=value с секретными именами."""
+
+    def __init__(self, env: dict):
+        # Длинные первыми: значение не должно остаться частично видимым за более коротким совпадением
+        self.values = sorted(
+            {value for name, value in env.items() if _SECRET_NAME.search(name) and len(value) >= 6},
+            key=len, reverse=True
+        )
+
+    def text(self, value: str) -> str:
+        for secret in self.values:
+            value = value.replace(secret, REDACTED)
+        for pattern in _SECRET_PATTERNS:
+            value = pattern.sub(lambda m: (m.group(1) if m.groups() else "") + REDACTED, value)
+        return value
+
+    def field(self, name: str, value):
+        if _SECRET_NAME.search(name):
+            return REDACTED
+        return self.text(value) if isinstance(value, str) else value
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на событие. Работает в потоке-писателе, поэтому цена форматирования не ложится на event loop."""
+
+    def __init__(self, redactor: Redactor):
+        super().__init__()
+        self.redactor = redactor
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": self.redactor.text(record.getMessage()),
+        }
+        if getattr(record, "request_id", None):
+            event["request_id"] = record.request_id
+        for name, value in vars(record).items():
+            if name not in _RECORD_FIELDS:
+                event[name] = self.redactor.field(name, value)
+        if record.exc_text:
+            event["exc"] = self.redactor.text(record.exc_text)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Отдает записи потоку-писателю через ограниченную очередь и никогда не ждет.
+    В вызывающем коде остаются только дешевые шаги: сэмплирование, request id, подстановка аргументов.
+    """
+
+    def __init__(self, log_queue: queue.Queue, debug_sample_rate: float):
+        super().__init__(log_queue)
+        self.debug_sample_rate = debug_sample_rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and random.random() >= self.debug_sample_rate:
+            return False
+        record.request_id = request_id_var.get()
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляем сейчас: объекты могут измениться, пока запись ждет в очереди.
+        # Traceback тоже сейчас — после выхода из except его уже не получить.
+        prepared = logging.makeLogRecord(vars(record))
+        prepared.msg, prepared.args = record.getMessage(), None
+        if record.exc_info:
+            prepared.exc_text = logging.Formatter().formatException(record.exc_info)
+        prepared.exc_info, prepared.stack_info = None, None
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging(stream=None) -> None:
+    """
+    Корневой логгер -> очередь -> поток-писатель -> stdout (JSON). Повторный вызов ничего не делает.
+    Логгеры модулей (logging.getLogger(__name__)) настраивать не нужно.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter(Redactor(dict(environ))))
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(log_queue, LOG_DEBUG_SAMPLE_RATE)
+    _listener = QueueListener(log_queue, writer)
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    # LOG_LEVEL=DEBUG включает DEBUG только у логгеров приложения (src.*): драйверы БД на DEBUG пишут каждый вызов
+    root.setLevel(max(logging.INFO, logging.getLevelName(LOG_LEVEL)))
+    logging.getLogger("src").setLevel(LOG_LEVEL)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Дописывает очередь до конца и останавливает поток-писатель (блокирует: из async — через to_thread)."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_handler)
+    if _handler.dropped:
+        print(f"{_handler.dropped} log records dropped: queue was full", file=sys.stderr)
+    _listener, _handler = None, None
+
+
+def log_stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
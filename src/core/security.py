@@ -1,29 +1,49 @@
-import os
+import hashlib
+import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from dotenv import load_dotenv
 from jose import jwt
-from passlib.context import CryptContext
+from src.core.config import environ, getenv
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # "Fail Fast" — если ключей нет, программа не должна даже пытаться работать.
 try:
-    SECRET_KEY = os.environ["JWT_SECRET_KEY"]
-    ALGORITHM = os.environ["JWT_ALGORITHM"]
-    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ["ACCESS_TOKEN_EXPIRE_MINUTES"])
+    SECRET_KEY = environ["JWT_SECRET_KEY"]
+    ALGORITHM = environ["JWT_ALGORITHM"]
+    ACCESS_TOKEN_EXPIRE_MINUTES = int(environ["ACCESS_TOKEN_EXPIRE_MINUTES"])
 except KeyError as e:
     raise RuntimeError(f"CRITICAL SECURITY ERROR: Variable {e} is missing in .env file!")
 except ValueError:
     raise RuntimeError("CRITICAL ERROR: ACCESS_TOKEN_EXPIRE_MINUTES must be an integer!")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b")
+TOKEN_CACHE_SIZE = int(getenv("TOKEN_CACHE_SIZE", "10000"))
+# sha256(token) -> payload уже проверенных токенов (LRU). Сам токен как ключ не храним.
+_verified_tokens: "OrderedDict[str, dict]" = OrderedDict()
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    # passlib + bcrypt грузятся лениво: импорт приложения не платит за них,
+    # а прогрев делается явно на старте (warm_up_password_hashing)
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b")
+
+def warm_up_password_hashing() -> None:
+    # dummy_verify загружает bcrypt-бэкенд и проходит его самопроверки заранее.
+    # Прогрев — только оптимизация: несовместимый bcrypt не должен мешать старту приложения
+    try:
+        get_pwd_context().dummy_verify()
+    except Exception:
+        logger.exception("Password hashing warm-up failed; bcrypt will be loaded on first login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -31,6 +51,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def decode_access_token(token: str) -> dict:
+    """
+    jwt.decode с мемоизацией: повторный запрос с тем же токеном не проверяет подпись заново.
+    Истекший токен из кэша выбрасывается и проверяется честно (jose поднимет ExpiredSignatureError).
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            _verified_tokens.move_to_end(key)
+            return payload
+        del _verified_tokens[key]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _verified_tokens[key] = payload
+    if len(_verified_tokens) > TOKEN_CACHE_SIZE:
+        _verified_tokens.popitem(last=False)
+    return payload
+
 def create_password_reset_token(email: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode = {"sub": email, "type": "password_reset", "exp": expire}
@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StartupReport:
+    """Замеры фаз старта приложения (прогрев пула, сериализаторов, фоновых воркеров)."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def summary(self) -> dict:
+        return {
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 1),
+            "phases_ms": self.phases,
+        }
+
+    def __str__(self) -> str:
+        phases = ", ".join(f"{name}={ms}ms" for name, ms in self.phases.items())
+        return f"🚀 Startup finished in {self.summary()['total_ms']}ms ({phases})"
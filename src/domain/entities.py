@@ -3,7 +3,7 @@ from decimal import Decimal  # ВОТ ЭТОТ ИМПОРТ БЫЛ ПРОПУЩ
 from enum import Enum
 from uuid import UUID, uuid4
 from typing import Optional, List
-from pydantic import BaseModel, Field, EmailStr, field_validator
+from pydantic import BaseModel, Field, EmailStr, field_validator, ValidationInfo
 
 
 # --- ENUMS (Константы) ---
@@ -28,12 +28,52 @@ class TaskPriority(str, Enum):
     CRITICAL = "critical"
 
 
+class TaskSort(str, Enum):
+    """Порядок списка задач (всегда по убыванию)."""
+    CREATED_AT = "created_at"
+    LAST_ACTIVITY = "last_activity"
+    COMMENT_COUNT = "comment_count"
+
+
+class NotificationKind(str, Enum):
+    PASSWORD_RESET = "password_reset"
+    TASK_ASSIGNED = "task_assigned"
+    TASK_COMMENTED = "task_commented"
+    DEADLINE_APPROACHING = "deadline_approaching"
+    TASK_OVERDUE = "task_overdue"
+
+
+class ReminderStage(int, Enum):
+    """Какие напоминания о дедлайне уже отправлены (хранится в tasks.reminder_stage)."""
+    NONE = 0
+    APPROACHING = 1
+    OVERDUE = 2
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class ActivityAction(str, Enum):
+    TASK_CREATED = "task_created"
+    STATUS_CHANGED = "status_changed"
+    EXECUTOR_ASSIGNED = "executor_assigned"
+    USER_ROLE_CHANGED = "user_role_changed"
+    USER_DEPARTMENT_CHANGED = "user_department_changed"
+
+
 class Currency(str, Enum):
     USD = "USD"
     EUR = "EUR"
     RUB = "RUB"
 
 
+# Длина tasks.title в БД (VARCHAR(200))
+TASK_TITLE_MAX_LENGTH = 200
+
+
 # --- DOMAIN ENTITIES ---
 
 class Department(BaseModel):
@@ -55,6 +95,7 @@ class User(BaseModel):
     role: UserRole = UserRole.EMPLOYEE
     is_active: bool = True
     department_id: Optional[UUID] = None
+    token_version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Config:
@@ -73,6 +114,35 @@ class Comment(BaseModel):
         from_attributes = True
 
 
+class Notification(BaseModel):
+    """Уведомление в outbox. Получатель — либо email напрямую, либо id пользователя."""
+    id: UUID = Field(default_factory=uuid4)
+    kind: NotificationKind
+    recipient_email: Optional[str] = None
+    recipient_id: Optional[UUID] = None
+    subject: str
+    body: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Config:
+        from_attributes = True
+
+
+class ActivityEvent(BaseModel):
+    """Запись журнала действий (append-only). entity_type: 'task' или 'user'."""
+    id: UUID = Field(default_factory=uuid4)
+    entity_type: str
+    entity_id: UUID
+    actor_id: Optional[UUID] = None
+    action: ActivityAction
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Config:
+        from_attributes = True
+
+
 class Task(BaseModel):
     """Бизнес-задача."""
     id: UUID = Field(default_factory=uuid4)
@@ -82,6 +152,8 @@ class Task(BaseModel):
     owner_id: UUID
     executor_id: Optional[UUID] = None
     target_dept_id: Optional[UUID] = None
+    # Родительская задача (для подзадач)
+    parent_id: Optional[UUID] = None
 
     status: TaskStatus = TaskStatus.NEW
     priority: TaskPriority = TaskPriority.MEDIUM
@@ -95,23 +167,36 @@ class Task(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    # Версия строки для оптимистичных блокировок: 0 — задача еще не сохранена, каждое сохранение +1
+    version: int = 0
+
+    # Денормализация для списков: ведет хранилище (add_comment / save), из домена не записывается
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+
     # --- ВАЛИДАТОРЫ ---
     @field_validator("title")
     @classmethod
     def validate_title(cls, v: str) -> str:
         if len(v.strip()) < 3:
             raise ValueError("Title must be at least 3 chars.")
+        if len(v.strip()) > TASK_TITLE_MAX_LENGTH:
+            raise ValueError(f"Title must be at most {TASK_TITLE_MAX_LENGTH} chars.")
         return v.strip()
 
     @field_validator("deadline")
     @classmethod
-    def validate_deadline(cls, v: Optional[datetime]) -> Optional[datetime]:
+    def validate_deadline(cls, v: Optional[datetime], info: ValidationInfo) -> Optional[datetime]:
         """Исправляет ошибку сравнения offset-naive и offset-aware datetimes."""
         if v:
             # Если время пришло без часового пояса (naive), принудительно ставим ему UTC
             if v.tzinfo is None:
                 v = v.replace(tzinfo=timezone.utc)
 
+            # Задачи, прочитанные из БД, уже могут быть просрочены — это не ошибка ввода
+            if (info.context or {}).get("from_storage"):
+                return v
+
             # Теперь сравнение с текущим временем (тоже в UTC) будет корректным
             if v < datetime.now(timezone.utc):
                 raise ValueError("Deadline cannot be in the past.")
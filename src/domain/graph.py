@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+
+from src.domain.entities import TaskStatus
+
+FINISHED = (TaskStatus.DONE, TaskStatus.CANCELLED)
+
+
+class CycleError(ValueError):
+    """Связь создала бы цикл зависимостей."""
+
+
+class DependencyGraph:
+    """
+    Граф зависимостей задач: ребро task -> depends_on означает "task ждет depends_on".
+    Чистая доменная логика без БД: блокеры, критический путь, проверка на цикл.
+    """
+
+    def __init__(self):
+        self.depends_on: Dict[UUID, Set[UUID]] = {}
+        self.statuses: Dict[UUID, TaskStatus] = {}
+
+    # --- MUTATIONS ---
+    def add_edge(self, task_id: UUID, depends_on_id: UUID) -> None:
+        if self.would_create_cycle(task_id, depends_on_id):
+            raise CycleError("Dependency would create a cycle.")
+        self.depends_on.setdefault(task_id, set()).add(depends_on_id)
+
+    def remove_edge(self, task_id: UUID, depends_on_id: UUID) -> None:
+        self.depends_on.get(task_id, set()).discard(depends_on_id)
+
+    def set_status(self, task_id: UUID, status: TaskStatus) -> None:
+        self.statuses[task_id] = status
+
+    def is_open(self, task_id: UUID) -> bool:
+        return self.statuses.get(task_id) not in FINISHED
+
+    # --- QUERIES ---
+    def would_create_cycle(self, task_id: UUID, depends_on_id: UUID) -> bool:
+        """Цикл появится, если task_id уже достижим из depends_on_id."""
+        if task_id == depends_on_id:
+            return True
+        stack, seen = [depends_on_id], set()
+        while stack:
+            node = stack.pop()
+            if node == task_id:
+                return True
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(self.depends_on.get(node, ()))
+        return False
+
+    def blockers(self, task_id: UUID) -> Dict[UUID, int]:
+        """
+        Все незавершенные задачи, от которых транзитивно зависит task_id, с глубиной (1 — прямой блокер).
+        Через завершенную задачу обход не продолжается: её собственные зависимости уже ничего не блокируют.
+        """
+        depth: Dict[UUID, int] = {}
+        frontier = [task_id]
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for node in frontier:
+                for dep in self.depends_on.get(node, ()):
+                    if dep in depth or not self.is_open(dep):
+                        continue
+                    depth[dep] = level
+                    next_frontier.append(dep)
+            frontier = next_frontier
+        return depth
+
+    def critical_path(self, task_id: UUID) -> List[UUID]:
+        """
+        Самая длинная цепочка незавершенных зависимостей, которую нужно пройти до task_id
+        (от самой ранней задачи к самой task_id). Граф ацикличен — хватает DP в топологическом порядке.
+        Итеративно, без рекурсии: цепочки в тысячи задач не упираются в лимит стека.
+        """
+        # Топологический порядок через пост-обход, затем DP по длине пути
+        order: List[UUID] = []
+        visited: Set[UUID] = set()
+        stack = [(task_id, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+                continue
+            if node in visited:
+                continue
+            visited.add(node)
+            stack.append((node, True))
+            for dep in self.depends_on.get(node, ()):
+                if self.is_open(dep) and dep not in visited:
+                    stack.append((dep, False))
+
+        prev: Dict[UUID, Optional[UUID]] = {}
+        length: Dict[UUID, int] = {}
+        for node in order:
+            best_dep, best_len = None, 0
+            for dep in self.depends_on.get(node, ()):
+                if dep in length and length[dep] > best_len:
+                    best_dep, best_len = dep, length[dep]
+            prev[node], length[node] = best_dep, best_len + 1
+
+        path: List[UUID] = []
+        node: Optional[UUID] = task_id
+        while node is not None:
+            path.append(node)
+            node = prev.get(node)
+        return list(reversed(path))
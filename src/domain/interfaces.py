@@ -1,7 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Dict
 from uuid import UUID
-from src.domain.entities import Task, TaskStatus
+from src.domain.entities import Task, TaskStatus, TaskPriority, TaskSort, Comment, Notification
+
+class ConcurrentModificationError(Exception):
+    """Задачу успели изменить после того, как мы ее прочитали (версия в хранилище уже другая)."""
+
+    def __init__(self, task_id: UUID, expected_version: int):
+        super().__init__(f"Task {task_id} was modified concurrently (expected version {expected_version}).")
+        self.task_id = task_id
+        self.expected_version = expected_version
+
 
 class ITaskRepository(ABC):
     """
@@ -11,10 +21,18 @@ class ITaskRepository(ABC):
 
     @abstractmethod
     async def save(self, task: Task) -> Task:
+        """
+        version == 0 — вставка. Иначе условное обновление "только если версия в хранилище все еще task.version";
+        при расхождении — ConcurrentModificationError. Возвращает задачу с новой версией.
+        """
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
         pass
 
     @abstractmethod
-    async def get_by_id(self, task_id: UUID) -> Optional[Task]:
+    async def get_many(self, task_ids: List[UUID]) -> List[Task]:
         pass
 
     @abstractmethod
@@ -23,7 +41,12 @@ class ITaskRepository(ABC):
         user: any, # Тип User (из entities)
         limit: int,
         offset: int,
-        status: Optional[TaskStatus] = None
+        status: Optional[TaskStatus] = None,
+        priority: Optional[TaskPriority] = None,
+        deadline_start: Optional[datetime] = None,
+        deadline_end: Optional[datetime] = None,
+        include_archived: bool = False,
+        sort: TaskSort = TaskSort.CREATED_AT
     ) -> List[Task]:
         pass
 
@@ -32,9 +55,35 @@ class ITaskRepository(ABC):
         pass
 
     @abstractmethod
-    async def add_comment(self, comment: any) -> any:
+    async def add_comment(self, comment: Comment) -> Comment:
+        """Вместе с комментарием атомарно увеличивает comment_count и двигает last_activity_at задачи."""
         pass
 
     @abstractmethod
-    async def get_comments(self, task_id: UUID) -> List[any]:
-        pass
\ No newline at end of file
+    async def get_comments(self, task_id: UUID, include_archived: bool = False) -> List[Comment]:
+        pass
+
+
+class INotificationSender(ABC):
+    """
+    Интерфейс канала доставки уведомлений (SMTP, файл, мессенджер и т.д.).
+    Получает уже готовую пачку из outbox.
+    """
+
+    @abstractmethod
+    async def send_batch(self, notifications: List[Notification]) -> Dict[UUID, str]:
+        """Возвращает ошибки по id сообщений, которые доставить не удалось."""
+        pass
+
+
+class IAIProvider(ABC):
+    """
+    Интерфейс модели для AI-анализа задач (облачная LLM, локальные правила и т.д.).
+    Ошибки и таймауты провайдер не глотает — решение о запасном провайдере принимает AIService.
+    """
+    name: str
+
+    @abstractmethod
+    async def analyze_task(self, title: str, description: Optional[str], comments: List[Comment]) -> str:
+        """Возвращает 2-3 коротких совета, как сдвинуть задачу с места."""
+        pass
@@ -4,50 +4,95 @@ from typing import Optional, List
 import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import DeclarativeBase, Mapped, relationship
-from src.domain.entities import UserRole, TaskStatus, TaskPriority
+from src.domain.entities import UserRole, TaskStatus, TaskPriority, OutboxStatus
+from src.infrastructure.database.portable import UtcDateTime, utc_now
 
 class Base(DeclarativeBase):
     pass
 
+
+# Предикат частичного индекса открытых дедлайнов. Запросы используют его дословно,
+# чтобы планировщик (Postgres и SQLite) гарантированно узнал индекс.
+OPEN_DEADLINE_PREDICATE = "deadline IS NOT NULL AND status NOT IN ('done', 'cancelled')"
+
 class DepartmentModel(Base):
     __tablename__ = "departments"
-    id: Mapped[UUID] = orm.mapped_column(sa.UUID, primary_key=True, default=uuid4)
+    id: Mapped[UUID] = orm.mapped_column(sa.Uuid, primary_key=True, default=uuid4)
     name: Mapped[str] = orm.mapped_column(sa.String(100), unique=True, nullable=False)
     # ИСПРАВЛЕНО: Добавлен timezone=True
-    created_at: Mapped[datetime] = orm.mapped_column(sa.DateTime(timezone=True), server_default=sa.text("TIMEZONE('utc', now())"))
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
     users = relationship("UserModel", back_populates="department")
     tasks = relationship("TaskModel", back_populates="target_dept")
 
 class UserModel(Base):
     __tablename__ = "users"
-    id: Mapped[UUID] = orm.mapped_column(sa.UUID, primary_key=True, default=uuid4)
+    __table_args__ = (
+        # Справочник пользователей листается по алфавиту: keyset-пагинация по (full_name, id)
+        sa.Index("ix_users_full_name_id", "full_name", "id"),
+    )
+    id: Mapped[UUID] = orm.mapped_column(sa.Uuid, primary_key=True, default=uuid4)
     email: Mapped[str] = orm.mapped_column(sa.String(255), unique=True, index=True, nullable=False)
     hashed_password: Mapped[str] = orm.mapped_column(sa.String, nullable=False)
     full_name: Mapped[str] = orm.mapped_column(sa.String(100), nullable=False)
     role: Mapped[str] = orm.mapped_column(sa.String(20), default=UserRole.EMPLOYEE.value)
     is_active: Mapped[bool] = orm.mapped_column(sa.Boolean, default=True)
-    department_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.ForeignKey("departments.id"), nullable=True)
+    # Версия выданных токенов: увеличение отзывает все ранее выданные access-токены пользователя
+    token_version: Mapped[int] = orm.mapped_column(sa.Integer, server_default=sa.text("0"), nullable=False)
+    department_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.ForeignKey("departments.id"), nullable=True, index=True)
     # ИСПРАВЛЕНО: Добавлен timezone=True
-    created_at: Mapped[datetime] = orm.mapped_column(sa.DateTime(timezone=True), server_default=sa.text("TIMEZONE('utc', now())"))
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
     department = relationship("DepartmentModel", back_populates="users")
     owned_tasks = relationship("TaskModel", back_populates="owner", foreign_keys="TaskModel.owner_id")
     executed_tasks = relationship("TaskModel", back_populates="executor", foreign_keys="TaskModel.executor_id")
     comments = relationship("CommentModel", back_populates="author")
 
+
+# Поиск по имени и email: в Postgres — триграммы (pg_trgm, подстрока и опечатки),
+# в SQLite — B-tree для префикса по casefold() (функция соединения, см. portable.install_sqlite_pragmas)
+for _column in ("full_name", "email"):
+    sa.Index(
+        f"ix_users_{_column}_trgm", sa.func.lower(UserModel.__table__.c[_column]).label(f"{_column}_lower"),
+        postgresql_using="gin", postgresql_ops={f"{_column}_lower": "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
+    sa.Index(
+        f"ix_users_{_column}_casefold", sa.func.casefold(UserModel.__table__.c[_column])
+    ).ddl_if(dialect="sqlite")
+
+
 class TaskModel(Base):
     __tablename__ = "tasks"
-    id: Mapped[UUID] = orm.mapped_column(sa.UUID, primary_key=True, default=uuid4)
+    __table_args__ = (
+        # Горячая таблица: список задач всегда сортируется по created_at
+        sa.Index("ix_tasks_created_at", "created_at"),
+        # Только открытые задачи с дедлайном: due/overdue и планировщик напоминаний
+        sa.Index(
+            "ix_tasks_open_deadline", "deadline",
+            postgresql_where=sa.text(OPEN_DEADLINE_PREDICATE), sqlite_where=sa.text(OPEN_DEADLINE_PREDICATE)
+        ),
+    )
+    id: Mapped[UUID] = orm.mapped_column(sa.Uuid, primary_key=True, default=uuid4)
     title: Mapped[str] = orm.mapped_column(sa.String(200), nullable=False)
     description: Mapped[Optional[str]] = orm.mapped_column(sa.String, nullable=True)
     owner_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("users.id"), nullable=False)
     executor_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.ForeignKey("users.id"), nullable=True)
     target_dept_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.ForeignKey("departments.id"), nullable=True)
+    # Родителя с подзадачами в горячей таблице архиватор не переносит; SET NULL — только при явном удалении
+    parent_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True, index=True)
     status: Mapped[str] = orm.mapped_column(sa.String(20), default=TaskStatus.NEW.value)
     priority: Mapped[str] = orm.mapped_column(sa.String(20), default=TaskPriority.MEDIUM.value)
     # ИСПРАВЛЕНО: Добавлен timezone=True
-    deadline: Mapped[Optional[datetime]] = orm.mapped_column(sa.DateTime(timezone=True), nullable=True)
-    created_at: Mapped[datetime] = orm.mapped_column(sa.DateTime(timezone=True), server_default=sa.text("TIMEZONE('utc', now())"))
-    updated_at: Mapped[datetime] = orm.mapped_column(sa.DateTime(timezone=True), server_default=sa.text("TIMEZONE('utc', now())"), onupdate=datetime.now)
+    deadline: Mapped[Optional[datetime]] = orm.mapped_column(UtcDateTime(), nullable=True)
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
+    updated_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now(), onupdate=datetime.now)
+    # Последнее отправленное напоминание о дедлайне (ReminderStage) — переживает рестарт планировщика
+    reminder_stage: Mapped[int] = orm.mapped_column(sa.SmallInteger, server_default=sa.text("0"), nullable=False)
+    # Оптимистичная блокировка: UPDATE ... WHERE version = :прочитанная, затем version + 1
+    version: Mapped[int] = orm.mapped_column(sa.Integer, server_default=sa.text("1"), nullable=False)
+    # Денормализация для списка задач: число комментариев и последняя активность (правка задачи или комментарий)
+    comment_count: Mapped[int] = orm.mapped_column(sa.Integer, server_default=sa.text("0"), nullable=False)
+    last_activity_at: Mapped[datetime] = orm.mapped_column(
+        UtcDateTime(), server_default=utc_now(), nullable=False, index=True
+    )
 
     owner = relationship("UserModel", foreign_keys=[owner_id], back_populates="owned_tasks")
     executor = relationship("UserModel", foreign_keys=[executor_id], back_populates="executed_tasks")
@@ -56,11 +101,145 @@ class TaskModel(Base):
 
 class CommentModel(Base):
     __tablename__ = "comments"
-    id: Mapped[UUID] = orm.mapped_column(sa.UUID, primary_key=True, default=uuid4)
+    __table_args__ = (
+        sa.Index("ix_comments_task_created", "task_id", "created_at"),
+    )
+    id: Mapped[UUID] = orm.mapped_column(sa.Uuid, primary_key=True, default=uuid4)
     text: Mapped[str] = orm.mapped_column(sa.String, nullable=False)
     task_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("tasks.id"), nullable=False)
     author_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("users.id"), nullable=False)
     # ИСПРАВЛЕНО: Добавлен timezone=True
-    created_at: Mapped[datetime] = orm.mapped_column(sa.DateTime(timezone=True), server_default=sa.text("TIMEZONE('utc', now())"))
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
     task = relationship("TaskModel", back_populates="comments")
-    author = relationship("UserModel", back_populates="comments")
\ No newline at end of file
+    author = relationship("UserModel", back_populates="comments")
+
+class TaskDependencyModel(Base):
+    """Ребро графа зависимостей: task_id ждет depends_on_id. Удаляется вместе с любой из задач."""
+    __tablename__ = "task_dependencies"
+    task_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    depends_on_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
+
+class UserWorkloadModel(Base):
+    """
+    Счетчики нагрузки исполнителя по открытым задачам. Меняются инкрементально в той же транзакции,
+    что и задача (назначение, смена статуса), — рекомендации не считают агрегаты по tasks.
+    """
+    __tablename__ = "user_workload"
+    user_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    open_count: Mapped[int] = orm.mapped_column(sa.Integer, server_default=sa.text("0"), nullable=False)
+    # Сумма весов приоритетов открытых задач (PRIORITY_WEIGHTS)
+    weighted_load: Mapped[int] = orm.mapped_column(sa.Integer, server_default=sa.text("0"), nullable=False)
+    # Открытые задачи с дедлайном и сумма их дедлайнов (epoch, сек) — средний дедлайн без агрегатов
+    deadline_count: Mapped[int] = orm.mapped_column(sa.Integer, server_default=sa.text("0"), nullable=False)
+    deadline_sum: Mapped[int] = orm.mapped_column(sa.BigInteger, server_default=sa.text("0"), nullable=False)
+
+
+# --- COLD STORAGE ---
+# Архив завершенных задач. Те же колонки, что у tasks/comments, но без внешних ключей
+# (на секционированную таблицу нельзя сослаться FK) и с секционированием по годам created_at.
+# Читается только когда об этом явно просят (include_archived=True).
+tasks_archive = sa.Table(
+    "tasks_archive", Base.metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("title", sa.String(200), nullable=False),
+    sa.Column("description", sa.String, nullable=True),
+    sa.Column("owner_id", sa.Uuid, nullable=False),
+    sa.Column("executor_id", sa.Uuid, nullable=True),
+    sa.Column("target_dept_id", sa.Uuid, nullable=True),
+    sa.Column("parent_id", sa.Uuid, nullable=True),
+    sa.Column("status", sa.String(20), nullable=False),
+    sa.Column("priority", sa.String(20), nullable=False),
+    sa.Column("deadline", UtcDateTime(), nullable=True),
+    sa.Column("created_at", UtcDateTime(), primary_key=True),
+    sa.Column("updated_at", UtcDateTime(), nullable=False),
+    sa.Column("version", sa.Integer, server_default=sa.text("1"), nullable=False),
+    sa.Column("comment_count", sa.Integer, server_default=sa.text("0"), nullable=False),
+    sa.Column("last_activity_at", UtcDateTime(), server_default=utc_now(), nullable=False),
+    sa.Column("archived_at", UtcDateTime(), server_default=utc_now(), nullable=False),
+    sa.Index("ix_tasks_archive_owner", "owner_id"),
+    sa.Index("ix_tasks_archive_dept", "target_dept_id"),
+    postgresql_partition_by="RANGE (created_at)",
+)
+
+comments_archive = sa.Table(
+    "comments_archive", Base.metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("text", sa.String, nullable=False),
+    sa.Column("task_id", sa.Uuid, nullable=False),
+    sa.Column("author_id", sa.Uuid, nullable=False),
+    sa.Column("created_at", UtcDateTime(), primary_key=True),
+    sa.Index("ix_comments_archive_task", "task_id", "created_at"),
+    postgresql_partition_by="RANGE (created_at)",
+)
+
+
+class OutboxModel(Base):
+    """Transactional outbox: пишется в той же транзакции, что и бизнес-изменение."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Диспетчер выбирает только ожидающие сообщения, у которых подошло время попытки
+        sa.Index(
+            "ix_outbox_pending", "next_attempt_at",
+            postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'")
+        ),
+    )
+    id: Mapped[UUID] = orm.mapped_column(sa.Uuid, primary_key=True, default=uuid4)
+    kind: Mapped[str] = orm.mapped_column(sa.String(50), nullable=False)
+    recipient_email: Mapped[Optional[str]] = orm.mapped_column(sa.String(255), nullable=True)
+    recipient_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.ForeignKey("users.id"), nullable=True)
+    subject: Mapped[str] = orm.mapped_column(sa.String(255), nullable=False)
+    body: Mapped[str] = orm.mapped_column(sa.String, nullable=False)
+    status: Mapped[str] = orm.mapped_column(sa.String(20), default=OutboxStatus.PENDING.value)
+    attempts: Mapped[int] = orm.mapped_column(sa.Integer, default=0)
+    last_error: Mapped[Optional[str]] = orm.mapped_column(sa.String, nullable=True)
+    next_attempt_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
+    sent_at: Mapped[Optional[datetime]] = orm.mapped_column(UtcDateTime(), nullable=True)
+
+
+class ActivityModel(Base):
+    """
+    Журнал действий. Секционирован по месяцам (RANGE по created_at),
+    поэтому ключ включает created_at. Секции создает ActivityLogWriter при старте.
+    """
+    __tablename__ = "activity_log"
+    __table_args__ = (
+        sa.Index("ix_activity_entity", "entity_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    id: Mapped[UUID] = orm.mapped_column(sa.Uuid, primary_key=True, default=uuid4)
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), primary_key=True, server_default=utc_now())
+    entity_type: Mapped[str] = orm.mapped_column(sa.String(20), nullable=False)
+    entity_id: Mapped[UUID] = orm.mapped_column(sa.Uuid, nullable=False)
+    actor_id: Mapped[Optional[UUID]] = orm.mapped_column(sa.Uuid, nullable=True)
+    action: Mapped[str] = orm.mapped_column(sa.String(50), nullable=False)
+    old_value: Mapped[Optional[str]] = orm.mapped_column(sa.String, nullable=True)
+    new_value: Mapped[Optional[str]] = orm.mapped_column(sa.String, nullable=True)
+
+
+class IdempotencyKeyModel(Base):
+    """
+    Ответы на запросы с заголовком Idempotency-Key (повторы мобильных клиентов).
+    status_code IS NULL — запрос еще выполняется. Ключ действует в пределах пользователя до expires_at.
+    """
+    __tablename__ = "idempotency_keys"
+    user_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key: Mapped[str] = orm.mapped_column(sa.String(255), primary_key=True)
+    fingerprint: Mapped[str] = orm.mapped_column(sa.String(64), nullable=False)
+    status_code: Mapped[Optional[int]] = orm.mapped_column(sa.SmallInteger, nullable=True)
+    body: Mapped[Optional[dict]] = orm.mapped_column(sa.JSON, nullable=True)
+    headers: Mapped[Optional[dict]] = orm.mapped_column(sa.JSON, nullable=True)
+    created_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
+    expires_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), nullable=False, index=True)
+
+
+class DepartmentShardModel(Base):
+    """
+    Карта шардов (TASK_SHARD_URLS): задачи и комментарии отдела живут в БД с этим номером.
+    Отделы без записи — в шарде 0, то есть в основной БД. Меняется только через `sharding move`.
+    """
+    __tablename__ = "department_shards"
+    department_id: Mapped[UUID] = orm.mapped_column(sa.ForeignKey("departments.id", ondelete="CASCADE"), primary_key=True)
+    shard: Mapped[int] = orm.mapped_column(sa.SmallInteger, nullable=False)
+    updated_at: Mapped[datetime] = orm.mapped_column(UtcDateTime(), server_default=utc_now())
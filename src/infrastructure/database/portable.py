@@ -0,0 +1,158 @@
+from datetime import timezone
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement, ReturnTypeFromArgs
+
+from src.core.config import getenv
+
+# Встраиваемый режим (один узел, тесты): DATABASE_URL=sqlite+aiosqlite:///./tasks.db
+# Соединение SQLite живет в процессе, поэтому PRAGMA выставляются на каждое новое соединение.
+SQLITE_PRAGMAS = (
+    # Читатели не блокируют писателя и наоборот
+    "journal_mode=WAL",
+    # В WAL fsync только на checkpoint: коммит не ждет диска, целостность сохраняется
+    "synchronous=NORMAL",
+    "foreign_keys=ON",
+    # Второй писатель ждет блокировку вместо мгновенного "database is locked"
+    f"busy_timeout={int(getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+    "temp_store=MEMORY",
+    # Отрицательное значение — размер кэша страниц в КиБ на соединение
+    f"cache_size=-{int(getenv('SQLITE_CACHE_SIZE_KB', '65536'))}",
+    f"mmap_size={int(getenv('SQLITE_MMAP_SIZE_MB', '256')) * 1024 * 1024}",
+)
+
+
+def is_sqlite_url(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str) -> dict:
+    """Параметры create_async_engine для URL: у SQLite в памяти один StaticPool без размеров пула."""
+    if is_sqlite_url(url) and (":memory:" in url or "mode=memory" in url):
+        return {}
+    return {
+        "pool_size": int(getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(getenv("DB_MAX_OVERFLOW", "10")),
+        # Короткий таймаут: лучше быстро отдать 503, чем держать запрос в очереди пула
+        "pool_timeout": float(getenv("DB_POOL_TIMEOUT", "5")),
+    }
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def install_sqlite_pragmas(engine: AsyncEngine) -> None:
+    """PRAGMA и функции приложения на каждое новое соединение SQLite (движки приложения, шардов и Alembic)."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+        # Встроенный lower() в SQLite переводит в нижний регистр только ASCII: "Иван" остался бы "Иван".
+        # casefold() из Python — для поиска по справочнику и индексов ix_users_*_casefold.
+        # deterministic: без этого SQLite не разрешает функцию в индексе по выражению
+        dbapi_connection.create_function("casefold", 1, _casefold, deterministic=True)
+
+
+def dialect_name(session: AsyncSession) -> str:
+    return session.get_bind().dialect.name
+
+
+def upsert(session: AsyncSession, table):
+    """INSERT диалекта сессии: у postgresql и sqlite одинаковые on_conflict_do_update/do_nothing и excluded."""
+    return (sqlite.insert if dialect_name(session) == "sqlite" else postgresql.insert)(table)
+
+
+# --- ТИПЫ ---
+class UtcDateTime(sa.TypeDecorator):
+    """
+    timestamptz в Postgres. SQLite хранит время строкой без зоны: пишем UTC и возвращаем aware-datetime,
+    иначе сравнение с datetime.now(timezone.utc) в домене падает на naive/aware.
+    """
+    impl = sa.DateTime
+    cache_ok = True
+
+    def __init__(self):
+        super().__init__(timezone=True)
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+# --- ВЫРАЖЕНИЯ ---
+class utc_now(FunctionElement):
+    """Текущее время UTC на стороне БД — для server_default и выражений."""
+    type = UtcDateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _utc_now(element, compiler, **kw):
+    return "TIMEZONE('utc', now())"
+
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    # Формат хранения DateTime в SQLAlchemy: "YYYY-MM-DD HH:MM:SS.ffffff" — строки сравниваются по времени
+    return "(strftime('%Y-%m-%d %H:%M:%f', 'now') || '000')"
+
+
+class greatest(ReturnTypeFromArgs):
+    """GREATEST(a, b, ...): NULL-аргументы пропускаются, как в Postgres."""
+    inherit_cache = True
+
+    def __init__(self, *args, **kwargs):
+        # Значения из Python получают тип колонки (UtcDateTime), а не голый DateTime
+        def is_sql(arg) -> bool:
+            return isinstance(arg, sa.ClauseElement) or hasattr(arg, "__clause_element__")
+
+        column = next((arg for arg in args if is_sql(arg)), None)
+        if column is not None:
+            args = [arg if is_sql(arg) else sa.literal(arg, column.type) for arg in args]
+        super().__init__(*args, **kwargs)
+
+
+@compiles(greatest, "sqlite")
+def _greatest_sqlite(element, compiler, **kw):
+    # Скалярный max() в SQLite возвращает NULL, если NULL хоть один аргумент, — подменяем NULL соседями
+    args = list(element.clauses)
+    if len(args) < 2:
+        raise ValueError("greatest() needs at least two arguments")
+    coalesced = [
+        "coalesce(%s)" % ", ".join(compiler.process(arg, **kw) for arg in [args[i]] + args[:i] + args[i + 1:])
+        for i in range(len(args))
+    ]
+    return "max(%s)" % ", ".join(coalesced)
+
+
+class epoch(FunctionElement):
+    """Секунды Unix-времени (double) из timestamp-колонки."""
+    type = sa.Double()
+    inherit_cache = True
+
+
+@compiles(epoch)
+def _epoch(element, compiler, **kw):
+    return "CAST(EXTRACT(EPOCH FROM %s) AS DOUBLE PRECISION)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch, "sqlite")
+def _epoch_sqlite(element, compiler, **kw):
+    # 2440587.5 — юлианский день 1970-01-01 00:00 UTC
+    return "((julianday(%s) - 2440587.5) * 86400.0)" % compiler.process(element.clauses, **kw)
+
@@ -1,23 +1,43 @@
-import os
+import asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from dotenv import load_dotenv
+from src.core.config import getenv
+from src.infrastructure.database.portable import engine_options, install_sqlite_pragmas
 
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the environment variables")
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True
-)
+# postgresql+asyncpg://... — основной режим; sqlite+aiosqlite:///файл — один узел и тесты (WAL, PRAGMA из portable)
+engine = create_async_engine(DATABASE_URL, echo=False, future=True, **engine_options(DATABASE_URL))
+install_sqlite_pragmas(engine)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
     autoflush=False
-)
\ No newline at end of file
+)
+
+
+async def warm_up_pool(count: int = int(getenv("DB_WARM_CONNECTIONS", getenv("DB_POOL_SIZE", "5")))) -> int:
+    """
+    Открывает `count` соединений одновременно и возвращает их в пул.
+    Первый пользовательский запрос не платит за TCP/auth/handshake и инициализацию диалекта.
+    """
+    # Overflow-соединения пул при возврате закрывает, поэтому больше pool_size греть бессмысленно
+    # У StaticPool (SQLite в памяти) размера нет: одно соединение на процесс
+    count = min(count, engine.pool.size()) if hasattr(engine.pool, "size") else 0
+    if count <= 0:
+        return 0
+    barrier = asyncio.Barrier(count)
+
+    async def _open_one():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            # Держим соединение, пока не откроются остальные, — иначе пул переиспользует одно и то же
+            await barrier.wait()
+
+    await asyncio.gather(*(_open_one() for _ in range(count)))
+    return count
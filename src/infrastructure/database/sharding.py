@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from uuid import UUID
+import sqlalchemy as sa
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from src.core.config import getenv
+from src.infrastructure.database.models import TaskModel, CommentModel, TaskDependencyModel, DepartmentShardModel
+from src.infrastructure.database.portable import engine_options, install_sqlite_pragmas, upsert, utc_now
+from src.infrastructure.repositories.cached_task_repository import LruTtlCache
+
+logger = logging.getLogger(__name__)
+
+# Дополнительные БД для задач и комментариев: шарды 1..N. Шард 0 — всегда основная БД (DATABASE_URL).
+SHARD_URLS = [url.strip() for url in getenv("TASK_SHARD_URLS", "").split(",") if url.strip()]
+SHARDED_TABLES = (TaskModel.__table__, CommentModel.__table__)
+
+
+def shard_metadata() -> sa.MetaData:
+    """
+    Схема tasks/comments для шардов 1..N. Пользователи и отделы живут только в основной БД,
+    поэтому внешние ключи остаются лишь comments -> tasks (подзадача может жить на другом шарде).
+    """
+    metadata = sa.MetaData()
+    for source in SHARDED_TABLES:
+        table = sa.Table(source.name, metadata, *[
+            sa.Column(
+                column.name, column.type, primary_key=column.primary_key, nullable=column.nullable,
+                server_default=sa.DefaultClause(column.server_default.arg) if column.server_default else None
+            )
+            for column in source.columns
+        ])
+        for index in source.indexes:
+            sa.Index(
+                index.name, *[table.c[column.name] for column in index.columns],
+                unique=index.unique, **index.dialect_kwargs
+            )
+    metadata.tables["comments"].append_constraint(
+        sa.ForeignKeyConstraint(["task_id"], ["tasks.id"], ondelete="CASCADE")
+    )
+    return metadata
+
+
+class ShardSet:
+    """
+    Пулы соединений шардов и карта "отдел -> шард" (таблица department_shards в основной БД).
+    Карта перечитывается каждые SHARD_MAP_REFRESH секунд: перенос отдела в другом процессе виден всем воркерам.
+    locations — подсказки "задача -> шард" для чтений по id без отдела; промах означает параллельный поиск.
+    """
+
+    def __init__(
+            self,
+            primary: async_sessionmaker,
+            urls: List[str] = SHARD_URLS,
+            refresh_interval: float = float(getenv("SHARD_MAP_REFRESH", "30"))
+    ):
+        self.primary = primary
+        self.refresh_interval = refresh_interval
+        self.engines = [create_async_engine(url, **engine_options(url)) for url in urls]
+        for engine in self.engines:
+            install_sqlite_pragmas(engine)
+        self.factories: List[async_sessionmaker] = [primary] + [
+            async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+            for engine in self.engines
+        ]
+        self.assignments: Dict[UUID, int] = {}
+        self.locations: LruTtlCache[int] = LruTtlCache(int(getenv("SHARD_LOCATION_CACHE_SIZE", "100000")), 3600)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ids(self) -> range:
+        return range(len(self.factories))
+
+    def shard_for(self, department_id: Optional[UUID]) -> int:
+        return self.assignments.get(department_id, 0) if department_id else 0
+
+    async def reload(self) -> None:
+        async with self.primary() as session:
+            rows = (await session.execute(select(DepartmentShardModel.department_id, DepartmentShardModel.shard))).all()
+        invalid = [shard for _, shard in rows if shard not in self.ids]
+        if invalid:
+            raise RuntimeError(f"department_shards references shards {sorted(set(invalid))}, but only {len(self.ids)} are configured")
+        self.assignments = {department_id: shard for department_id, shard in rows}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Shard map refresh error")
+
+    async def start(self) -> None:
+        await self.reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+    # --- ОБСЛУЖИВАНИЕ ---
+    async def init_schema(self) -> None:
+        """Создает tasks/comments на шардах 1..N (идемпотентно). Шард 0 ведут обычные миграции Alembic."""
+        metadata = shard_metadata()
+        for engine in self.engines:
+            async with engine.begin() as conn:
+                await conn.run_sync(metadata.create_all)
+
+    async def counts(self) -> List[int]:
+        async def count(shard: int) -> int:
+            async with self.factories[shard]() as session:
+                return (await session.execute(select(func.count()).select_from(TaskModel))).scalar_one()
+        return list(await asyncio.gather(*(count(shard) for shard in self.ids)))
+
+    async def move_department(self, department_id: UUID, target: int, batch_size: int = 1000) -> int:
+        """
+        Переносит задачи и комментарии отдела на другой шард пачками и меняет карту.
+        Запись в задачи отдела на время переноса должна быть остановлена. Повторный запуск после сбоя
+        безопасен: вставка на целевом шарде — ON CONFLICT DO NOTHING.
+        """
+        if target not in self.ids:
+            raise ValueError(f"Shard {target} is not configured")
+        await self.reload()
+        source = self.shard_for(department_id)
+        moved = 0
+        if source != target:
+            if source == 0:
+                # Граф зависимостей живет только в основной БД: удаление задач отсюда молча стерло бы ребра
+                async with self.primary() as session:
+                    linked = (await session.execute(
+                        select(func.count()).select_from(TaskDependencyModel).join(
+                            TaskModel,
+                            (TaskModel.id == TaskDependencyModel.task_id) | (TaskModel.id == TaskDependencyModel.depends_on_id)
+                        ).where(TaskModel.target_dept_id == department_id)
+                    )).scalar_one()
+                if linked:
+                    raise RuntimeError(f"Department has {linked} task dependencies; remove them before moving it off the primary")
+
+            async with self.factories[source]() as src, self.factories[target]() as dst:
+                while True:
+                    tasks = (await src.execute(
+                        select(TaskModel.__table__).where(TaskModel.target_dept_id == department_id).limit(batch_size)
+                    )).mappings().all()
+                    if not tasks:
+                        break
+                    ids = [row["id"] for row in tasks]
+                    comments = (await src.execute(
+                        select(CommentModel.__table__).where(CommentModel.task_id.in_(ids))
+                    )).mappings().all()
+
+                    await dst.execute(
+                        upsert(dst, TaskModel.__table__).on_conflict_do_nothing(), [dict(row) for row in tasks]
+                    )
+                    if comments:
+                        await dst.execute(
+                            upsert(dst, CommentModel.__table__).on_conflict_do_nothing(), [dict(row) for row in comments]
+                        )
+                    await dst.commit()
+
+                    await src.execute(delete(CommentModel).where(CommentModel.task_id.in_(ids)))
+                    await src.execute(delete(TaskModel).where(TaskModel.id.in_(ids)))
+                    await src.commit()
+                    moved += len(ids)
+
+        async with self.primary() as session:
+            await session.execute(
+                upsert(session, DepartmentShardModel)
+                .values(department_id=department_id, shard=target)
+                .on_conflict_do_update(
+                    index_elements=[DepartmentShardModel.department_id],
+                    set_={"shard": target, "updated_at": utc_now()}
+                )
+            )
+            await session.commit()
+        self.assignments[department_id] = target
+        return moved
+
+
+async def main() -> None:
+    """python -m src.infrastructure.database.sharding init | status | move <department_id> <shard>"""
+    from src.infrastructure.database.session import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Manage department-based task shards (TASK_SHARD_URLS)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init", help="Create tasks/comments tables on shards 1..N")
+    commands.add_parser("status", help="Show the shard map and task counts")
+    move = commands.add_parser("move", help="Move a department's tasks to another shard")
+    move.add_argument("department_id", type=UUID)
+    move.add_argument("shard", type=int)
+    move.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    shards = ShardSet(AsyncSessionLocal)
+    try:
+        if args.command == "init":
+            await shards.init_schema()
+            print(f"Initialised {len(shards.engines)} shard(s).")
+        elif args.command == "status":
+            await shards.reload()
+            for shard, count in zip(shards.ids, await shards.counts()):
+                departments = [str(d) for d, s in shards.assignments.items() if s == shard]
+                print(f"shard {shard}: {count} tasks, departments: {', '.join(departments) or ('(default)' if shard == 0 else '-')}")
+        else:
+            moved = await shards.move_department(args.department_id, args.shard, args.batch_size)
+            print(f"Moved {moved} tasks of department {args.department_id} to shard {args.shard}.")
+    finally:
+        await shards.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
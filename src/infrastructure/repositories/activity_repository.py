@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from typing import List
+from uuid import UUID
+from sqlalchemy import select, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import ActivityEvent, ActivityAction
+from src.infrastructure.database.models import ActivityModel
+from src.infrastructure.database.portable import dialect_name
+
+
+def _month_start(year: int, month: int) -> datetime:
+    # Нормализуем переполнение месяца (13 -> январь следующего года)
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+class ActivityRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _to_domain(self, model: ActivityModel) -> ActivityEvent:
+        return ActivityEvent(
+            id=model.id,
+            entity_type=model.entity_type,
+            entity_id=model.entity_id,
+            actor_id=model.actor_id,
+            action=ActivityAction(model.action),
+            old_value=model.old_value,
+            new_value=model.new_value,
+            created_at=model.created_at
+        )
+
+    async def insert_many(self, events: List[ActivityEvent]) -> None:
+        """Один многострочный INSERT на всю пачку (executemany)."""
+        if not events:
+            return
+        await self.session.execute(insert(ActivityModel), [
+            {
+                "id": e.id,
+                "created_at": e.created_at,
+                "entity_type": e.entity_type,
+                "entity_id": e.entity_id,
+                "actor_id": e.actor_id,
+                "action": e.action.value,
+                "old_value": e.old_value,
+                "new_value": e.new_value,
+            } for e in events
+        ])
+        await self.session.commit()
+
+    async def get_history(self, entity_id: UUID, limit: int = 100) -> List[ActivityEvent]:
+        query = (
+            select(ActivityModel)
+            .where(ActivityModel.entity_id == entity_id)
+            .order_by(ActivityModel.created_at.asc())
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    async def ensure_month_partitions(self, months_ahead: int = 2) -> None:
+        """Создает месячные секции activity_log на текущий и следующие месяцы (идемпотентно)."""
+        if dialect_name(self.session) != "postgresql":
+            # В SQLite секционирования нет: журнал — одна таблица
+            return
+        now = datetime.now(timezone.utc)
+        for i in range(months_ahead + 1):
+            start = _month_start(now.year, now.month + i)
+            end = _month_start(start.year, start.month + 1)
+            await self.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS activity_log_{start:%Y_%m} PARTITION OF activity_log "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+        await self.session.commit()
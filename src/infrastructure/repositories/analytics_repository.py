@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import select, func, cast, union_all, String
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import TaskStatus
+from src.infrastructure.database.models import TaskModel, tasks_archive
+from src.infrastructure.database.portable import dialect_name, epoch
+
+FINISHED_STATUSES = (TaskStatus.DONE.value, TaskStatus.CANCELLED.value)
+
+
+class AnalyticsRepository:
+    """
+    Колоночные выгрузки задач для аналитики.
+    Каждая выгрузка — один запрос и одна строка: колонки приходят массивами (array_agg),
+    asyncpg декодирует их в C, без построчной материализации и pydantic.
+    В SQLite массивов нет — там те же колонки читаются построчно и транспонируются.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _columns(self, query, *columns) -> List[list]:
+        if dialect_name(self.session) == "postgresql":
+            row = (await self.session.execute(query.with_only_columns(*[func.array_agg(c) for c in columns]))).one()
+            return [list(values or []) for values in row]
+        rows = (await self.session.execute(query.with_only_columns(*columns))).all()
+        return [list(values) for values in zip(*rows)] or [[] for _ in columns]
+
+    async def finished_columns(self, since: datetime, department_id: Optional[UUID] = None) -> Dict[str, List[float]]:
+        """
+        created_at и момент завершения (updated_at) задач, закрытых в DONE не раньше since, — горячие и архив.
+        DONE — конечный статус (Task.update_status), поэтому updated_at таких задач и есть время завершения.
+        """
+        def done(table):
+            query = select(table.c.created_at, table.c.updated_at).where(
+                table.c.status == TaskStatus.DONE.value, table.c.updated_at >= since
+            )
+            if department_id:
+                query = query.where(table.c.target_dept_id == department_id)
+            return query
+
+        rows = union_all(done(TaskModel.__table__), done(tasks_archive)).subquery()
+        created, finished = await self._columns(
+            select(rows), epoch(rows.c.created_at), epoch(rows.c.updated_at)
+        )
+        return {"created": created, "finished": finished}
+
+    async def open_columns(self, department_id: Optional[UUID] = None) -> Dict[str, list]:
+        """Исполнитель, отдел и дедлайн (epoch, NaN если нет) всех открытых задач. Открытые живут только в tasks."""
+        query = select(TaskModel.id).where(TaskModel.status.not_in(FINISHED_STATUSES))
+        if department_id:
+            query = query.where(TaskModel.target_dept_id == department_id)
+        if dialect_name(self.session) == "postgresql":
+            executors, departments, deadlines = await self._columns(
+                query,
+                func.coalesce(cast(TaskModel.executor_id, String), ""),
+                func.coalesce(cast(TaskModel.target_dept_id, String), ""),
+                func.coalesce(epoch(TaskModel.deadline), float("nan"))
+            )
+        else:
+            # SQLite хранит UUID без дефисов, а NaN превращает в NULL — приводим к виду, который отдает Postgres
+            executors, departments, deadlines = await self._columns(
+                query, TaskModel.executor_id, TaskModel.target_dept_id, epoch(TaskModel.deadline)
+            )
+            executors = [str(value) if value else "" for value in executors]
+            departments = [str(value) if value else "" for value in departments]
+            deadlines = [float("nan") if value is None else value for value in deadlines]
+        return {"executor": executors, "department": departments, "deadline": deadlines}
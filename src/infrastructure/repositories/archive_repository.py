@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from typing import List, Tuple
+from uuid import UUID
+from sqlalchemy import select, insert, delete, exists, func, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import TaskStatus
+from src.infrastructure.database.models import TaskModel, CommentModel, TaskDependencyModel, tasks_archive, comments_archive
+from src.infrastructure.database.portable import dialect_name
+
+FINISHED_STATUSES = (TaskStatus.DONE.value, TaskStatus.CANCELLED.value)
+
+TASK_COLUMNS = [c.name for c in tasks_archive.c if c.name != "archived_at"]
+COMMENT_COLUMNS = [c.name for c in comments_archive.c]
+
+
+class ArchiveRepository:
+    """Перенос завершенных задач из горячих таблиц в холодные (tasks_archive / comments_archive)."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def ensure_year_partitions(self) -> None:
+        """Годовые секции архива от самой старой горячей задачи до следующего года (идемпотентно)."""
+        if dialect_name(self.session) != "postgresql":
+            # В SQLite секционирования нет: архив — обычные таблицы
+            return
+        oldest = (await self.session.execute(select(func.min(TaskModel.created_at)))).scalar_one_or_none()
+        first_year = (oldest or datetime.now(timezone.utc)).year
+        last_year = datetime.now(timezone.utc).year + 1
+        for table in ("tasks_archive", "comments_archive"):
+            for year in range(first_year, last_year + 1):
+                await self.session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {table}_{year} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{year}-01-01 00:00:00+00') TO ('{year + 1}-01-01 00:00:00+00')"
+                ))
+        await self.session.commit()
+
+    async def archive_batch(self, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+        """
+        Переносит одну пачку задач, завершенных раньше cutoff, вместе с комментариями.
+        Всё в одной транзакции: задача либо целиком в горячей таблице, либо целиком в архиве.
+        """
+        # Архив не хранит связи: задачу с подзадачами в горячей таблице или с открытыми зависящими задачами
+        # не трогаем, иначе подзадачи потеряли бы parent_id (SET NULL), а блокеры — ребра графа (CASCADE).
+        # Завершенные подзадачи уходят в архив раньше родителя, и родитель догоняет их следующими проходами.
+        child, dependent = aliased(TaskModel), aliased(TaskModel)
+        has_hot_subtasks = exists().where(child.parent_id == TaskModel.id)
+        has_open_dependents = (
+            exists()
+            .where(TaskDependencyModel.depends_on_id == TaskModel.id)
+            .where(dependent.id == TaskDependencyModel.task_id, dependent.status.not_in(FINISHED_STATUSES))
+        )
+        victims = await self.session.execute(
+            select(TaskModel.id)
+            .where(TaskModel.status.in_(FINISHED_STATUSES), TaskModel.updated_at < cutoff)
+            .where(~has_hot_subtasks, ~has_open_dependents)
+            .order_by(TaskModel.updated_at.asc())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        ids: List[UUID] = list(victims.scalars().all())
+        if not ids:
+            return 0, 0
+
+        if dialect_name(self.session) != "postgresql":
+            return await self._move_portable(ids)
+
+        # 1. Комментарии (на них ссылается FK, поэтому первыми)
+        moved_comments = (
+            delete(CommentModel)
+            .where(CommentModel.task_id.in_(ids))
+            .returning(*[CommentModel.__table__.c[name] for name in COMMENT_COLUMNS])
+            .cte("moved_comments")
+        )
+        comments_result = await self.session.execute(
+            insert(comments_archive).from_select(COMMENT_COLUMNS, select(moved_comments))
+        )
+
+        # 2. Сами задачи
+        moved_tasks = (
+            delete(TaskModel)
+            .where(TaskModel.id.in_(ids))
+            .returning(*[TaskModel.__table__.c[name] for name in TASK_COLUMNS])
+            .cte("moved_tasks")
+        )
+        tasks_result = await self.session.execute(
+            insert(tasks_archive).from_select(TASK_COLUMNS, select(moved_tasks))
+        )
+
+        await self.session.commit()
+        return tasks_result.rowcount, comments_result.rowcount
+
+    async def _move_portable(self, ids: List[UUID]) -> Tuple[int, int]:
+        """SQLite не умеет DELETE ... RETURNING внутри CTE: копируем и удаляем двумя запросами в той же транзакции."""
+        comments_result = await self.session.execute(
+            insert(comments_archive).from_select(
+                COMMENT_COLUMNS,
+                select(*[CommentModel.__table__.c[name] for name in COMMENT_COLUMNS]).where(CommentModel.task_id.in_(ids))
+            )
+        )
+        tasks_result = await self.session.execute(
+            insert(tasks_archive).from_select(
+                TASK_COLUMNS,
+                select(*[TaskModel.__table__.c[name] for name in TASK_COLUMNS]).where(TaskModel.id.in_(ids))
+            )
+        )
+        await self.session.execute(delete(CommentModel).where(CommentModel.task_id.in_(ids)))
+        await self.session.execute(delete(TaskModel).where(TaskModel.id.in_(ids)))
+        await self.session.commit()
+        return tasks_result.rowcount, comments_result.rowcount
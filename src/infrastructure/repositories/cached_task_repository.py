@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+from uuid import UUID
+
+from src.domain.entities import Task, TaskStatus, TaskPriority, TaskSort, User, Comment
+from src.domain.interfaces import ITaskRepository
+from src.core.config import getenv
+
+V = TypeVar("V")
+
+
+class LruTtlCache(Generic[V]):
+    """Ограниченный LRU-кэш со сроком жизни записи. Однопоточный: живет в event loop процесса."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"size": len(self._data), "hit_ratio": round(self.hits / total, 3) if total else None}
+
+
+class TaskCache:
+    """Кэш задач и списков комментариев, общий для всех запросов процесса (app.state.task_cache)."""
+
+    def __init__(
+            self,
+            max_size: int = int(getenv("TASK_CACHE_SIZE", "10000")),
+            ttl: float = float(getenv("TASK_CACHE_TTL", "10"))
+    ):
+        self.tasks: LruTtlCache[Task] = LruTtlCache(max_size, ttl)
+        self.comments: LruTtlCache[List[Comment]] = LruTtlCache(max_size, ttl)
+
+    def invalidate(self, task_id: UUID) -> None:
+        self.tasks.pop(task_id)
+        self.comments.pop((task_id, False))
+        self.comments.pop((task_id, True))
+
+    def clear(self) -> None:
+        self.tasks.clear()
+        self.comments.clear()
+
+    def stats(self) -> dict:
+        return {"tasks": self.tasks.stats(), "comments": self.comments.stats()}
+
+
+class CachedTaskRepository(ITaskRepository):
+    """
+    Read-through декоратор над любым ITaskRepository.
+    get_by_id и get_comments читаются из TaskCache; save и add_comment сбрасывают свои записи.
+    Наружу отдаются копии: роуты меняют задачу до save, и неудачная попытка не должна испортить кэш.
+    Записи других воркеров видны не позже, чем через TASK_CACHE_TTL секунд.
+    Остальные методы (stream_rows, get_due, session и т.д.) прозрачно идут во внутренний репозиторий.
+    """
+
+    def __init__(self, inner: ITaskRepository, cache: TaskCache):
+        self.inner = inner
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    async def save(self, task: Task) -> Task:
+        # Конфликт версий чаще всего значит, что в кэше устаревшая копия, — выбрасываем ее в любом случае
+        self.cache.invalidate(task.id)
+        saved = await self.inner.save(task)
+        self.cache.tasks.put(saved.id, saved.model_copy())
+        return saved
+
+    async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
+        task = self.cache.tasks.get(task_id)
+        if task is not None:
+            return task.model_copy()
+        task = await self.inner.get_by_id(task_id, include_archived)
+        # Отсутствие не кэшируем: задачу могли только что создать в соседнем воркере
+        if task is not None:
+            self.cache.tasks.put(task_id, task.model_copy())
+        return task
+
+    async def get_many(self, task_ids: List[UUID]) -> List[Task]:
+        return await self.inner.get_many(task_ids)
+
+    async def get_all(
+            self,
+            user: User,
+            limit: int,
+            offset: int,
+            status: Optional[TaskStatus] = None,
+            priority: Optional[TaskPriority] = None,
+            deadline_start: Optional[datetime] = None,
+            deadline_end: Optional[datetime] = None,
+            include_archived: bool = False,
+            sort: TaskSort = TaskSort.CREATED_AT
+    ) -> List[Task]:
+        # Списки с фильтрами и пагинацией почти не повторяются — кэш тут только мешал бы инвалидации
+        return await self.inner.get_all(
+            user, limit, offset, status, priority, deadline_start, deadline_end, include_archived, sort
+        )
+
+    async def delete(self, task_id: UUID) -> bool:
+        self.cache.invalidate(task_id)
+        return await self.inner.delete(task_id)
+
+    async def add_comment(self, comment: Comment) -> Comment:
+        # Сбрасываем и саму задачу: у нее меняются comment_count и last_activity_at
+        self.cache.invalidate(comment.task_id)
+        return await self.inner.add_comment(comment)
+
+    async def get_comments(self, task_id: UUID, include_archived: bool = False) -> List[Comment]:
+        key = (task_id, include_archived)
+        comments = self.cache.comments.get(key)
+        if comments is None:
+            comments = await self.inner.get_comments(task_id, include_archived)
+            self.cache.comments.put(key, [c.model_copy() for c in comments])
+            return comments
+        return [c.model_copy() for c in comments]
+
+    async def get_comments_many(self, task_ids: List[UUID]) -> Dict[UUID, List[Comment]]:
+        # Из кэша — что есть, промахи — одним запросом во внутренний репозиторий
+        found: Dict[UUID, List[Comment]] = {}
+        for task_id in task_ids:
+            cached = self.cache.comments.get((task_id, False))
+            if cached is not None:
+                found[task_id] = [c.model_copy() for c in cached]
+        missing = [task_id for task_id in task_ids if task_id not in found]
+        if missing:
+            for task_id, comments in (await self.inner.get_comments_many(missing)).items():
+                self.cache.comments.put((task_id, False), [c.model_copy() for c in comments])
+                found[task_id] = comments
+        return found
+
+
+async def main() -> None:
+    """python -m src.infrastructure.repositories.cached_task_repository — бенчмарк кэша без Postgres."""
+    from src.infrastructure.repositories.memory_task_repository import InMemoryTaskRepository
+
+    parser = argparse.ArgumentParser(description="Benchmark CachedTaskRepository over InMemoryTaskRepository")
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated DB round trip")
+    args = parser.parse_args()
+
+    class SlowRepository(InMemoryTaskRepository):
+        async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
+            await asyncio.sleep(args.latency_ms / 1000)
+            return await super().get_by_id(task_id, include_archived)
+
+    inner = SlowRepository()
+    owner = UUID(int=1)
+    ids = [(await inner.save(Task(title=f"Task {i}", owner_id=owner))).id for i in range(args.tasks)]
+    hot = ids[:max(1, args.tasks // 10)]  # 90% чтений приходится на 10% задач
+
+    for name, repository in (("direct", inner), ("cached", CachedTaskRepository(inner, TaskCache()))):
+        started = time.perf_counter()
+        for i in range(args.reads):
+            task_id = hot[i % len(hot)] if i % 10 else ids[i % len(ids)]
+            await repository.get_by_id(task_id)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {args.reads / elapsed:,.0f} reads/sec")
+        if isinstance(repository, CachedTaskRepository):
+            print(repository.cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,17 @@
+from typing import List
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.domain.entities import Department
+from src.infrastructure.database.models import DepartmentModel
+
+
+class DepartmentRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_many(self, department_ids: List[UUID]) -> List[Department]:
+        if not department_ids:
+            return []
+        result = await self.session.execute(select(DepartmentModel).where(DepartmentModel.id.in_(department_ids)))
+        return [Department.model_validate(model) for model in result.scalars().all()]
@@ -0,0 +1,75 @@
+from typing import List, Tuple
+from uuid import UUID
+from sqlalchemy import select, delete, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import TaskStatus
+from src.domain.graph import CycleError
+from src.infrastructure.database.models import TaskDependencyModel, TaskModel
+from src.infrastructure.database.portable import dialect_name
+
+
+class DependencyRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, task_id: UUID, depends_on_id: UUID) -> None:
+        """
+        Добавляет ребро с авторитетной проверкой цикла в БД.
+        Вставки рёбер сериализуются: две встречные связи не проскочат одновременно.
+        """
+        edge = TaskDependencyModel(task_id=task_id, depends_on_id=depends_on_id)
+        if dialect_name(self.session) == "postgresql":
+            # Advisory-lock сериализует только вставки рёбер, а не всю таблицу
+            await self.session.execute(text("SELECT pg_advisory_xact_lock(hashtext('task_dependencies'))"))
+        else:
+            # В SQLite запись берет единственную блокировку БД: вставляем ребро до проверки,
+            # и встречная вставка ждет нашего коммита или отката
+            self.session.add(edge)
+            await self.session.flush()
+
+        # Всё, что достижимо из depends_on_id; если там task_id — ребро замкнет цикл
+        reach = select(literal(depends_on_id, TaskDependencyModel.depends_on_id.type).label("id")).cte("reach", recursive=True)
+        reach = reach.union(
+            select(TaskDependencyModel.depends_on_id).join(reach, TaskDependencyModel.task_id == reach.c.id)
+        )
+        cycle = await self.session.execute(select(literal(1)).select_from(reach).where(reach.c.id == task_id).limit(1))
+        if cycle.first() is not None:
+            await self.session.rollback()
+            raise CycleError("Dependency would create a cycle.")
+
+        self.session.add(edge)
+        await self.session.commit()
+
+    async def exists(self, task_id: UUID, depends_on_id: UUID) -> bool:
+        result = await self.session.execute(
+            select(literal(1)).where(
+                TaskDependencyModel.task_id == task_id,
+                TaskDependencyModel.depends_on_id == depends_on_id
+            )
+        )
+        return result.first() is not None
+
+    async def remove(self, task_id: UUID, depends_on_id: UUID) -> bool:
+        result = await self.session.execute(
+            delete(TaskDependencyModel).where(
+                TaskDependencyModel.task_id == task_id,
+                TaskDependencyModel.depends_on_id == depends_on_id
+            )
+        )
+        await self.session.commit()
+        return result.rowcount > 0
+
+    async def load_graph(self) -> Tuple[List[Tuple[UUID, UUID]], List[Tuple[UUID, TaskStatus]]]:
+        """Все рёбра и статусы задач, которые в них участвуют, — для заполнения кэша графа."""
+        edges = (await self.session.execute(
+            select(TaskDependencyModel.task_id, TaskDependencyModel.depends_on_id)
+        )).all()
+        node_ids = select(TaskDependencyModel.task_id).union(select(TaskDependencyModel.depends_on_id))
+        statuses = (await self.session.execute(
+            select(TaskModel.id, TaskModel.status).where(TaskModel.id.in_(node_ids))
+        )).all()
+        return (
+            [(row[0], row[1]) for row in edges],
+            [(row[0], TaskStatus(row[1])) for row in statuses]
+        )
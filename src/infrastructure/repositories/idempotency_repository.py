@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, update, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.database.models import IdempotencyKeyModel
+from src.infrastructure.database.portable import upsert
+
+
+class IdempotencyRepository:
+    """Хранилище ключей идемпотентности. Каждый метод — своя короткая транзакция, отдельно от бизнес-записи."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim(self, user_id: UUID, key: str, fingerprint: str, expires_at: datetime) -> bool:
+        """
+        Занимает ключ под выполнение запроса до expires_at (короткая аренда).
+        False — ключ уже занят (выполняется или есть ответ).
+        Просроченную запись — и готовый ответ после TTL, и аренду упавшего воркера — перезанимаем тем же запросом.
+        """
+        now = datetime.now(timezone.utc)
+        query = (
+            upsert(self.session, IdempotencyKeyModel)
+            .values(user_id=user_id, key=key, fingerprint=fingerprint, expires_at=expires_at)
+            .on_conflict_do_update(
+                index_elements=[IdempotencyKeyModel.user_id, IdempotencyKeyModel.key],
+                set_={
+                    "fingerprint": fingerprint, "status_code": None, "body": None, "headers": None,
+                    "created_at": now, "expires_at": expires_at
+                },
+                where=IdempotencyKeyModel.expires_at < now
+            )
+            .returning(IdempotencyKeyModel.key)
+        )
+        claimed = (await self.session.execute(query)).first() is not None
+        await self.session.commit()
+        return claimed
+
+    async def get(self, user_id: UUID, key: str) -> Optional[IdempotencyKeyModel]:
+        query = select(IdempotencyKeyModel).where(
+            IdempotencyKeyModel.user_id == user_id,
+            IdempotencyKeyModel.key == key,
+            IdempotencyKeyModel.expires_at >= datetime.now(timezone.utc)
+        )
+        return (await self.session.execute(query)).scalar_one_or_none()
+
+    async def complete(
+            self, user_id: UUID, key: str, status_code: int, body, headers: dict, expires_at: datetime
+    ) -> None:
+        """Сохраняет ответ и продлевает запись с аренды до полного TTL."""
+        await self.session.execute(
+            update(IdempotencyKeyModel)
+            .where(IdempotencyKeyModel.user_id == user_id, IdempotencyKeyModel.key == key)
+            .values(status_code=status_code, body=body, headers=headers, expires_at=expires_at)
+        )
+        await self.session.commit()
+
+    async def release(self, user_id: UUID, key: str) -> None:
+        """Запрос упал — освобождаем ключ, чтобы повтор клиента выполнился заново."""
+        await self.session.execute(
+            delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.user_id == user_id,
+                IdempotencyKeyModel.key == key,
+                IdempotencyKeyModel.status_code.is_(None)
+            )
+        )
+        await self.session.commit()
+
+    async def purge_expired(self, batch_size: int = 10000) -> int:
+        victims = (
+            select(IdempotencyKeyModel.user_id, IdempotencyKeyModel.key)
+            .where(IdempotencyKeyModel.expires_at < datetime.now(timezone.utc))
+            .limit(batch_size)
+        )
+        result = await self.session.execute(
+            delete(IdempotencyKeyModel).where(
+                tuple_(IdempotencyKeyModel.user_id, IdempotencyKeyModel.key).in_(victims)
+            )
+        )
+        await self.session.commit()
+        return result.rowcount
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from src.domain.entities import Task, TaskStatus, TaskPriority, TaskSort, User, UserRole, Comment
+from src.domain.interfaces import ITaskRepository, ConcurrentModificationError
+
+
+def _visible(task: Task, user: User) -> bool:
+    """Те же правила видимости, что и TaskRepository._visibility, но для объектов в памяти."""
+    if user.role == UserRole.ADMIN:
+        return True
+    if user.role == UserRole.MANAGER:
+        if user.department_id:
+            return task.target_dept_id == user.department_id or task.owner_id == user.id
+        return task.owner_id == user.id
+    return user.id in (task.owner_id, task.executor_id)
+
+
+class InMemoryTaskRepository(ITaskRepository):
+    """
+    Эталонная реализация ITaskRepository без БД — для тестов и бенчмарков кэша и логики роутов.
+    Хранит копии: изменение возвращенной задачи не меняет хранилище, как и с Postgres.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[UUID, Task] = {}
+        self.comments: Dict[UUID, List[Comment]] = {}
+
+    async def save(self, task: Task) -> Task:
+        stored = self.tasks.get(task.id)
+        current = stored.version if stored else 0
+        if task.version != current:
+            raise ConcurrentModificationError(task.id, task.version)
+        # Счетчик комментариев ведет хранилище: копия задачи у вызывающего могла устареть
+        comment_count = stored.comment_count if stored else 0
+        last_activity_at = max(filter(None, (stored and stored.last_activity_at, task.updated_at)))
+        self.tasks[task.id] = task.model_copy(update={
+            "version": current + 1, "comment_count": comment_count, "last_activity_at": last_activity_at
+        })
+        return self.tasks[task.id].model_copy()
+
+    async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
+        task = self.tasks.get(task_id)
+        return task.model_copy() if task else None
+
+    async def get_many(self, task_ids: List[UUID]) -> List[Task]:
+        return [self.tasks[task_id].model_copy() for task_id in task_ids if task_id in self.tasks]
+
+    async def get_visible(self, user: User, task_ids: List[UUID]) -> List[Task]:
+        return [task for task in await self.get_many(task_ids) if _visible(task, user)]
+
+    async def get_all(
+            self,
+            user: User,
+            limit: int,
+            offset: int,
+            status: Optional[TaskStatus] = None,
+            priority: Optional[TaskPriority] = None,
+            deadline_start: Optional[datetime] = None,
+            deadline_end: Optional[datetime] = None,
+            include_archived: bool = False,
+            sort: TaskSort = TaskSort.CREATED_AT
+    ) -> List[Task]:
+        def matches(task: Task) -> bool:
+            if not _visible(task, user):
+                return False
+            if status and task.status != status:
+                return False
+            if priority and task.priority != priority:
+                return False
+            if deadline_start and (task.deadline is None or task.deadline < deadline_start):
+                return False
+            if deadline_end and (task.deadline is None or task.deadline > deadline_end):
+                return False
+            return True
+
+        keys = {
+            TaskSort.CREATED_AT: lambda t: (t.created_at, t.id),
+            TaskSort.LAST_ACTIVITY: lambda t: (t.last_activity_at, t.id),
+            TaskSort.COMMENT_COUNT: lambda t: (t.comment_count, t.last_activity_at, t.id),
+        }
+        found = sorted(filter(matches, self.tasks.values()), key=keys[sort], reverse=True)
+        return [task.model_copy() for task in found[offset:offset + limit]]
+
+    async def delete(self, task_id: UUID) -> bool:
+        self.comments.pop(task_id, None)
+        return self.tasks.pop(task_id, None) is not None
+
+    async def add_comment(self, comment: Comment) -> Comment:
+        self.comments.setdefault(comment.task_id, []).append(comment.model_copy())
+        task = self.tasks.get(comment.task_id)
+        if task is not None:
+            task.comment_count += 1
+            task.last_activity_at = max(task.last_activity_at, comment.created_at)
+        return comment.model_copy()
+
+    async def get_comments(self, task_id: UUID, include_archived: bool = False) -> List[Comment]:
+        return sorted(
+            (c.model_copy() for c in self.comments.get(task_id, [])), key=lambda c: c.created_at
+        )
+
+    async def get_comments_many(self, task_ids: List[UUID]) -> Dict[UUID, List[Comment]]:
+        return {task_id: await self.get_comments(task_id) for task_id in task_ids}
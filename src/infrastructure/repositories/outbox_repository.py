@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict
+from uuid import UUID
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Notification, NotificationKind, OutboxStatus
+from src.infrastructure.database.models import OutboxModel, UserModel
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _to_domain(self, model: OutboxModel) -> Notification:
+        return Notification(
+            id=model.id,
+            kind=NotificationKind(model.kind),
+            recipient_email=model.recipient_email,
+            recipient_id=model.recipient_id,
+            subject=model.subject,
+            body=model.body,
+            created_at=model.created_at
+        )
+
+    def enqueue(self, notification: Notification) -> None:
+        """
+        Кладет уведомление в сессию БЕЗ коммита.
+        Коммит делает вызывающий код вместе с бизнес-изменением — это и есть transactional outbox.
+        """
+        self.session.add(OutboxModel(
+            id=notification.id,
+            kind=notification.kind.value,
+            recipient_email=notification.recipient_email,
+            recipient_id=notification.recipient_id,
+            subject=notification.subject,
+            body=notification.body,
+            status=OutboxStatus.PENDING.value,
+            attempts=0,
+            next_attempt_at=notification.created_at,
+            created_at=notification.created_at
+        ))
+
+    async def claim_batch(self, limit: int) -> List[Notification]:
+        """
+        Забирает пачку готовых к отправке сообщений.
+        SKIP LOCKED позволяет запускать несколько диспетчеров (по одному на воркер) без двойной отправки.
+        """
+        query = (
+            select(OutboxModel)
+            .where(
+                OutboxModel.status == OutboxStatus.PENDING.value,
+                OutboxModel.next_attempt_at <= datetime.now(timezone.utc)
+            )
+            .order_by(OutboxModel.next_attempt_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(query)
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    async def resolve_recipients(self, notifications: List[Notification]) -> None:
+        """Подставляет email по recipient_id одним запросом на всю пачку."""
+        ids = {n.recipient_id for n in notifications if n.recipient_email is None and n.recipient_id}
+        if not ids:
+            return
+        result = await self.session.execute(select(UserModel.id, UserModel.email).where(UserModel.id.in_(ids)))
+        emails: Dict[UUID, str] = {row.id: row.email for row in result}
+        for n in notifications:
+            if n.recipient_email is None and n.recipient_id in emails:
+                n.recipient_email = emails[n.recipient_id]
+
+    async def mark_sent(self, ids: List[UUID]) -> None:
+        if not ids:
+            return
+        await self.session.execute(
+            update(OutboxModel)
+            .where(OutboxModel.id.in_(ids))
+            .values(status=OutboxStatus.SENT.value, sent_at=datetime.now(timezone.utc), last_error=None)
+        )
+
+    async def mark_failed(self, message_id: UUID, error: str, max_attempts: int, base_delay: float) -> None:
+        """Повтор с экспоненциальной задержкой; после max_attempts сообщение паркуется в FAILED."""
+        model = await self.session.get(OutboxModel, message_id)
+        if model is None:
+            return
+        model.attempts += 1
+        model.last_error = error[:1000]
+        if model.attempts >= max_attempts:
+            model.status = OutboxStatus.FAILED.value
+        else:
+            model.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=base_delay * 2 ** (model.attempts - 1))
@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Task, TaskStatus, TaskPriority, TaskSort, User, Comment
+from src.domain.interfaces import ITaskRepository
+from src.infrastructure.database.sharding import ShardSet
+from src.infrastructure.repositories.task_repository import TaskRepository
+
+
+def _sort_key(sort: TaskSort) -> Callable[[Task], tuple]:
+    """Тот же порядок, что TaskRepository._ordering: ответы шардов уже отсортированы, остается слить их."""
+    if sort == TaskSort.LAST_ACTIVITY:
+        return lambda t: (t.last_activity_at, t.id)
+    if sort == TaskSort.COMMENT_COUNT:
+        return lambda t: (t.comment_count, t.last_activity_at, t.id)
+    return lambda t: (t.created_at, t.id)
+
+
+class ShardedTaskRepository(ITaskRepository):
+    """
+    ITaskRepository поверх шардов: задача и её комментарии живут в БД своего отдела (ShardSet.shard_for).
+    Шард 0 — основная БД и сессия запроса, поэтому для его задач outbox и счетчики нагрузки
+    по-прежнему коммитятся в одной транзакции с задачей; для остальных шардов — сразу следом.
+    Списки читаются со всех шардов параллельно и сливаются k-way merge (heapq.merge).
+    Методы без поддержки шардов (выгрузка, напоминания, сверка) идут в шард 0.
+    """
+
+    def __init__(self, shards: ShardSet, session: AsyncSession):
+        self.shards = shards
+        # Основная БД: пользователи, outbox, UserRepository(repository.session) в роутах
+        self.session = session
+        self._sessions: Dict[int, AsyncSession] = {0: session}
+
+    def _repo(self, shard: int) -> TaskRepository:
+        if shard not in self._sessions:
+            self._sessions[shard] = self.shards.factories[shard]()
+        return TaskRepository(self._sessions[shard])
+
+    def __getattr__(self, name):
+        return getattr(self._repo(0), name)
+
+    async def close(self) -> None:
+        for shard, session in self._sessions.items():
+            if shard != 0:
+                await session.close()
+
+    async def _fan_out(self, call: Callable[[TaskRepository, int], object]) -> list:
+        """Один и тот же запрос ко всем шардам параллельно (у каждого шарда своя сессия)."""
+        return list(await asyncio.gather(*(call(self._repo(shard), shard) for shard in self.shards.ids)))
+
+    async def _locate(self, task_id: UUID, include_archived: bool = False) -> Optional[Tuple[int, Task]]:
+        hint = self.shards.locations.get(task_id)
+        if hint is not None:
+            task = await self._repo(hint).get_by_id(task_id, include_archived and hint == 0)
+            if task is not None:
+                return hint, task
+        # Архив есть только в основной БД
+        found = await self._fan_out(lambda repo, shard: repo.get_by_id(task_id, include_archived and shard == 0))
+        for shard, task in zip(self.shards.ids, found):
+            if task is not None:
+                self.shards.locations.put(task_id, shard)
+                return shard, task
+        return None
+
+    # --- ITaskRepository ---
+    async def save(self, task: Task) -> Task:
+        shard = self.shards.shard_for(task.target_dept_id)
+        try:
+            saved = await self._repo(shard).save(task)
+        except Exception:
+            # Конфликт версий и т.п.: вместе с задачей отменяем outbox и счетчики в основной БД
+            await self.session.rollback()
+            raise
+        self.shards.locations.put(saved.id, shard)
+        if shard != 0:
+            await self.session.commit()
+        return saved
+
+    async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
+        located = await self._locate(task_id, include_archived)
+        return located[1] if located else None
+
+    async def get_many(self, task_ids: List[UUID]) -> List[Task]:
+        if not task_ids:
+            return []
+        return list(itertools.chain.from_iterable(await self._fan_out(lambda repo, _: repo.get_many(task_ids))))
+
+    async def get_visible(self, user: User, task_ids: List[UUID]) -> List[Task]:
+        if not task_ids:
+            return []
+        return list(itertools.chain.from_iterable(await self._fan_out(lambda repo, _: repo.get_visible(user, task_ids))))
+
+    async def get_subtasks(self, parent_id: UUID) -> List[Task]:
+        found = await self._fan_out(lambda repo, _: repo.get_subtasks(parent_id))
+        return list(heapq.merge(*found, key=lambda t: (t.created_at, t.id)))
+
+    async def get_all(
+            self,
+            user: User,
+            limit: int,
+            offset: int,
+            status: Optional[TaskStatus] = None,
+            priority: Optional[TaskPriority] = None,
+            deadline_start: Optional[datetime] = None,
+            deadline_end: Optional[datetime] = None,
+            include_archived: bool = False,
+            sort: TaskSort = TaskSort.CREATED_AT
+    ) -> List[Task]:
+        # Любая из первых offset + limit строк может прийти с любого шарда: берем столько с каждого
+        pages = await self._fan_out(lambda repo, shard: repo.get_all(
+            user, offset + limit, 0, status, priority, deadline_start, deadline_end,
+            include_archived and shard == 0, sort
+        ))
+        merged = heapq.merge(*pages, key=_sort_key(sort), reverse=True)
+        return list(itertools.islice(merged, offset, offset + limit))
+
+    async def get_due(self, user: User, until: datetime, limit: int) -> List[Task]:
+        pages = await self._fan_out(lambda repo, _: repo.get_due(user, until, limit))
+        return list(itertools.islice(heapq.merge(*pages, key=lambda t: t.deadline), limit))
+
+    async def get_overdue(self, user: User, limit: int) -> List[Task]:
+        pages = await self._fan_out(lambda repo, _: repo.get_overdue(user, limit))
+        return list(itertools.islice(heapq.merge(*pages, key=lambda t: t.deadline), limit))
+
+    async def delete(self, task_id: UUID) -> bool:
+        located = await self._locate(task_id)
+        if located is None:
+            return False
+        self.shards.locations.pop(task_id)
+        return await self._repo(located[0]).delete(task_id)
+
+    async def add_comment(self, comment: Comment) -> Comment:
+        located = await self._locate(comment.task_id)
+        if located is None:
+            raise ValueError(f"Task {comment.task_id} not found on any shard")
+        saved = await self._repo(located[0]).add_comment(comment)
+        if located[0] != 0:
+            # Уведомления о комментарии лежат в outbox основной БД
+            await self.session.commit()
+        return saved
+
+    async def get_comments_many(self, task_ids: List[UUID]) -> Dict[UUID, List[Comment]]:
+        # Комментарии лежат на шарде своей задачи: у остальных шардов для этих id списки пустые
+        found: Dict[UUID, List[Comment]] = {task_id: [] for task_id in task_ids}
+        if not task_ids:
+            return found
+        for per_shard in await self._fan_out(lambda repo, _: repo.get_comments_many(task_ids)):
+            for task_id, comments in per_shard.items():
+                found[task_id].extend(comments)
+        return found
+
+    async def get_comments(self, task_id: UUID, include_archived: bool = False) -> List[Comment]:
+        located = await self._locate(task_id, include_archived)
+        if located is None:
+            return []
+        return await self._repo(located[0]).get_comments(task_id, include_archived and located[0] == 0)
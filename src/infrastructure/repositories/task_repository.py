@@ -1,31 +1,45 @@
 from uuid import UUID
-from typing import Optional, List
-from datetime import datetime
-from sqlalchemy import select, and_
+from typing import Optional, List, Dict, Tuple, AsyncIterator
+from datetime import datetime, timezone
+from sqlalchemy import select, and_, union_all, update, delete, text, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.domain.entities import Task, TaskStatus, TaskPriority, User, UserRole, Comment
-from src.infrastructure.database.models import TaskModel, CommentModel, UserModel
+from src.domain.entities import Task, TaskStatus, TaskPriority, TaskSort, User, UserRole, Comment, ReminderStage
+from src.domain.interfaces import ITaskRepository, ConcurrentModificationError
+from src.infrastructure.database.models import (
+    TaskModel, CommentModel, UserModel, tasks_archive, comments_archive, OPEN_DEADLINE_PREDICATE
+)
+from src.infrastructure.database.portable import greatest
 
+# Колонки, общие для горячей и холодной таблиц (для UNION ALL)
+_TASK_FIELDS = [c.name for c in tasks_archive.c if c.name != "archived_at"]
+_COMMENT_FIELDS = [c.name for c in comments_archive.c]
 
-class TaskRepository:
+
+class TaskRepository(ITaskRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    # model может быть как TaskModel, так и строкой из tasks_archive — поля совпадают
     def _to_domain(self, model: TaskModel) -> Task:
-        return Task(
+        # from_storage: дедлайн сохраненной задачи может быть уже в прошлом
+        return Task.model_validate(dict(
             id=model.id,
             title=model.title,
             description=model.description,
             owner_id=model.owner_id,
             executor_id=model.executor_id,
             target_dept_id=model.target_dept_id,
+            parent_id=model.parent_id,
             status=TaskStatus(model.status),
             priority=TaskPriority(model.priority),
             deadline=model.deadline,
             created_at=model.created_at,
-            updated_at=model.updated_at
-        )
+            updated_at=model.updated_at,
+            version=model.version,
+            comment_count=model.comment_count,
+            last_activity_at=model.last_activity_at
+        ), context={"from_storage": True})
 
     def _comment_to_domain(self, model: CommentModel) -> Comment:
         return Comment(
@@ -37,86 +51,295 @@ class TaskRepository:
         )
 
     async def save(self, task: Task) -> Task:
-        task_model = TaskModel(
-            id=task.id,
+        values = dict(
             title=task.title,
             description=task.description,
             owner_id=task.owner_id,
             executor_id=task.executor_id,
             target_dept_id=task.target_dept_id,
+            parent_id=task.parent_id,
             status=task.status.value,
             priority=task.priority.value,
             deadline=task.deadline,
-            created_at=task.created_at,
             updated_at=task.updated_at
         )
 
-        merged_task = await self.session.merge(task_model)
-        await self.session.commit()
-
-        # Refresh критичен для получения ID и дефолтных значений времени из БД
-        await self.session.refresh(merged_task)
+        if task.version == 0:
+            task_model = TaskModel(
+                id=task.id, created_at=task.created_at, version=1, last_activity_at=task.updated_at, **values
+            )
+            self.session.add(task_model)
+            await self.session.commit()
+            # Refresh критичен для получения дефолтных значений из БД
+            await self.session.refresh(task_model)
+            return self._to_domain(task_model)
 
-        return self._to_domain(merged_task)
+        # Без блокировок: пишем, только если с момента чтения задачу никто не менял
+        query = (
+            update(TaskModel)
+            .where(TaskModel.id == task.id, TaskModel.version == task.version)
+            .values(
+                **values,
+                version=TaskModel.version + 1,
+                last_activity_at=greatest(TaskModel.last_activity_at, task.updated_at)
+            )
+            .returning(TaskModel)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        task_model = (await self.session.execute(query)).scalar_one_or_none()
+        if task_model is None:
+            # Откатываем и всё, что запрос успел сделать в этой транзакции (outbox, счетчики нагрузки)
+            await self.session.rollback()
+            raise ConcurrentModificationError(task.id, task.version)
+        await self.session.commit()
+        return self._to_domain(task_model)
 
-    async def get_by_id(self, task_id: UUID) -> Optional[Task]:
+    async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
         query = select(TaskModel).where(TaskModel.id == task_id)
         result = await self.session.execute(query)
         task_model = result.scalar_one_or_none()
-        return self._to_domain(task_model) if task_model else None
+        if task_model:
+            return self._to_domain(task_model)
 
-    async def get_all(
-            self,
-            user: User,
-            limit: int,
-            offset: int,
-            status: Optional[TaskStatus] = None,
-            priority: Optional[TaskPriority] = None,
-            deadline_start: Optional[datetime] = None,
-            deadline_end: Optional[datetime] = None
-    ) -> List[Task]:
-        query = select(TaskModel)
+        # В архив идем только по явному запросу
+        if include_archived:
+            row = (await self.session.execute(
+                select(*[tasks_archive.c[name] for name in _TASK_FIELDS]).where(tasks_archive.c.id == task_id)
+            )).first()
+            return self._to_domain(row) if row else None
+        return None
 
-        # --- RBAC LOGIC ---
+    async def delete(self, task_id: UUID) -> bool:
+        # Комментарии ссылаются на задачу без ON DELETE CASCADE в БД — удаляем их первыми
+        await self.session.execute(delete(CommentModel).where(CommentModel.task_id == task_id))
+        result = await self.session.execute(delete(TaskModel).where(TaskModel.id == task_id))
+        await self.session.commit()
+        return result.rowcount > 0
+
+    async def get_subtasks(self, parent_id: UUID) -> List[Task]:
+        query = select(TaskModel).where(TaskModel.parent_id == parent_id).order_by(TaskModel.created_at.asc())
+        result = await self.session.execute(query)
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    async def get_many(self, task_ids: List[UUID]) -> List[Task]:
+        if not task_ids:
+            return []
+        result = await self.session.execute(select(TaskModel).where(TaskModel.id.in_(task_ids)))
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    async def get_visible(self, user: User, task_ids: List[UUID]) -> List[Task]:
+        """Задачи из task_ids, которые пользователь вправе видеть (те же правила, что у get_all)."""
+        if not task_ids:
+            return []
+        query = select(TaskModel).where(TaskModel.id.in_(task_ids))
+        condition = self._visibility(TaskModel, user)
+        if condition is not None:
+            query = query.where(condition)
+        result = await self.session.execute(query)
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    @staticmethod
+    def _visibility(table, user: User):
+        """RBAC-условие видимости задач. table — TaskModel или tasks_archive.c."""
         if user.role == UserRole.ADMIN:
             # Админ видит всё
-            pass
-        elif user.role == UserRole.MANAGER:
+            return None
+        if user.role == UserRole.MANAGER:
             # Менеджер видит:
             # 1. Задачи, назначенные на его отдел (target_dept_id)
             # 2. Задачи, которые он создал сам (даже если они не в отделе)
             if user.department_id:
-                query = query.where(
-                    (TaskModel.target_dept_id == user.department_id) |
-                    (TaskModel.owner_id == user.id)
-                )
-            else:
-                # Менеджер без отдела видит только свои
-                query = query.where(TaskModel.owner_id == user.id)
-        else:  # EMPLOYEE
-            # Сотрудник видит только:
-            # 1. Задачи, где он Исполнитель
-            # 2. Задачи, где он Автор
-            query = query.where(
-                (TaskModel.owner_id == user.id) |
-                (TaskModel.executor_id == user.id)
-            )
+                return (table.target_dept_id == user.department_id) | (table.owner_id == user.id)
+            # Менеджер без отдела видит только свои
+            return table.owner_id == user.id
+        # EMPLOYEE
+        # Сотрудник видит только:
+        # 1. Задачи, где он Исполнитель
+        # 2. Задачи, где он Автор
+        return (table.owner_id == user.id) | (table.executor_id == user.id)
+
+    @staticmethod
+    def _ordering(table, sort: TaskSort) -> tuple:
+        """ORDER BY для списка. id — тай-брейкер: одинаковые счетчики не должны прыгать между страницами."""
+        if sort == TaskSort.LAST_ACTIVITY:
+            return table.last_activity_at.desc(), table.id.desc()
+        if sort == TaskSort.COMMENT_COUNT:
+            return table.comment_count.desc(), table.last_activity_at.desc(), table.id.desc()
+        return table.created_at.desc(), table.id.desc()
+
+    def _filtered(self, table, query, user, status, priority, deadline_start, deadline_end):
+        # --- RBAC LOGIC ---
+        condition = self._visibility(table, user)
+        if condition is not None:
+            query = query.where(condition)
 
         # --- FILTERS ---
         if status:
-            query = query.where(TaskModel.status == status.value)
+            query = query.where(table.status == status.value)
         if priority:
-            query = query.where(TaskModel.priority == priority.value)
+            query = query.where(table.priority == priority.value)
         if deadline_start:
-            query = query.where(TaskModel.deadline >= deadline_start)
+            query = query.where(table.deadline >= deadline_start)
         if deadline_end:
-            query = query.where(TaskModel.deadline <= deadline_end)
+            query = query.where(table.deadline <= deadline_end)
+        return query
+
+    async def get_all(
+            self,
+            user: User,
+            limit: int,
+            offset: int,
+            status: Optional[TaskStatus] = None,
+            priority: Optional[TaskPriority] = None,
+            deadline_start: Optional[datetime] = None,
+            deadline_end: Optional[datetime] = None,
+            include_archived: bool = False,
+            sort: TaskSort = TaskSort.CREATED_AT
+    ) -> List[Task]:
+        filters = (user, status, priority, deadline_start, deadline_end)
+        query = self._filtered(TaskModel, select(TaskModel), *filters)
+
+        if not include_archived:
+            query = query.limit(limit).offset(offset).order_by(*self._ordering(TaskModel, sort))
+            result = await self.session.execute(query)
+            return [self._to_domain(model) for model in result.scalars().all()]
+
+        # Горячие + холодные задачи одним UNION ALL
+        hot = self._filtered(TaskModel, select(*[TaskModel.__table__.c[n] for n in _TASK_FIELDS]), *filters)
+        cold = self._filtered(tasks_archive.c, select(*[tasks_archive.c[n] for n in _TASK_FIELDS]), *filters)
+        combined = union_all(hot, cold).subquery()
+        query = select(combined).order_by(*self._ordering(combined.c, sort)).limit(limit).offset(offset)
+        result = await self.session.execute(query)
+        return [self._to_domain(row) for row in result.all()]
+
+    # --- EXPORT ---
+    EXPORT_COLUMNS = [
+        "id", "title", "description", "owner_id", "executor_id", "target_dept_id", "parent_id",
+        "status", "priority", "deadline", "created_at", "updated_at"
+    ]
+
+    async def stream_rows(
+            self,
+            user: User,
+            batch_size: int = 5000,
+            with_comment_counts: bool = False
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Все видимые пользователю задачи пачками по batch_size — через серверный курсор.
+        Память не зависит от размера выгрузки: в каждый момент в процессе одна пачка.
+        Отдаем "сырые" строки без _to_domain: на миллионах строк pydantic заметно дороже самих данных.
+        """
+        columns = [TaskModel.__table__.c[name] for name in self.EXPORT_COLUMNS]
+        if with_comment_counts:
+            # Денормализованный счетчик: без подзапроса в comments на каждую строку
+            columns.append(TaskModel.comment_count)
+        query = self._filtered(TaskModel, select(*columns), user, None, None, None, None)
+        query = query.order_by(TaskModel.created_at.asc()).execution_options(yield_per=batch_size)
 
-        query = query.limit(limit).offset(offset).order_by(TaskModel.created_at.desc())
+        result = await self.session.stream(query)
+        async for partition in result.mappings().partitions(batch_size):
+            yield [dict(row) for row in partition]
 
+    async def stream_text_since(self, since: datetime, batch_size: int = 5000) -> AsyncIterator[List[tuple]]:
+        """(id, title, description, updated_at) задач, измененных не раньше since, — для индекса похожих задач."""
+        query = (
+            select(TaskModel.id, TaskModel.title, TaskModel.description, TaskModel.updated_at)
+            .where(TaskModel.updated_at >= since)
+            .order_by(TaskModel.updated_at.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(query)
+        async for partition in result.partitions(batch_size):
+            yield [tuple(row) for row in partition]
+
+    # --- DEADLINES ---
+    async def get_due(self, user: User, until: datetime, limit: int) -> List[Task]:
+        """Открытые задачи с дедлайном в окне [сейчас, until] — по частичному индексу."""
+        query = self._filtered(
+            TaskModel, select(TaskModel).where(text(OPEN_DEADLINE_PREDICATE)), user, None, None,
+            datetime.now(timezone.utc), until
+        )
+        query = query.order_by(TaskModel.deadline.asc()).limit(limit)
+        result = await self.session.execute(query)
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    async def get_overdue(self, user: User, limit: int) -> List[Task]:
+        query = self._filtered(
+            TaskModel, select(TaskModel).where(text(OPEN_DEADLINE_PREDICATE)), user, None, None,
+            None, datetime.now(timezone.utc)
+        )
+        query = query.order_by(TaskModel.deadline.asc()).limit(limit)
         result = await self.session.execute(query)
         return [self._to_domain(model) for model in result.scalars().all()]
 
+    async def get_pending_reminders(self, until: datetime) -> List[tuple]:
+        """(id, deadline, reminder_stage) открытых задач, по которым еще есть неотправленные напоминания."""
+        query = (
+            select(TaskModel.id, TaskModel.deadline, TaskModel.reminder_stage)
+            .where(text(OPEN_DEADLINE_PREDICATE))
+            .where(TaskModel.deadline <= until, TaskModel.reminder_stage < ReminderStage.OVERDUE.value)
+        )
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def claim_reminder(self, task_id: UUID, deadline: datetime, stage: ReminderStage) -> Optional[Task]:
+        """
+        Атомарно помечает напоминание отправленным. БЕЗ коммита (коммит вместе с outbox).
+        Возвращает задачу, если напоминание еще актуально: задача открыта, дедлайн не менялся,
+        и эту стадию никто (другой воркер, прошлый запуск) еще не отработал.
+        """
+        query = (
+            update(TaskModel)
+            .where(
+                TaskModel.id == task_id,
+                TaskModel.deadline == deadline,
+                TaskModel.reminder_stage < stage.value,
+                text(OPEN_DEADLINE_PREDICATE)
+            )
+            # updated_at не трогаем: напоминание — не правка задачи (и onupdate записал бы naive-время)
+            .values(reminder_stage=stage.value, updated_at=TaskModel.updated_at)
+            .returning(TaskModel)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(query)
+        task_model = result.scalar_one_or_none()
+        return self._to_domain(task_model) if task_model else None
+
+    async def reconcile_activity(self, after: Optional[UUID], batch_size: int) -> Tuple[Optional[UUID], int]:
+        """
+        Сверяет comment_count / last_activity_at пачки задач (id > after) с таблицей comments и чинит расхождения.
+        Возвращает последний просмотренный id (None — таблица пройдена) и число исправленных задач.
+        """
+        query = select(TaskModel.id).order_by(TaskModel.id.asc()).limit(batch_size)
+        if after is not None:
+            query = query.where(TaskModel.id > after)
+        ids = list((await self.session.execute(query)).scalars().all())
+        if not ids:
+            return None, 0
+
+        actual_count = select(func.count()).where(CommentModel.task_id == TaskModel.id).correlate(TaskModel).scalar_subquery()
+        last_comment = (
+            select(func.max(CommentModel.created_at)).where(CommentModel.task_id == TaskModel.id)
+            .correlate(TaskModel).scalar_subquery()
+        )
+        result = await self.session.execute(
+            update(TaskModel)
+            .where(
+                TaskModel.id.in_(ids),
+                (TaskModel.comment_count != actual_count) | (TaskModel.last_activity_at < last_comment)
+            )
+            .values(
+                comment_count=actual_count,
+                last_activity_at=greatest(TaskModel.last_activity_at, last_comment),
+                updated_at=TaskModel.updated_at
+            )
+            .returning(TaskModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        repaired = len(result.all())
+        await self.session.commit()
+        return ids[-1], repaired
+
     async def add_comment(self, comment: Comment) -> Comment:
         comment_model = CommentModel(
             id=comment.id,
@@ -126,6 +349,18 @@ class TaskRepository:
             created_at=comment.created_at
         )
         self.session.add(comment_model)
+        # Счетчик и активность — в той же транзакции, что и комментарий. Версию не трогаем:
+        # комментарий не меняет саму задачу и не должен ломать чужие If-Match
+        await self.session.execute(
+            update(TaskModel)
+            .where(TaskModel.id == comment.task_id)
+            .values(
+                comment_count=TaskModel.comment_count + 1,
+                last_activity_at=greatest(TaskModel.last_activity_at, comment.created_at),
+                updated_at=TaskModel.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
         await self.session.commit()
 
         # Обязательно обновляем модель после вставки
@@ -133,7 +368,30 @@ class TaskRepository:
 
         return self._comment_to_domain(comment_model)
 
-    async def get_comments(self, task_id: UUID) -> List[Comment]:
+    async def get_comments(self, task_id: UUID, include_archived: bool = False) -> List[Comment]:
         query = select(CommentModel).where(CommentModel.task_id == task_id).order_by(CommentModel.created_at.asc())
         result = await self.session.execute(query)
-        return [self._comment_to_domain(model) for model in result.scalars().all()]
\ No newline at end of file
+        comments = [self._comment_to_domain(model) for model in result.scalars().all()]
+        if comments or not include_archived:
+            return comments
+
+        # Комментарии архивируются вместе с задачей, поэтому смотрим архив, только если горячих нет
+        query = (
+            select(*[comments_archive.c[n] for n in _COMMENT_FIELDS])
+            .where(comments_archive.c.task_id == task_id)
+            .order_by(comments_archive.c.created_at.asc())
+        )
+        result = await self.session.execute(query)
+        return [self._comment_to_domain(row) for row in result.all()]
+
+    async def get_comments_many(self, task_ids: List[UUID]) -> Dict[UUID, List[Comment]]:
+        """Комментарии нескольких задач одним запросом (WHERE task_id IN ...), без архива."""
+        comments: Dict[UUID, List[Comment]] = {task_id: [] for task_id in task_ids}
+        if not task_ids:
+            return comments
+        result = await self.session.execute(
+            select(CommentModel).where(CommentModel.task_id.in_(task_ids)).order_by(CommentModel.created_at.asc())
+        )
+        for model in result.scalars().all():
+            comments[model.task_id].append(self._comment_to_domain(model))
+        return comments
\ No newline at end of file
@@ -1,15 +1,27 @@
-from typing import Optional
-from sqlalchemy import select
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import select, func, or_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.domain.entities import User, UserRole
 from src.infrastructure.database.models import UserModel
+from src.infrastructure.database.portable import dialect_name
+
+# Позиция в справочнике для keyset-пагинации: (full_name, id) последнего пользователя страницы
+UserCursor = Tuple[str, UUID]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 class UserRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    def _to_domain(self, model: UserModel) -> User:
-        return User(
+    def _to_domain(self, model: UserModel, validate: bool = True) -> User:
+        # validate=False — для страниц справочника: email проверен при регистрации,
+        # а повторная проверка EmailStr стоит ~0.2 мс на строку, дороже самого запроса
+        return (User if validate else User.model_construct)(
             id=model.id,
             email=model.email,
             hashed_password=model.hashed_password,
@@ -17,6 +29,7 @@ class UserRepository:
             role=UserRole(model.role),
             is_active=model.is_active,
             department_id=model.department_id,
+            token_version=model.token_version,
             created_at=model.created_at
         )
 
@@ -26,6 +39,75 @@ class UserRepository:
         user_model = result.scalar_one_or_none()
         return self._to_domain(user_model) if user_model else None
 
+    async def get_by_id(self, user_id: UUID) -> Optional[User]:
+        user_model = await self.session.get(UserModel, user_id)
+        return self._to_domain(user_model) if user_model else None
+
+    async def get_many(self, user_ids: List[UUID]) -> List[User]:
+        if not user_ids:
+            return []
+        result = await self.session.execute(select(UserModel).where(UserModel.id.in_(user_ids)))
+        return [self._to_domain(model) for model in result.scalars().all()]
+
+    async def search(
+            self,
+            limit: int,
+            after: Optional[UserCursor] = None,
+            query: Optional[str] = None,
+            role: Optional[UserRole] = None,
+            department_id: Optional[UUID] = None,
+            is_active: Optional[bool] = None,
+            fuzzy: bool = False
+    ) -> Tuple[List[User], Optional[UserCursor]]:
+        """
+        Страница справочника по алфавиту (full_name, id) и курсор следующей страницы (None — конец).
+        query ищет по имени и email без учета регистра. Postgres: подстрока (от 3 символов, иначе префикс)
+        по триграммным индексам, fuzzy добавляет похожие написания (pg_trgm, опечатки).
+        SQLite: только префикс, по индексам на casefold() — встроенный lower() не знает кириллицы.
+        """
+        stmt = select(UserModel)
+        if role is not None:
+            stmt = stmt.where(UserModel.role == role.value)
+        if department_id is not None:
+            stmt = stmt.where(UserModel.department_id == department_id)
+        if is_active is not None:
+            stmt = stmt.where(UserModel.is_active == is_active)
+
+        needle = (query or "").strip()
+        if needle:
+            if dialect_name(self.session) == "postgresql":
+                needle = needle.lower()
+                name, email = func.lower(UserModel.full_name), func.lower(UserModel.email)
+                pattern = ("%" if len(needle) >= 3 else "") + _escape_like(needle) + "%"
+                conditions = [name.like(pattern, escape="\\"), email.like(pattern, escape="\\")]
+                if fuzzy:
+                    # Оператор % из pg_trgm: similarity выше pg_trgm.similarity_threshold (0.3), тоже по GIN-индексу
+                    conditions.append(name.op("%")(needle))
+            else:
+                # Диапазон [needle, needle + U+FFFF) — префикс, который SQLite берет из B-tree по casefold()
+                needle = needle.casefold()
+                name, email = func.casefold(UserModel.full_name), func.casefold(UserModel.email)
+                upper = needle + "\uffff"
+                conditions = [(name >= needle) & (name < upper), (email >= needle) & (email < upper)]
+            stmt = stmt.where(or_(*conditions))
+
+        if after is not None:
+            stmt = stmt.where(tuple_(UserModel.full_name, UserModel.id) > tuple_(*after))
+        # Одна лишняя строка говорит, есть ли следующая страница
+        stmt = stmt.order_by(UserModel.full_name, UserModel.id).limit(limit + 1)
+        models = (await self.session.execute(stmt)).scalars().all()
+
+        users = [self._to_domain(model, validate=False) for model in models[:limit]]
+        next_cursor = (users[-1].full_name, users[-1].id) if len(models) > limit else None
+        return users, next_cursor
+
+    async def get_token_versions(self) -> Dict[UUID, int]:
+        """Только пользователи, у которых токены хоть раз отзывались: у остальных версия 0 — карта остается маленькой."""
+        result = await self.session.execute(
+            select(UserModel.id, UserModel.token_version).where(UserModel.token_version > 0)
+        )
+        return {row[0]: row[1] for row in result.all()}
+
     async def create(self, user: User) -> User:
         # Убеждаемся, что ВСЕ поля из сущности переходят в модель БД
         user_model = UserModel(
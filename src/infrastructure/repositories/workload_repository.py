@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import select, insert, delete, func, cast, case, Float, BigInteger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Task, TaskStatus, TaskPriority
+from src.infrastructure.database.models import UserModel, UserWorkloadModel, TaskModel
+from src.infrastructure.database.portable import upsert, greatest, epoch
+from src.infrastructure.database.sharding import ShardSet
+
+PRIORITY_WEIGHTS = {
+    TaskPriority.LOW: 1,
+    TaskPriority.MEDIUM: 2,
+    TaskPriority.HIGH: 4,
+    TaskPriority.CRITICAL: 8,
+}
+FINISHED = (TaskStatus.DONE, TaskStatus.CANCELLED)
+COUNTERS = ("open_count", "weighted_load", "deadline_count", "deadline_sum")
+
+# Веса итоговой оценки (меньше — свободнее)
+OPEN_WEIGHT = 1.0
+LOAD_WEIGHT = 0.5
+PRESSURE_WEIGHT = 2.0
+
+
+def _contribution(task: Optional[Task]) -> Optional[Tuple[UUID, Dict[str, int]]]:
+    """Вклад задачи в счетчики исполнителя: только открытые задачи с назначенным исполнителем."""
+    if task is None or task.executor_id is None or task.status in FINISHED:
+        return None
+    return task.executor_id, {
+        "open_count": 1,
+        "weighted_load": PRIORITY_WEIGHTS[task.priority],
+        "deadline_count": 1 if task.deadline else 0,
+        "deadline_sum": int(task.deadline.timestamp()) if task.deadline else 0,
+    }
+
+
+class WorkloadRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def apply(self, before: Optional[Task], after: Task) -> None:
+        """
+        Переносит вклад задачи из состояния before в after (назначение, смена статуса).
+        БЕЗ коммита: счетчики коммитятся вместе с задачей в repository.save.
+        """
+        deltas: Dict[UUID, Dict[str, int]] = {}
+        for task, sign in ((before, -1), (after, 1)):
+            contribution = _contribution(task)
+            if contribution is None:
+                continue
+            user_id, values = contribution
+            delta = deltas.setdefault(user_id, dict.fromkeys(COUNTERS, 0))
+            for name, value in values.items():
+                delta[name] += sign * value
+
+        # Строки блокируются в одном порядке: встречные переназначения A->B и B->A иначе ждут друг друга (deadlock)
+        for user_id, delta in sorted(deltas.items()):
+            if not any(delta.values()):
+                continue
+            statement = upsert(self.session, UserWorkloadModel).values(user_id=user_id, **delta)
+            statement = statement.on_conflict_do_update(
+                index_elements=[UserWorkloadModel.user_id],
+                set_={name: getattr(UserWorkloadModel, name) + statement.excluded[name] for name in COUNTERS}
+            )
+            await self.session.execute(statement)
+
+    @staticmethod
+    def _totals():
+        """Счетчики нагрузки по исполнителям из таблицы tasks одной БД."""
+        weight = case({p.value: w for p, w in PRIORITY_WEIGHTS.items()}, value=TaskModel.priority, else_=2)
+        return (
+            select(
+                TaskModel.executor_id, func.count(), func.sum(weight),
+                func.count(TaskModel.deadline), func.coalesce(func.sum(cast(epoch(TaskModel.deadline), BigInteger)), 0)
+            )
+            .where(TaskModel.executor_id.is_not(None), TaskModel.status.not_in([s.value for s in FINISHED]))
+            .group_by(TaskModel.executor_id)
+        )
+
+    async def rebuild(self, shards: Optional[ShardSet] = None) -> None:
+        """
+        Полный пересчет из tasks — после массового импорта, мимо которого инкременты не проходят.
+        С шардами задачи исполнителя лежат в нескольких БД: суммируем по всем, таблица user_workload — в основной.
+        """
+        await self.session.execute(delete(UserWorkloadModel))
+        if shards is None or len(shards.ids) == 1:
+            await self.session.execute(insert(UserWorkloadModel).from_select(["user_id", *COUNTERS], self._totals()))
+            await self.session.commit()
+            return
+
+        async def shard_totals(shard: int) -> list:
+            if shard == 0:
+                return list((await self.session.execute(self._totals())).all())
+            async with shards.factories[shard]() as session:
+                return list((await session.execute(self._totals())).all())
+
+        totals: Dict[UUID, List[int]] = {}
+        # Последовательно: шард 0 читается в сессии запроса, а AsyncSession не выполняет два запроса сразу
+        for shard in shards.ids:
+            for user_id, *values in await shard_totals(shard):
+                current = totals.setdefault(user_id, [0] * len(COUNTERS))
+                for i, value in enumerate(values):
+                    current[i] += int(value or 0)
+        if totals:
+            await self.session.execute(
+                insert(UserWorkloadModel),
+                [{"user_id": user_id, **dict(zip(COUNTERS, values))} for user_id, values in totals.items()]
+            )
+        await self.session.commit()
+
+    async def suggest(self, department_id: UUID, exclude: List[UUID], limit: int) -> List[dict]:
+        """
+        Активные сотрудники отдела от самых свободных к самым загруженным.
+        Давление дедлайнов = задачи с дедлайном / часы до их среднего дедлайна (не меньше часа).
+        Один запрос по индексу users.department_id + PK user_workload.
+        """
+        w = UserWorkloadModel
+        now = datetime.now(timezone.utc).timestamp()
+        open_count = func.coalesce(w.open_count, 0)
+        weighted_load = func.coalesce(w.weighted_load, 0)
+        hours_left = (cast(w.deadline_sum, Float) / func.nullif(w.deadline_count, 0) - now) / 3600.0
+        pressure = func.coalesce(cast(w.deadline_count, Float) / greatest(hours_left, 1.0), 0.0)
+        score = open_count * OPEN_WEIGHT + weighted_load * LOAD_WEIGHT + pressure * PRESSURE_WEIGHT
+
+        query = (
+            select(
+                UserModel.id, UserModel.full_name, UserModel.email,
+                open_count.label("open_count"),
+                weighted_load.label("weighted_load"),
+                pressure.label("deadline_pressure"),
+                score.label("score")
+            )
+            .outerjoin(w, w.user_id == UserModel.id)
+            .where(UserModel.department_id == department_id, UserModel.is_active.is_(True))
+            .order_by(score.asc(), UserModel.full_name.asc())
+            .limit(limit)
+        )
+        if exclude:
+            query = query.where(UserModel.id.not_in(exclude))
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings().all()]
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.domain.entities import ActivityEvent
+from src.infrastructure.repositories.activity_repository import ActivityRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogWriter:
+    """
+    Буферизованный писатель журнала действий.
+    record() только кладет событие в память и сразу возвращается;
+    фоновая задача сбрасывает буфер пачками по таймеру или по заполнению.
+    Буфер ограничен max_buffer: пока БД недоступна, самые старые события отбрасываются (и считаются).
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            batch_size: int = int(getenv("ACTIVITY_BATCH_SIZE", "500")),
+            flush_interval: float = float(getenv("ACTIVITY_FLUSH_INTERVAL", "0.5")),
+            max_buffer: int = int(getenv("ACTIVITY_MAX_BUFFER", "100000"))
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.dropped = 0
+
+        self._buffer: List[ActivityEvent] = []
+        self._flush_lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._partitions_month: Optional[tuple] = None
+
+    def record(self, event: ActivityEvent) -> None:
+        self._buffer.append(event)
+        self._trim()
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def pending_for(self, entity_id: UUID) -> List[ActivityEvent]:
+        """События, которые еще лежат в буфере (чтобы история была полной сразу после записи)."""
+        return [e for e in self._buffer if e.entity_id == entity_id]
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while self._buffer:
+                batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+                try:
+                    async with self.session_factory() as session:
+                        await ActivityRepository(session).insert_many(batch)
+                except BaseException:
+                    # БД недоступна или нас отменили посреди записи:
+                    # возвращаем пачку в начало буфера, попробуем на следующем тике
+                    self._buffer = batch + self._buffer
+                    self._trim()
+                    raise
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buffer), "dropped": self.dropped}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self._ensure_partitions()
+                await self.flush()
+            except Exception:
+                logger.exception("Activity log flush error")
+
+    async def _ensure_partitions(self) -> None:
+        # Раз в месяц досоздаем секции наперед, чтобы строки не копились в DEFAULT
+        now = datetime.now(timezone.utc)
+        if self._partitions_month == (now.year, now.month):
+            return
+        async with self.session_factory() as session:
+            await ActivityRepository(session).ensure_month_partitions()
+        self._partitions_month = (now.year, now.month)
+
+    async def start(self) -> None:
+        await self._ensure_partitions()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и гарантированно сбрасывает остаток буфера."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
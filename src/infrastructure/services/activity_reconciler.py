@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.infrastructure.repositories.task_repository import TaskRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+
+async def run_reconciliation(session_factory: async_sessionmaker, batch_size: int = 5000) -> dict:
+    """
+    Проход по всем задачам: comment_count / last_activity_at против таблицы comments.
+    Короткими транзакциями по batch_size (keyset по id), чтобы не держать блокировки на всей таблице.
+    """
+    checked = repaired = 0
+    after = None
+    async with session_factory() as session:
+        repo = TaskRepository(session)
+        while True:
+            last_id, fixed = await repo.reconcile_activity(after, batch_size)
+            if last_id is None:
+                break
+            after = last_id
+            checked += batch_size
+            repaired += fixed
+    return {"checked": checked, "repaired": repaired}
+
+
+class ActivityReconcileJob:
+    """Периодическая сверка денормализованных счетчиков задач (ACTIVITY_RECONCILE_INTERVAL_HOURS=0 — выключено)."""
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            interval_hours: float = float(getenv("ACTIVITY_RECONCILE_INTERVAL_HOURS", "24"))
+    ):
+        self.session_factory = session_factory
+        self.interval_hours = interval_hours
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_hours * 3600)
+            try:
+                result = await run_reconciliation(self.session_factory)
+                if result["repaired"]:
+                    logger.info("Repaired comment counters on %s tasks", result["repaired"], extra=result)
+            except Exception:
+                logger.exception("Activity reconciliation error")
+
+    def start(self) -> None:
+        if self.interval_hours > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def main() -> None:
+    from src.infrastructure.database.session import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Repair tasks.comment_count / last_activity_at drift")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    try:
+        result = await run_reconciliation(AsyncSessionLocal, args.batch_size)
+        print(f"Checked ~{result['checked']} tasks, repaired {result['repaired']}.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import re
+from typing import List, Optional
+
+from src.domain.entities import Comment
+from src.domain.interfaces import IAIProvider
+from src.core.config import getenv
+
+PROMPT = """
+Act as a Senior Project Manager. Analyze this task:
+Title: {title}
+Description: {description}
+
+Team Discussion:
+{comments}
+
+Provide 3 short, actionable tips to move forward.
+"""
+
+# Признаки блокера в обсуждении (англ. и рус.)
+BLOCKER_WORDS = re.compile(r"\b(block\w*|waiting|stuck|depends on|blocked by|жд[её]м|блок\w*|завис\w*)", re.IGNORECASE)
+
+
+class GeminiProvider(IAIProvider):
+    """Google Gemini. SDK импортируется и настраивается при первом запросе, а не на старте приложения."""
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = getenv("GEMINI_MODEL", "gemini-1.5-flash")):
+        self.api_key = api_key
+        self.model_name = model
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def analyze_task(self, title: str, description: Optional[str], comments: List[Comment]) -> str:
+        prompt = PROMPT.format(
+            title=title,
+            description=description or "No description",
+            comments="\n".join(f"- {c.text}" for c in comments) if comments else "No comments yet."
+        )
+        response = await self._get_model().generate_content_async(prompt)
+        return response.text
+
+
+class LocalAIProvider(IAIProvider):
+    """
+    Детерминированные советы по правилам, без сети: работает офлайн, в тестах
+    и как запасной провайдер, когда облачная модель медленная или недоступна.
+    """
+    name = "local"
+
+    async def analyze_task(self, title: str, description: Optional[str], comments: List[Comment]) -> str:
+        tips = []
+        blockers = [c for c in comments if BLOCKER_WORDS.search(c.text)]
+        if blockers:
+            tips.append(f"Resolve the blocker first: \"{blockers[-1].text[:120]}\" — name an owner and a date for it.")
+        if not description or len(description) < 40:
+            tips.append("Write a description with acceptance criteria so everyone agrees on what \"done\" means.")
+        if not comments:
+            tips.append("Start the discussion: ask the assignee for a short status update and the next step.")
+        elif comments[-1].text.rstrip().endswith("?"):
+            tips.append("The latest question in the discussion is still unanswered — reply to it or pull in the right person.")
+        if len(comments) >= 10:
+            tips.append("The thread is long: summarise the decisions made so far in one comment.")
+        tips.append(f"Split \"{title[:60]}\" into subtasks that can each be finished in a day.")
+        tips.append("Check that the deadline is still realistic and tell the team if it is not.")
+        return "\n".join(f"{i}. {tip}" for i, tip in enumerate(tips[:3], 1))
+
+
+def build_ai_providers() -> List[IAIProvider]:
+    """
+    Провайдеры в порядке предпочтения по AI_PROVIDERS (через запятую: gemini, local).
+    Gemini без GEMINI_API_KEY пропускается.
+    """
+    providers: List[IAIProvider] = []
+    for name in (n.strip() for n in getenv("AI_PROVIDERS", "gemini,local").split(",")):
+        if name == "gemini" and getenv("GEMINI_API_KEY"):
+            providers.append(GeminiProvider(getenv("GEMINI_API_KEY")))
+        elif name == "local":
+            providers.append(LocalAIProvider())
+    return providers
@@ -1,59 +1,170 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-from typing import List
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
 from src.domain.entities import Comment
+from src.domain.interfaces import IAIProvider
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_ADVICE = (
+    "Note: AI analysis is temporarily unavailable. "
+    "Local tip: Check task clarity and assignee availability."
+)
+
+
+class ProviderStats:
+    """Скользящее окно задержек и исходов вызовов провайдера: из него считаются p95 и доля ошибок."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=50)
+        self.calls = 0
+        self.errors = 0
+        self.hedge_wins = 0
+        self.last_error_at = 0.0
+
+    def record_success(self, seconds: float) -> None:
+        self.calls += 1
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def record_error(self, seconds: float) -> None:
+        self.calls += 1
+        self.errors += 1
+        # Таймаут тоже задержка: без нее p95 медленного провайдера выглядел бы лучше, чем есть
+        self.latencies.append(seconds)
+        self.outcomes.append(False)
+        self.last_error_at = time.monotonic()
+
+    def record_cancelled(self, seconds: float) -> None:
+        # Проигравший гонку запрос отменен: реальная задержка не меньше прошедшего времени
+        self.latencies.append(seconds)
 
-load_dotenv()
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "hedge_wins": self.hedge_wins,
+            "error_rate": round(self.error_rate(), 3),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
 
 
 class AIService:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        self.enabled = False
-
-        if not api_key:
-            print("⚠️ WARNING: GEMINI_API_KEY not found in env!")
-        else:
-            # --- DEBUG BLOCK ---
-            # Показываем первые 5 символов и длину, чтобы понять, не попал ли мусор
-            print(f"DEBUG: Key loaded. Starts with: '{api_key[:5]}...', Length: {len(api_key)}")
-            # -------------------
-
-            try:
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                self.enabled = True
-                print("✅ AI Service Initialized Successfully")
-            except Exception as e:
-                print(f"❌ AI Init Error: {e}")
+    """
+    AI-анализ задачи поверх нескольких IAIProvider (по порядку предпочтения).
+    Hedging: если первый провайдер не ответил за свой p95, параллельно спрашиваем следующий;
+    побеждает первый успешный ответ, остальные запросы отменяются.
+    Ошибка провайдера сразу передает запрос следующему; провайдер с высокой долей ошибок
+    уходит в конец очереди, пока не истечет cooldown после последней ошибки.
+    """
+
+    def __init__(
+            self,
+            providers: List[IAIProvider],
+            timeout: float = float(getenv("AI_TIMEOUT", "15")),
+            default_hedge_delay: float = float(getenv("AI_HEDGE_DELAY", "2.0")),
+            min_hedge_delay: float = float(getenv("AI_HEDGE_MIN_DELAY", "0.05")),
+            min_samples: int = int(getenv("AI_HEDGE_MIN_SAMPLES", "20")),
+            max_error_rate: float = float(getenv("AI_MAX_ERROR_RATE", "0.5")),
+            cooldown: float = float(getenv("AI_PROVIDER_COOLDOWN", "30"))
+    ):
+        self.providers = providers
+        self.timeout = timeout
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.provider_stats: Dict[str, ProviderStats] = {p.name: ProviderStats() for p in providers}
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.providers)
+
+    def _healthy(self, provider: IAIProvider) -> bool:
+        stats = self.provider_stats[provider.name]
+        if len(stats.outcomes) < 5 or stats.error_rate() <= self.max_error_rate:
+            return True
+        # Half-open: после cooldown провайдер снова получает запросы и может восстановить статистику
+        return time.monotonic() - stats.last_error_at > self.cooldown
+
+    def _ranked(self) -> List[IAIProvider]:
+        return sorted(self.providers, key=lambda p: not self._healthy(p))
+
+    def hedge_delay(self, provider: IAIProvider) -> float:
+        """Сколько ждать провайдера, прежде чем отправить дублирующий запрос следующему."""
+        stats = self.provider_stats[provider.name]
+        p95 = stats.p95() if len(stats.latencies) >= self.min_samples else None
+        delay = self.default_hedge_delay if p95 is None else p95
+        return min(max(delay, self.min_hedge_delay), self.timeout)
 
     async def analyze_task_context(self, title: str, description: str | None, comments: List[Comment]) -> str:
         if not self.enabled:
-            return "AI Service is disabled (Check API Key)."
+            return "AI Service is disabled (Check AI_PROVIDERS / GEMINI_API_KEY)."
 
-        # Собираем контекст
-        comments_text = "\n".join([f"- {c.text}" for c in comments]) if comments else "No comments yet."
+        queue = self._ranked()
+        running: Dict[asyncio.Task, tuple] = {}
+        deadline = time.monotonic() + self.timeout
 
-        prompt = f"""
-        Act as a Senior Project Manager. Analyze this task:
-        Title: {title}
-        Description: {description or 'No description'}
+        def launch() -> float:
+            provider = queue.pop(0)
+            task = asyncio.create_task(provider.analyze_task(title, description, comments))
+            running[task] = (provider, time.monotonic(), bool(running))
+            return time.monotonic() + self.hedge_delay(provider)
 
-        Team Discussion:
-        {comments_text}
+        hedge_at = launch()
+        try:
+            while running:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wait_until = min(deadline, hedge_at) if queue else deadline
+                done, _ = await asyncio.wait(
+                    running, timeout=max(0.0, wait_until - now), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    provider, started, hedged = running.pop(task)
+                    stats = self.provider_stats[provider.name]
+                    if task.exception() is None:
+                        stats.record_success(time.monotonic() - started)
+                        stats.hedge_wins += hedged
+                        return task.result()
+                    stats.record_error(time.monotonic() - started)
+                    logger.warning("AI provider %s failed", provider.name, exc_info=task.exception())
+                # Ошибка — сразу к следующему провайдеру; тишина дольше p95 — дублирующий запрос
+                if queue and (done or time.monotonic() >= hedge_at):
+                    hedge_at = launch()
+        finally:
+            for task, (provider, started, _) in running.items():
+                task.cancel()
+                if time.monotonic() >= deadline:
+                    self.provider_stats[provider.name].record_error(time.monotonic() - started)
+                else:
+                    self.provider_stats[provider.name].record_cancelled(time.monotonic() - started)
 
-        Provide 3 short, actionable tips to move forward.
-        """
+        self.fallbacks += 1
+        logger.error("AI analysis failed on all providers", extra={"providers": [p.name for p in self.providers]})
+        return FALLBACK_ADVICE
 
-        try:
-            # Асинхронный вызов
-            response = await self.model.generate_content_async(prompt)
-            return response.text
-        except Exception as e:
-            # ВОТ ЗДЕСЬ МЫ УВИДИМ РЕАЛЬНУЮ ПРИЧИНУ В КОНСОЛИ
-            print(f"\n🔥 CRITICAL AI ERROR: {e}\n")
-            return (
-                f"Note: AI Cloud connection failed. Error details logged in server console. "
-                f"Local tip: Check task clarity and assignee availability."
-            )
\ No newline at end of file
+    def stats(self) -> dict:
+        return {
+            "providers": {name: stats.snapshot() for name, stats in self.provider_stats.items()},
+            "hedge_delays_ms": {p.name: round(self.hedge_delay(p) * 1000, 1) for p in self.providers},
+            "fallbacks": self.fallbacks,
+        }
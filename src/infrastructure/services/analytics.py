@@ -0,0 +1,194 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.infrastructure.repositories.analytics_repository import AnalyticsRepository
+from src.core.config import getenv
+
+HOUR = 3600.0
+WEEK = 7 * 24 * HOUR
+# 1970-01-01 — четверг; недели считаем с понедельника 1970-01-05
+WEEK_ORIGIN = 4 * 24 * HOUR
+PERCENTILES = (50, 75, 90, 95)
+
+
+def _week_bucket(epoch: np.ndarray) -> np.ndarray:
+    return np.floor((epoch - WEEK_ORIGIN) / WEEK).astype(np.int64)
+
+
+def _week_start(bucket: int) -> datetime:
+    return datetime.fromtimestamp(WEEK_ORIGIN + bucket * WEEK, tz=timezone.utc)
+
+
+def _percentiles(hours: np.ndarray) -> Dict[str, Optional[float]]:
+    if hours.size == 0:
+        return {f"p{p}": None for p in PERCENTILES}
+    values = np.percentile(hours, PERCENTILES)
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, values)}
+
+
+@dataclass
+class TaskExtract:
+    """
+    Колоночный снимок задач одного отдела (или всех) в массивах NumPy.
+    finished отсортирован по возрастанию: недельные срезы берутся через searchsorted, без масок на каждую неделю.
+    """
+    created: np.ndarray         # float64, epoch создания DONE-задач
+    finished: np.ndarray        # float64, epoch завершения DONE-задач
+    open_executor: np.ndarray   # str, "" — не назначен
+    open_department: np.ndarray  # str, "" — без отдела
+    open_deadline: np.ndarray   # float64, NaN — без дедлайна
+    loaded_at: float
+    reports: Dict[tuple, dict] = field(default_factory=dict)
+
+    @classmethod
+    def from_columns(cls, finished: dict, open_: dict) -> "TaskExtract":
+        finished_at = np.asarray(finished["finished"], dtype=np.float64)
+        created_at = np.asarray(finished["created"], dtype=np.float64)
+        order = np.argsort(finished_at, kind="stable")
+        return cls(
+            created=created_at[order],
+            finished=finished_at[order],
+            open_executor=np.asarray(open_["executor"], dtype=str),
+            open_department=np.asarray(open_["department"], dtype=str),
+            open_deadline=np.asarray(open_["deadline"], dtype=np.float64),
+            loaded_at=time.time()
+        )
+
+    def _week_bounds(self, weeks: int) -> Tuple[int, np.ndarray]:
+        """Первая неделя окна и границы недель в epoch (weeks + 1 значение)."""
+        first = int(_week_bucket(np.array([self.loaded_at]))[0]) - weeks + 1
+        return first, WEEK_ORIGIN + (first + np.arange(weeks + 1)) * WEEK
+
+    # --- ОТЧЕТЫ ---
+    def cycle_time(self, weeks: int) -> dict:
+        """Время от создания до DONE (часы): сводка по окну и медиана по неделям завершения."""
+        first, bounds = self._week_bounds(weeks)
+        cuts = np.searchsorted(self.finished, bounds)
+        window = slice(cuts[0], cuts[-1])
+        hours = (self.finished[window] - self.created[window]) / HOUR
+
+        series = []
+        for i in range(weeks):
+            week_hours = (self.finished[cuts[i]:cuts[i + 1]] - self.created[cuts[i]:cuts[i + 1]]) / HOUR
+            series.append({
+                "week_start": _week_start(first + i),
+                "count": int(week_hours.size),
+                "p50": round(float(np.median(week_hours)), 2) if week_hours.size else None
+            })
+        return {
+            "count": int(hours.size),
+            "mean_hours": round(float(hours.mean()), 2) if hours.size else None,
+            **_percentiles(hours),
+            "weekly": series
+        }
+
+    def throughput(self, weeks: int) -> dict:
+        """Сколько задач закрыто в DONE по неделям."""
+        first, bounds = self._week_bounds(weeks)
+        counts = np.diff(np.searchsorted(self.finished, bounds))
+        return {
+            "total": int(counts.sum()),
+            "weekly_mean": round(float(counts.mean()), 2),
+            "weekly": [
+                {"week_start": _week_start(first + i), "done": int(c)} for i, c in enumerate(counts)
+            ]
+        }
+
+    def workload(self) -> dict:
+        """Открытые и просроченные задачи на исполнителя и на отдел."""
+        overdue = self.open_deadline < self.loaded_at  # NaN < x -> False
+
+        def group(keys: np.ndarray) -> list:
+            if keys.size == 0:
+                return []
+            labels, inverse = np.unique(keys, return_inverse=True)
+            open_counts = np.bincount(inverse, minlength=labels.size)
+            overdue_counts = np.bincount(inverse, weights=overdue, minlength=labels.size).astype(np.int64)
+            order = np.argsort(-open_counts, kind="stable")
+            return [
+                {"id": str(labels[i]) or None, "open": int(open_counts[i]), "overdue": int(overdue_counts[i])}
+                for i in order
+            ]
+
+        return {
+            "open": int(self.open_executor.size),
+            "overdue": int(overdue.sum()),
+            "by_executor": group(self.open_executor),
+            "by_department": group(self.open_department)
+        }
+
+
+class AnalyticsCache:
+    """
+    Снимки TaskExtract по отделам (None — вся компания) с TTL и сбросом при записи задач.
+    Одновременные промахи по одному ключу ждут одну загрузку; загрузка, начатая до invalidate,
+    свой результат в кэш уже не кладет (поколения).
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            ttl: float = float(getenv("ANALYTICS_CACHE_TTL", "300")),
+            window_days: int = int(getenv("ANALYTICS_WINDOW_DAYS", "365"))
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.window_days = window_days
+        self._entries: Dict[Optional[UUID], TaskExtract] = {}
+        self._generations: Dict[Optional[UUID], int] = {}
+        self._locks: Dict[Optional[UUID], asyncio.Lock] = {}
+
+    @property
+    def max_weeks(self) -> int:
+        return self.window_days // 7
+
+    async def _load(self, department_id: Optional[UUID]) -> TaskExtract:
+        since = datetime.now(timezone.utc) - timedelta(days=self.window_days)
+        async with self.session_factory() as session:
+            repository = AnalyticsRepository(session)
+            finished = await repository.finished_columns(since, department_id)
+            open_ = await repository.open_columns(department_id)
+        # Сортировка и перекладка в массивы на миллионах строк — не в event loop
+        return await asyncio.to_thread(TaskExtract.from_columns, finished, open_)
+
+    async def get(self, department_id: Optional[UUID]) -> TaskExtract:
+        entry = self._entries.get(department_id)
+        if entry is not None and time.time() - entry.loaded_at < self.ttl:
+            return entry
+
+        lock = self._locks.setdefault(department_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(department_id)
+            if entry is not None and time.time() - entry.loaded_at < self.ttl:
+                return entry
+            generation = self._generations.setdefault(department_id, 0)
+            entry = await self._load(department_id)
+            if self._generations.get(department_id, 0) == generation:
+                self._entries[department_id] = entry
+            return entry
+
+    async def report(self, department_id: Optional[UUID], name: str, *args) -> dict:
+        """Готовый отчет из снимка; повторные запросы с теми же параметрами не пересчитываются."""
+        extract = await self.get(department_id)
+        key = (name, *args)
+        if key not in extract.reports:
+            extract.reports[key] = await asyncio.to_thread(getattr(extract, name), *args)
+        return extract.reports[key]
+
+    def invalidate(self, *department_ids: Optional[UUID]) -> None:
+        """Сброс после записи задач: затронутые отделы и общий снимок компании."""
+        for key in {None, *department_ids}:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_all(self) -> None:
+        for key in set(self._entries) | set(self._generations):
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.infrastructure.repositories.archive_repository import ArchiveRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+
+async def run_archival(session_factory: async_sessionmaker, older_than_days: int, batch_size: int = 1000) -> dict:
+    """Переносит в архив все DONE/CANCELLED задачи старше N дней. Короткими транзакциями по batch_size."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    async with session_factory() as session:
+        repo = ArchiveRepository(session)
+        await repo.ensure_year_partitions()
+
+        total_tasks = total_comments = 0
+        while True:
+            tasks_moved, comments_moved = await repo.archive_batch(cutoff, batch_size)
+            total_tasks += tasks_moved
+            total_comments += comments_moved
+            if tasks_moved < batch_size:
+                break
+    return {"tasks": total_tasks, "comments": total_comments}
+
+
+class ArchiveJob:
+    """Периодический запуск архивации внутри приложения (ARCHIVE_INTERVAL_HOURS=0 — выключено)."""
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            older_than_days: int = int(getenv("ARCHIVE_AFTER_DAYS", "90")),
+            interval_hours: float = float(getenv("ARCHIVE_INTERVAL_HOURS", "0"))
+    ):
+        self.session_factory = session_factory
+        self.older_than_days = older_than_days
+        self.interval_hours = interval_hours
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                moved = await run_archival(self.session_factory, self.older_than_days)
+                logger.info("Archived %s tasks, %s comments", moved["tasks"], moved["comments"], extra=moved)
+            except Exception:
+                logger.exception("Archival error")
+            await asyncio.sleep(self.interval_hours * 3600)
+
+    def start(self) -> None:
+        if self.interval_hours > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def main() -> None:
+    from src.infrastructure.database.session import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Move finished tasks to cold storage")
+    parser.add_argument("--days", type=int, default=int(getenv("ARCHIVE_AFTER_DAYS", "90")))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        moved = await run_archival(AsyncSessionLocal, args.days, args.batch_size)
+        print(f"Archived {moved['tasks']} tasks and {moved['comments']} comments older than {args.days} days.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.domain.entities import Notification, NotificationKind, ReminderStage
+from src.infrastructure.repositories.task_repository import TaskRepository
+from src.infrastructure.repositories.outbox_repository import OutboxRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    Планировщик напоминаний о дедлайнах на куче таймеров.
+    В памяти держим только напоминания в пределах горизонта (по умолчанию сутки);
+    горизонт перечитывается по частичному индексу открытых дедлайнов, без сканирования tasks.
+    Факт отправки фиксируется в tasks.reminder_stage, поэтому рестарт не дублирует напоминания.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            lead: timedelta = timedelta(minutes=float(getenv("DEADLINE_REMINDER_LEAD_MINUTES", "60"))),
+            horizon: timedelta = timedelta(hours=float(getenv("DEADLINE_HORIZON_HOURS", "24")))
+    ):
+        self.session_factory = session_factory
+        self.lead = lead
+        self.horizon = horizon
+
+        # (fire_at, seq, task_id, deadline, stage)
+        self._heap: List[Tuple[datetime, int, UUID, datetime, ReminderStage]] = []
+        self._scheduled: Set[Tuple[UUID, datetime, ReminderStage]] = set()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._horizon_end = datetime.now(timezone.utc)
+        self._task: Optional[asyncio.Task] = None
+        self.fired_total = 0
+
+    # --- HEAP ---
+    def schedule(self, task_id: UUID, deadline: Optional[datetime], stage_done: int = ReminderStage.NONE.value) -> None:
+        """Ставит напоминания по задаче. Дальше горизонта не храним — их подберет следующая перезагрузка."""
+        if deadline is None:
+            return
+        for stage, fire_at in (
+                (ReminderStage.APPROACHING, deadline - self.lead),
+                (ReminderStage.OVERDUE, deadline)
+        ):
+            key = (task_id, deadline, stage)
+            if stage.value <= stage_done or fire_at > self._horizon_end or key in self._scheduled:
+                continue
+            self._scheduled.add(key)
+            heapq.heappush(self._heap, (fire_at, next(self._seq), task_id, deadline, stage))
+            # Новое событие раньше текущего "будильника" — будим цикл
+            if self._heap[0][2] == task_id:
+                self._wakeup.set()
+
+    async def reload(self) -> None:
+        """Подтягивает в кучу всё, что сработает до конца нового горизонта."""
+        self._horizon_end = datetime.now(timezone.utc) + self.horizon
+        async with self.session_factory() as session:
+            rows = await TaskRepository(session).get_pending_reminders(self._horizon_end + self.lead)
+        for task_id, deadline, stage_done in rows:
+            self.schedule(task_id, deadline, stage_done)
+
+    # --- FIRING ---
+    async def _fire(self, task_id: UUID, deadline: datetime, stage: ReminderStage) -> None:
+        # Задача уже просрочена — предупреждение "скоро дедлайн" не имеет смысла
+        if stage == ReminderStage.APPROACHING and datetime.now(timezone.utc) >= deadline:
+            return
+        async with self.session_factory() as session:
+            task = await TaskRepository(session).claim_reminder(task_id, deadline, stage)
+            if task is None:
+                return
+            overdue = stage == ReminderStage.OVERDUE
+            OutboxRepository(session).enqueue(Notification(
+                kind=NotificationKind.TASK_OVERDUE if overdue else NotificationKind.DEADLINE_APPROACHING,
+                recipient_id=task.executor_id or task.owner_id,
+                subject=f"{'Overdue' if overdue else 'Deadline approaching'}: {task.title}",
+                body=f"Task '{task.title}' {'is past' if overdue else 'is due at'} its deadline {deadline.isoformat()}."
+            ))
+            await session.commit()
+        self.fired_total += 1
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.now(timezone.utc)
+            if now >= self._horizon_end - self.horizon / 2:
+                try:
+                    await self.reload()
+                except Exception:
+                    logger.exception("Deadline scheduler reload error")
+
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id, deadline, stage = heapq.heappop(self._heap)
+                self._scheduled.discard((task_id, deadline, stage))
+                try:
+                    await self._fire(task_id, deadline, stage)
+                except Exception:
+                    logger.exception("Deadline reminder error for task %s", task_id)
+
+            # Спим до ближайшего таймера или до следующей перезагрузки горизонта
+            next_reload = self._horizon_end - self.horizon / 2
+            wake_at = min(self._heap[0][0], next_reload) if self._heap else next_reload
+            timeout = max((wake_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        await self.reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"scheduled": len(self._heap), "fired": self.fired_total}
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import Dict, List
+from uuid import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.domain.entities import TaskStatus
+from src.domain.graph import DependencyGraph
+from src.infrastructure.repositories.dependency_repository import DependencyRepository
+from src.core.config import getenv
+
+
+class DependencyGraphCache:
+    """
+    Граф зависимостей целиком в памяти процесса.
+    Изменения этого воркера применяются сразу; изменения других воркеров подтягиваются
+    полной перезагрузкой раз в DEPENDENCY_GRAPH_TTL секунд (рёбер немного — это один дешевый запрос).
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            ttl: float = float(getenv("DEPENDENCY_GRAPH_TTL", "30"))
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.graph = DependencyGraph()
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def reload(self) -> None:
+        async with self.session_factory() as session:
+            edges, statuses = await DependencyRepository(session).load_graph()
+        graph = DependencyGraph()
+        for task_id, depends_on_id in edges:
+            graph.depends_on.setdefault(task_id, set()).add(depends_on_id)
+        for task_id, status in statuses:
+            graph.set_status(task_id, status)
+        self.graph = graph
+        self._loaded_at = time.monotonic()
+
+    async def get(self) -> DependencyGraph:
+        if time.monotonic() - self._loaded_at > self.ttl:
+            async with self._lock:
+                # Пока ждали lock, граф мог перезагрузить соседний запрос
+                if time.monotonic() - self._loaded_at > self.ttl:
+                    await self.reload()
+        return self.graph
+
+    # --- Локальные изменения (после успешного коммита в БД) ---
+    def edge_added(self, task_id: UUID, depends_on_id: UUID, statuses: Dict[UUID, TaskStatus]) -> None:
+        self.graph.depends_on.setdefault(task_id, set()).add(depends_on_id)
+        for node, status in statuses.items():
+            self.graph.set_status(node, status)
+
+    def edge_removed(self, task_id: UUID, depends_on_id: UUID) -> None:
+        self.graph.remove_edge(task_id, depends_on_id)
+
+    def status_changed(self, task_id: UUID, status: TaskStatus) -> None:
+        # Статусы храним только для узлов графа, иначе кэш разрастется до размера tasks
+        if task_id in self.graph.statuses:
+            self.graph.set_status(task_id, status)
+
+    def blockers(self, task_id: UUID) -> Dict[UUID, int]:
+        return self.graph.blockers(task_id)
+
+    def critical_path(self, task_id: UUID) -> List[UUID]:
+        return self.graph.critical_path(task_id)
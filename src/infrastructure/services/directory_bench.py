@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Awaitable, Callable, List
+from uuid import uuid4
+from sqlalchemy import delete, insert, select
+
+from src.domain.entities import UserRole
+from src.infrastructure.database.models import UserModel, DepartmentModel
+from src.infrastructure.repositories.user_repository import UserRepository
+
+# Сгенерированные пользователи узнаются по домену и удаляются после замера
+BENCH_DOMAIN = "directory-bench.example.com"
+FIRST_NAMES = ["Anna", "Boris", "Chen", "Daria", "Emil", "Fatima", "Georg", "Hana", "Ivan", "Julia", "Karim", "Lena",
+               "Marco", "Nina", "Oleg", "Priya", "Quentin", "Rosa", "Sergei", "Tanya", "Umar", "Vera", "Walter", "Yuki"]
+LAST_NAMES = ["Ivanova", "Smith", "Kowalski", "Nguyen", "Garcia", "Petrov", "Müller", "Rossi", "Tanaka", "Okafor",
+              "Andersen", "Haddad", "Novak", "Silva", "Kim", "Horvat", "Laine", "Dubois", "Yilmaz", "Moreau"]
+
+
+async def seed(session_factory, users: int, batch_size: int = 5000) -> List:
+    """Вставляет users пользователей, раскиданных по существующим отделам. Возвращает id отделов."""
+    async with session_factory() as session:
+        departments = list((await session.execute(select(DepartmentModel.id))).scalars().all()) or [None]
+        rng = random.Random(42)
+        for start in range(0, users, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, users)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                rows.append({
+                    "id": uuid4(),
+                    "email": f"{first}.{last}.{i}@{BENCH_DOMAIN}".lower(),
+                    "hashed_password": "!",
+                    "full_name": f"{first} {last}",
+                    "role": UserRole.MANAGER.value if i % 50 == 0 else UserRole.EMPLOYEE.value,
+                    "is_active": i % 20 != 0,
+                    "department_id": rng.choice(departments),
+                })
+            await session.execute(insert(UserModel), rows)
+            await session.commit()
+    return departments
+
+
+async def measure(session_factory, call: Callable[[UserRepository], Awaitable], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await call(UserRepository(session))
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main() -> None:
+    """python -m src.infrastructure.services.directory_bench — задержка поиска по справочнику на --users пользователях."""
+    from src.infrastructure.database.session import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Benchmark paginated user directory search")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="Keep the generated users after the run")
+    args = parser.parse_args()
+
+    try:
+        started = time.perf_counter()
+        departments = await seed(AsyncSessionLocal, args.users)
+        print(f"seeded {args.users:,} users in {time.perf_counter() - started:.1f}s")
+
+        async def deep_page(repo: UserRepository):
+            # Десятая страница: keyset не перечитывает предыдущие, в отличие от OFFSET
+            users, cursor = await repo.search(limit=50)
+            for _ in range(9):
+                users, cursor = await repo.search(limit=50, after=cursor)
+
+        scenarios = {
+            "first page": lambda repo: repo.search(limit=50),
+            "10th page (keyset)": deep_page,
+            "department + active": lambda repo: repo.search(limit=50, department_id=departments[0], is_active=True),
+            "prefix 'ma'": lambda repo: repo.search(limit=50, query="ma"),
+            "search 'kowal'": lambda repo: repo.search(limit=50, query="kowal"),
+            "email 'tanaka.1'": lambda repo: repo.search(limit=50, query="tanaka.1"),
+            "fuzzy 'kowalsky'": lambda repo: repo.search(limit=50, query="kowalsky", fuzzy=True),
+        }
+        for name, call in scenarios.items():
+            timings = sorted(await measure(AsyncSessionLocal, call, args.repeat))
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{name:<22} p50={statistics.median(timings):7.2f} ms  p95={p95:7.2f} ms")
+    finally:
+        if not args.keep:
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(UserModel).where(UserModel.email.like(f"%@{BENCH_DOMAIN}")))
+                await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+import csv
+import importlib.util
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, List
+from uuid import UUID
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """pyarrow — опциональная зависимость (requirements-optional.txt); проверяем до начала отдачи ответа."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _plain(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def to_csv(batches: AsyncIterator[List[dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows({k: _plain(v) for k, v in row.items()} for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        # Буфер переиспользуем: в памяти не больше одной пачки
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def to_ndjson(batches: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps({k: _plain(v) for k, v in row.items()}, ensure_ascii=False) + "\n" for row in batch
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподобный приемник для ParquetWriter: копит записанные байты до следующей отдачи клиенту."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+async def to_parquet(batches: AsyncIterator[List[dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    """Каждая пачка — отдельная row group; футер пишется в конце. pyarrow нужен только для этого формата."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Схема задается явно: иначе пачка, где колонка целиком NULL, выведет другой тип
+    schema = pa.schema([
+        (name, pa.int64() if name == "comment_count" else pa.string()) for name in columns
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for batch in batches:
+            table = pa.Table.from_pylist([{k: _plain(v) for k, v in row.items()} for row in batch], schema=schema)
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.infrastructure.repositories.cached_task_repository import LruTtlCache
+from src.infrastructure.repositories.idempotency_repository import IdempotencyRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(ValueError):
+    """Тот же Idempotency-Key пришел с другим запросом (другой путь или тело)."""
+
+
+class IdempotencyInProgress(Exception):
+    """Запрос с этим ключом еще выполняется в другом воркере."""
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: Any
+    fingerprint: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def fingerprint(*parts: Any) -> str:
+    """Отпечаток запроса (путь, тело, параметры) — ключ нельзя переиспользовать для другого запроса."""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Повторы запросов с Idempotency-Key отдают первый ответ вместо повторной записи.
+    Порядок проверки: LRU в памяти -> ожидание такого же запроса в этом процессе -> таблица idempotency_keys.
+    Одновременные запросы с одним ключом в процессе склеиваются в одно выполнение (future);
+    между воркерами ключ занимается INSERT ... ON CONFLICT, и второй воркер получает IdempotencyInProgress.
+    Ключ занимается короткой арендой (lease_seconds), готовый ответ хранится ttl_hours: если воркер упал
+    посреди запроса, повтор клиента перезаймет ключ через lease_seconds, а не через сутки.
+    Запросы без ключа сюда не попадают вовсе.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            ttl_hours: float = float(getenv("IDEMPOTENCY_TTL_HOURS", "24")),
+            cache_size: int = int(getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+            purge_interval: float = float(getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600")),
+            lease_seconds: float = float(getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+    ):
+        self.session_factory = session_factory
+        self.ttl = timedelta(hours=ttl_hours)
+        # Должна быть дольше самого долгого запроса: иначе повтор перезаймет ключ у живого выполнения
+        self.lease = timedelta(seconds=lease_seconds)
+        self.purge_interval = purge_interval
+        # Ответ в памяти живет не дольше, чем в таблице
+        self.cache: LruTtlCache[StoredResponse] = LruTtlCache(cache_size, min(ttl_hours * 3600, 600))
+        self._inflight: Dict[Tuple[UUID, str], asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # --- ХРАНИЛИЩЕ (переопределяется в бенчмарке) ---
+    async def _claim(self, user_id: UUID, key: str, request_fingerprint: str) -> bool:
+        async with self.session_factory() as session:
+            return await IdempotencyRepository(session).claim(
+                user_id, key, request_fingerprint, datetime.now(timezone.utc) + self.lease
+            )
+
+    async def _load(self, user_id: UUID, key: str) -> Optional[StoredResponse]:
+        """Сохраненный ответ; None — ключ свободен, IdempotencyInProgress — выполняется в другом воркере."""
+        async with self.session_factory() as session:
+            row = await IdempotencyRepository(session).get(user_id, key)
+        if row is None:
+            return None
+        if row.status_code is None:
+            raise IdempotencyInProgress(key)
+        return StoredResponse(row.status_code, row.body, row.fingerprint, row.headers or {})
+
+    async def _complete(self, user_id: UUID, key: str, response: StoredResponse) -> None:
+        async with self.session_factory() as session:
+            await IdempotencyRepository(session).complete(
+                user_id, key, response.status_code, response.body, response.headers,
+                datetime.now(timezone.utc) + self.ttl
+            )
+
+    async def _release(self, user_id: UUID, key: str) -> None:
+        async with self.session_factory() as session:
+            await IdempotencyRepository(session).release(user_id, key)
+
+    # --- API ---
+    @staticmethod
+    def _check(response: StoredResponse, request_fingerprint: str) -> StoredResponse:
+        if response.fingerprint != request_fingerprint:
+            raise IdempotencyKeyReused("Idempotency-Key was already used for a different request")
+        return response
+
+    async def run(
+            self,
+            user_id: UUID,
+            key: str,
+            request_fingerprint: str,
+            produce: Callable[[], Awaitable[StoredResponse]]
+    ) -> Tuple[StoredResponse, bool]:
+        """Выполняет produce не больше одного раза на ключ. Возвращает (ответ, replayed)."""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be 1..{MAX_KEY_LENGTH} characters")
+        cache_key = (user_id, key)
+
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return self._check(cached, request_fingerprint), True
+
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            # shield: отмена одного ожидающего клиента не должна отменить общую запись
+            return self._check(await asyncio.shield(inflight), request_fingerprint), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            if await self._claim(user_id, key, request_fingerprint):
+                try:
+                    response = await produce()
+                except BaseException:
+                    await self._release(user_id, key)
+                    raise
+                response.fingerprint = request_fingerprint
+                await self._complete(user_id, key, response)
+                replayed = False
+            else:
+                response = await self._load(user_id, key)
+                if response is None:
+                    # Аренда или ответ истекли между claim и чтением — повтор клиента перезаймет ключ
+                    raise IdempotencyInProgress(key)
+                replayed = True
+            self.cache.put(cache_key, response)
+            future.set_result(response)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Никто не ждет — гасим "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[cache_key]
+        return self._check(response, request_fingerprint), replayed
+
+    # --- ОЧИСТКА ---
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                async with self.session_factory() as session:
+                    await IdempotencyRepository(session).purge_expired()
+            except Exception:
+                logger.exception("Idempotency purge error")
+
+    def start(self) -> None:
+        if self.purge_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def main() -> None:
+    """python -m src.infrastructure.services.idempotency — накладные расходы ключей без Postgres."""
+    parser = argparse.ArgumentParser(description="Benchmark IdempotencyStore overhead")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated DB round trip")
+    parser.add_argument("--storm", type=int, default=50, help="Concurrent retries with one key")
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    class MemoryStore(IdempotencyStore):
+        def __init__(self):
+            super().__init__(session_factory=None, purge_interval=0)
+            self.rows: Dict[Tuple[UUID, str], Optional[StoredResponse]] = {}
+
+        async def _claim(self, user_id, key, request_fingerprint):
+            await asyncio.sleep(latency)
+            if (user_id, key) in self.rows:
+                return False
+            self.rows[(user_id, key)] = None
+            return True
+
+        async def _load(self, user_id, key):
+            await asyncio.sleep(latency)
+            if self.rows.get((user_id, key), False) is None:
+                raise IdempotencyInProgress(key)
+            return self.rows.get((user_id, key))
+
+        async def _complete(self, user_id, key, response):
+            await asyncio.sleep(latency)
+            self.rows[(user_id, key)] = response
+
+        async def _release(self, user_id, key):
+            self.rows.pop((user_id, key), None)
+
+    writes = 0
+
+    async def produce() -> StoredResponse:
+        nonlocal writes
+        writes += 1
+        await asyncio.sleep(latency)  # сама запись задачи
+        return StoredResponse(201, {"id": writes}, "")
+
+    store = MemoryStore()
+    user = UUID(int=1)
+    request = fingerprint("POST", "/tasks/", '{"title": "Task"}')
+
+    async def timed(name: str, call: Callable[[int], Awaitable[Any]]) -> None:
+        started = time.perf_counter()
+        for i in range(args.requests):
+            await call(i)
+        per_request = (time.perf_counter() - started) / args.requests * 1000
+        print(f"{name:<22} {per_request:.3f} ms/request")
+
+    await timed("no key", lambda i: produce())
+    await timed("first use of a key", lambda i: store.run(user, f"k{i}", request, produce))
+    await timed("replay (memory hit)", lambda i: store.run(user, f"k{i}", request, produce))
+    store.cache.clear()
+    await timed("replay (table hit)", lambda i: store.run(user, f"k{i}", request, produce))
+
+    writes = 0
+    results = await asyncio.gather(*(store.run(user, "storm", request, produce) for _ in range(args.storm)))
+    print(f"retry storm: {args.storm} concurrent requests -> {writes} write(s), "
+          f"{sum(replayed for _, replayed in results)} replayed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
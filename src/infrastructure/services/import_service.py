@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import IO, Callable, Iterator, List, Optional, Tuple
+from uuid import UUID
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Task
+from src.infrastructure.database.models import TaskModel, UserModel, DepartmentModel
+from src.infrastructure.database.portable import dialect_name, upsert, greatest
+
+# Колонки, которые понимает импорт (заголовок CSV). Обязательна только title.
+IMPORT_COLUMNS = [
+    "id", "title", "description", "owner_id", "executor_id", "target_dept_id",
+    "status", "priority", "deadline", "created_at", "updated_at"
+]
+STAGING_COLUMNS = ["line_no"] + IMPORT_COLUMNS
+MAX_REPORTED_ERRORS = 1000
+ORPHAN_ERROR = "owner_id, executor_id or target_dept_id references a missing row"
+SHARD_ERROR = "target_dept_id belongs to a department on another shard; import writes only to the primary database"
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: List[dict] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def reject(self, line_no: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": error})
+
+    def as_dict(self) -> dict:
+        total = self.inserted + self.updated + self.rejected
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 2),
+            "rows_per_sec": round(total / self.seconds) if self.seconds else 0,
+        }
+
+
+class TaskImporter:
+    """
+    Массовый импорт задач из CSV:
+    потоковый парсинг -> валидация пачками по правилам Task -> COPY во временную таблицу -> upsert в tasks.
+    В SQLite COPY нет: пачки пишутся в tasks напрямую через INSERT ... ON CONFLICT.
+    Плохие строки попадают в отчет и не прерывают импорт.
+    Импорт пишет только в основную БД: при шардировании (shard_for) строки отделов с других шардов отклоняются,
+    иначе задача осела бы на шарде 0, а save искал бы ее на шарде отдела.
+    """
+
+    def __init__(
+            self,
+            session: AsyncSession,
+            default_owner_id: UUID,
+            batch_size: int = 10000,
+            shard_for: Optional[Callable[[Optional[UUID]], int]] = None
+    ):
+        self.session = session
+        self.default_owner_id = default_owner_id
+        self.batch_size = batch_size
+        self.shard_for = shard_for
+
+    def _validate_batch(self, rows: List[Tuple[int, dict]], report: ImportReport) -> List[tuple]:
+        records = []
+        for line_no, row in rows:
+            data = {k: v for k, v in row.items() if k in IMPORT_COLUMNS and v not in (None, "")}
+            data.setdefault("owner_id", self.default_owner_id)
+            try:
+                # from_storage: исторические задачи имеют право на прошедший дедлайн
+                task = Task.model_validate(data, context={"from_storage": True})
+            except ValidationError as e:
+                report.reject(line_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+            if self.shard_for is not None and self.shard_for(task.target_dept_id) != 0:
+                report.reject(line_no, SHARD_ERROR)
+                continue
+            records.append((
+                line_no, task.id, task.title, task.description, task.owner_id, task.executor_id,
+                task.target_dept_id, task.status.value, task.priority.value, task.deadline,
+                task.created_at, task.updated_at
+            ))
+        return records
+
+    @staticmethod
+    def _read_batch(reader: Iterator[Tuple[int, dict]], size: int) -> List[Tuple[int, dict]]:
+        return list(itertools.islice(reader, size))
+
+    async def run(self, stream: IO[bytes]) -> ImportReport:
+        report = ImportReport()
+        started = time.perf_counter()
+
+        text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        # Нумерация с 2: строка 1 — заголовок
+        reader = enumerate(csv.DictReader(text_stream), start=2)
+
+        if dialect_name(self.session) == "postgresql":
+            await self._copy_and_upsert(reader, report)
+        else:
+            await self._upsert_batches(reader, report)
+
+        await self.session.commit()
+        text_stream.detach()
+        report.seconds = time.perf_counter() - started
+        return report
+
+    async def _copy_and_upsert(self, reader: Iterator[Tuple[int, dict]], report: ImportReport) -> None:
+        connection = await self.session.connection()
+        raw = (await connection.get_raw_connection()).driver_connection  # asyncpg.Connection
+
+        # 1. Временная таблица живет до конца транзакции
+        await self.session.execute(text("""
+            CREATE TEMP TABLE tasks_import_staging (
+                line_no integer NOT NULL,
+                id uuid NOT NULL,
+                title varchar(200) NOT NULL,
+                description varchar,
+                owner_id uuid NOT NULL,
+                executor_id uuid,
+                target_dept_id uuid,
+                status varchar(20) NOT NULL,
+                priority varchar(20) NOT NULL,
+                deadline timestamptz,
+                created_at timestamptz NOT NULL,
+                updated_at timestamptz NOT NULL
+            ) ON COMMIT DROP
+        """))
+
+        # 2. Потоковый парсинг + COPY пачками. Парсинг и валидация — в потоке, чтобы не держать event loop.
+        while True:
+            rows = await asyncio.to_thread(self._read_batch, reader, self.batch_size)
+            if not rows:
+                break
+            records = await asyncio.to_thread(self._validate_batch, rows, report)
+            if records:
+                await raw.copy_records_to_table("tasks_import_staging", records=records, columns=STAGING_COLUMNS)
+
+        # 3. Строки с несуществующими пользователями/отделами отсеиваем до upsert, иначе FK уронит всю вставку
+        orphans = await self.session.execute(text("""
+            DELETE FROM tasks_import_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.owner_id)
+               OR (s.executor_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.executor_id))
+               OR (s.target_dept_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM departments d WHERE d.id = s.target_dept_id))
+            RETURNING s.line_no
+        """))
+        for (line_no,) in orphans:
+            report.reject(line_no, ORPHAN_ERROR)
+
+        # 4. Upsert одним запросом. Дубликаты id внутри файла: выигрывает последняя строка.
+        result = await self.session.execute(text(f"""
+            INSERT INTO tasks ({", ".join(IMPORT_COLUMNS)}, last_activity_at)
+            SELECT DISTINCT ON (id) {", ".join(IMPORT_COLUMNS)}, updated_at
+            FROM tasks_import_staging
+            ORDER BY id, line_no DESC
+            ON CONFLICT (id) DO UPDATE SET
+                {", ".join(f"{c} = EXCLUDED.{c}" for c in IMPORT_COLUMNS if c not in ("id", "created_at"))},
+                version = tasks.version + 1,
+                last_activity_at = GREATEST(tasks.last_activity_at, EXCLUDED.updated_at)
+            RETURNING (xmax = 0) AS inserted
+        """))
+        for (inserted,) in result:
+            if inserted:
+                report.inserted += 1
+            else:
+                report.updated += 1
+
+    async def _upsert_batches(self, reader: Iterator[Tuple[int, dict]], report: ImportReport) -> None:
+        """
+        Без COPY (SQLite): каждая пачка — INSERT ... ON CONFLICT DO UPDATE через executemany.
+        Дубликаты id внутри пачки: выигрывает последняя строка; id, встреченный в одной из прошлых пачек, считается обновлением.
+        """
+        tasks = TaskModel.__table__
+        statement = upsert(self.session, tasks)
+        statement = statement.on_conflict_do_update(
+            index_elements=[tasks.c.id],
+            set_={
+                **{c: statement.excluded[c] for c in IMPORT_COLUMNS if c not in ("id", "created_at")},
+                "version": tasks.c.version + 1,
+                "last_activity_at": greatest(tasks.c.last_activity_at, statement.excluded.updated_at),
+            }
+        )
+        while True:
+            rows = await asyncio.to_thread(self._read_batch, reader, self.batch_size)
+            if not rows:
+                break
+            records = await asyncio.to_thread(self._validate_batch, rows, report)
+            latest = {}
+            for record in await self._drop_orphans([dict(zip(STAGING_COLUMNS, r)) for r in records], report):
+                latest[record["id"]] = record
+            if not latest:
+                continue
+
+            existing = set((await self.session.execute(
+                select(tasks.c.id).where(tasks.c.id.in_(list(latest)))
+            )).scalars())
+            await self.session.execute(statement, [
+                {**{c: record[c] for c in IMPORT_COLUMNS}, "last_activity_at": record["updated_at"]}
+                for record in latest.values()
+            ])
+            report.updated += len(existing)
+            report.inserted += len(latest) - len(existing)
+
+    async def _drop_orphans(self, records: List[dict], report: ImportReport) -> List[dict]:
+        user_ids = {r["owner_id"] for r in records} | {r["executor_id"] for r in records if r["executor_id"]}
+        department_ids = {r["target_dept_id"] for r in records if r["target_dept_id"]}
+        users = set((await self.session.execute(select(UserModel.id).where(UserModel.id.in_(user_ids)))).scalars())
+        departments = set((await self.session.execute(
+            select(DepartmentModel.id).where(DepartmentModel.id.in_(department_ids))
+        )).scalars()) if department_ids else set()
+
+        valid = []
+        for record in records:
+            if (
+                record["owner_id"] in users
+                and (record["executor_id"] is None or record["executor_id"] in users)
+                and (record["target_dept_id"] is None or record["target_dept_id"] in departments)
+            ):
+                valid.append(record)
+            else:
+                report.reject(record["line_no"], ORPHAN_ERROR)
+        return valid
+
+
+async def main() -> None:
+    from src.infrastructure.database.session import AsyncSessionLocal, engine
+    from src.infrastructure.database.sharding import ShardSet, SHARD_URLS
+    from src.infrastructure.repositories.user_repository import UserRepository
+
+    parser = argparse.ArgumentParser(description="Bulk import tasks from CSV (COPY on Postgres, batched upsert on SQLite)")
+    parser.add_argument("path")
+    parser.add_argument("--owner-email", required=True, help="Owner for rows without owner_id")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    shards = ShardSet(AsyncSessionLocal) if SHARD_URLS else None
+    try:
+        if shards:
+            await shards.reload()
+        async with AsyncSessionLocal() as session:
+            owner = await UserRepository(session).get_by_email(args.owner_email)
+            if owner is None:
+                raise SystemExit(f"User {args.owner_email} not found")
+            with open(args.path, "rb") as f:
+                report = await TaskImporter(
+                    session, owner.id, args.batch_size, shard_for=shards.shard_for if shards else None
+                ).run(f)
+        summary = report.as_dict()
+        for error in summary.pop("errors")[:20]:
+            print(f"line {error['line']}: {error['error']}")
+        print(summary)
+    finally:
+        if shards:
+            await shards.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Task, User, Comment, Department
+from src.domain.interfaces import ITaskRepository
+from src.infrastructure.repositories.user_repository import UserRepository
+from src.infrastructure.repositories.department_repository import DepartmentRepository
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Склеивает load(key) из одного такта event loop (и всё, что пришло, пока ждали сессию)
+    в один batch_fn(keys) -> {key: value}, то есть в один запрос WHERE id IN (...).
+    Результаты кэшируются на время жизни загрузчика — одного HTTP-запроса.
+    """
+
+    def __init__(
+            self,
+            batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+            lock: asyncio.Lock,
+            max_batch_size: int = 500
+    ):
+        self.batch_fn = batch_fn
+        # Общий для загрузчиков одной сессии: AsyncSession не выполняет два запроса одновременно
+        self.lock = lock
+        self.max_batch_size = max_batch_size
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._pending: List[K] = []
+        self._dispatch: Optional[asyncio.Task] = None
+
+    def load(self, key: K) -> Awaitable[Optional[V]]:
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+            self._pending.append(key)
+            if self._dispatch is None:
+                self._dispatch = asyncio.create_task(self._run())
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    async def _run(self) -> None:
+        async with self.lock:
+            keys, self._pending, self._dispatch = self._pending, [], None
+            for start in range(0, len(keys), self.max_batch_size):
+                chunk = keys[start:start + self.max_batch_size]
+                try:
+                    found = await self.batch_fn(chunk)
+                except Exception as e:
+                    for key in chunk:
+                        # Ошибку не кэшируем: следующий load того же ключа попробует снова
+                        self._futures.pop(key).set_exception(e)
+                    continue
+                for key in chunk:
+                    self._futures[key].set_result(found.get(key))
+
+
+class RequestLoaders:
+    """
+    Загрузчики сущностей одного запроса. Задачи — с проверкой видимости (RBAC),
+    пользователи и отделы — из основной БД, комментарии — из шарда задачи (через репозиторий).
+    """
+
+    def __init__(self, repository: ITaskRepository, session: AsyncSession, user: User):
+        lock = asyncio.Lock()
+        self.tasks: DataLoader[UUID, Task] = DataLoader(self._load_tasks, lock)
+        self.comments: DataLoader[UUID, List[Comment]] = DataLoader(repository.get_comments_many, lock)
+        self.users: DataLoader[UUID, User] = DataLoader(self._load_users, lock)
+        self.departments: DataLoader[UUID, Department] = DataLoader(self._load_departments, lock)
+        self.repository = repository
+        self.session = session
+        self.user = user
+
+    async def _load_tasks(self, task_ids: List[UUID]) -> Dict[UUID, Task]:
+        return {task.id: task for task in await self.repository.get_visible(self.user, task_ids)}
+
+    async def _load_users(self, user_ids: List[UUID]) -> Dict[UUID, User]:
+        return {user.id: user for user in await UserRepository(self.session).get_many(user_ids)}
+
+    async def _load_departments(self, department_ids: List[UUID]) -> Dict[UUID, Department]:
+        return {dept.id: dept for dept in await DepartmentRepository(self.session).get_many(department_ids)}
+
+    async def bundle(self, task_ids: List[UUID], include_comments: bool = True) -> dict:
+        """
+        Задачи (в порядке task_ids, невидимые и несуществующие пропускаются), их комментарии
+        и все упомянутые пользователи и отделы без повторов. Не больше одного запроса на тип сущности.
+        """
+        tasks = [task for task in await self.tasks.load_many(dict.fromkeys(task_ids)) if task is not None]
+        comments: Dict[UUID, List[Comment]] = {}
+        if include_comments:
+            comments = dict(zip(
+                (task.id for task in tasks),
+                [found or [] for found in await self.comments.load_many(task.id for task in tasks)]
+            ))
+
+        user_ids = dict.fromkeys(
+            [task.owner_id for task in tasks]
+            + [task.executor_id for task in tasks if task.executor_id]
+            + [c.author_id for task_comments in comments.values() for c in task_comments]
+        )
+        department_ids = dict.fromkeys(task.target_dept_id for task in tasks if task.target_dept_id)
+        # Оба gather в одном такте: загрузчики поставят по одному запросу в очередь сессии
+        users, departments = await asyncio.gather(
+            self.users.load_many(user_ids), self.departments.load_many(department_ids)
+        )
+        return {
+            "tasks": tasks,
+            "comments": comments,
+            "users": [user for user in users if user is not None],
+            "departments": [dept for dept in departments if dept is not None],
+        }
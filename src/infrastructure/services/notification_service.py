@@ -0,0 +1,93 @@
+import asyncio
+import json
+import smtplib
+from email.message import EmailMessage
+from typing import List, Dict
+from uuid import UUID
+
+from src.domain.entities import Notification
+from src.domain.interfaces import INotificationSender
+from src.core.config import getenv, environ
+
+
+class FileNotificationSender(INotificationSender):
+    """Локальная заглушка: пишет письма построчно в JSON-файл (для разработки и тестов)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, notifications: List[Notification]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for n in notifications:
+                f.write(json.dumps({
+                    "id": str(n.id),
+                    "kind": n.kind.value,
+                    "to": n.recipient_email,
+                    "subject": n.subject,
+                    "body": n.body,
+                    "created_at": n.created_at.isoformat()
+                }, ensure_ascii=False) + "\n")
+
+    async def send_batch(self, notifications: List[Notification]) -> Dict[UUID, str]:
+        errors = {n.id: "Recipient email is unknown" for n in notifications if not n.recipient_email}
+        deliverable = [n for n in notifications if n.id not in errors]
+        if deliverable:
+            await asyncio.to_thread(self._write, deliverable)
+        return errors
+
+
+class SmtpNotificationSender(INotificationSender):
+    """SMTP-отправка. Одна сессия на всю пачку, работа с сокетом — в отдельном потоке."""
+
+    def __init__(self, host: str, port: int, sender: str, username: str | None = None,
+                 password: str | None = None, use_tls: bool = True):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+
+    def _send(self, notifications: List[Notification]) -> Dict[UUID, str]:
+        errors: Dict[UUID, str] = {}
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            for n in notifications:
+                if not n.recipient_email:
+                    errors[n.id] = "Recipient email is unknown"
+                    continue
+                msg = EmailMessage()
+                msg["From"] = self.sender
+                msg["To"] = n.recipient_email
+                msg["Subject"] = n.subject
+                msg.set_content(n.body)
+                try:
+                    smtp.send_message(msg)
+                except smtplib.SMTPException as e:
+                    errors[n.id] = str(e)
+        return errors
+
+    async def send_batch(self, notifications: List[Notification]) -> Dict[UUID, str]:
+        try:
+            return await asyncio.to_thread(self._send, notifications)
+        except (OSError, smtplib.SMTPException) as e:
+            # Сервер недоступен — вся пачка уходит на повтор
+            return {n.id: str(e) for n in notifications}
+
+
+def build_notification_sender() -> INotificationSender:
+    """Выбор канала по NOTIFICATION_SENDER (file | smtp)."""
+    kind = getenv("NOTIFICATION_SENDER", "file")
+    if kind == "smtp":
+        return SmtpNotificationSender(
+            host=environ["SMTP_HOST"],
+            port=int(getenv("SMTP_PORT", "587")),
+            sender=getenv("SMTP_FROM", "noreply@localhost"),
+            username=getenv("SMTP_USER"),
+            password=getenv("SMTP_PASSWORD"),
+            use_tls=getenv("SMTP_TLS", "true").lower() == "true"
+        )
+    return FileNotificationSender(getenv("NOTIFICATION_FILE", "notifications.jsonl"))
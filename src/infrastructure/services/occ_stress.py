@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable
+from uuid import UUID
+
+from src.domain.entities import Task, TaskPriority
+from src.domain.interfaces import ConcurrentModificationError
+
+PRIORITIES = list(TaskPriority)
+
+
+@dataclass
+class StressReport:
+    saves: int = 0
+    conflicts: int = 0
+    max_retries: int = 0
+    seconds: float = 0.0
+
+
+async def _worker(open_repository: Callable, task_id: UUID, updates: int, report: StressReport) -> None:
+    """read-modify-write с повтором при конфликте версий — как это делает клиент с If-Match."""
+    for i in range(updates):
+        retries = 0
+        while True:
+            async with open_repository() as repository:
+                task = await repository.get_by_id(task_id)
+                # Отдаем управление между чтением и записью: соседние воркеры успевают прочитать ту же версию
+                await asyncio.sleep(0)
+                task.priority = PRIORITIES[(task.version + i) % len(PRIORITIES)]
+                try:
+                    await repository.save(task)
+                except ConcurrentModificationError:
+                    report.conflicts += 1
+                    retries += 1
+                    # Случайная пауза разводит повторы, иначе те же воркеры снова столкнутся на той же версии
+                    await asyncio.sleep(random.uniform(0, 0.001 * min(retries, 10)))
+                    continue
+            report.saves += 1
+            report.max_retries = max(report.max_retries, retries)
+            break
+
+
+async def run(open_repository: Callable, task_id: UUID, workers: int, updates: int) -> StressReport:
+    report = StressReport()
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(open_repository, task_id, updates, report) for _ in range(workers)))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+async def main() -> None:
+    """
+    python -m src.infrastructure.services.occ_stress — N конкурентных писателей одной задачи.
+    Без потерянных обновлений итоговая версия равна 1 + числу успешных сохранений.
+    По умолчанию в памяти; --owner-email — против Postgres из DATABASE_URL.
+    """
+    from contextlib import asynccontextmanager
+    from src.infrastructure.repositories.memory_task_repository import InMemoryTaskRepository
+
+    parser = argparse.ArgumentParser(description="Optimistic concurrency stress test for task saves")
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=20, help="Successful saves per worker")
+    parser.add_argument("--owner-email", help="Run against Postgres; the test task is created for this user")
+    args = parser.parse_args()
+
+    if args.owner_email is None:
+        memory = InMemoryTaskRepository()
+
+        @asynccontextmanager
+        async def open_repository():
+            yield memory
+
+        task = await memory.save(Task(title="OCC stress", owner_id=UUID(int=1)))
+        report = await run(open_repository, task.id, args.workers, args.updates)
+        final = await memory.get_by_id(task.id)
+    else:
+        from src.infrastructure.database.session import AsyncSessionLocal, engine
+        from src.infrastructure.repositories.task_repository import TaskRepository
+        from src.infrastructure.repositories.user_repository import UserRepository
+
+        @asynccontextmanager
+        async def open_repository():
+            async with AsyncSessionLocal() as session:
+                yield TaskRepository(session)
+
+        try:
+            async with AsyncSessionLocal() as session:
+                owner = await UserRepository(session).get_by_email(args.owner_email)
+                if owner is None:
+                    raise SystemExit(f"User {args.owner_email} not found")
+                task = await TaskRepository(session).save(Task(title="OCC stress", owner_id=owner.id))
+            report = await run(open_repository, task.id, args.workers, args.updates)
+            async with open_repository() as repository:
+                final = await repository.get_by_id(task.id)
+                await repository.delete(task.id)
+        finally:
+            await engine.dispose()
+
+    expected = 1 + report.saves
+    print(
+        f"saves={report.saves} conflicts={report.conflicts} max_retries={report.max_retries} "
+        f"{report.saves / report.seconds:,.0f} saves/sec"
+    )
+    print(f"final version={final.version}, expected={expected}: {'OK' if final.version == expected else 'LOST UPDATES'}")
+    if final.version != expected:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
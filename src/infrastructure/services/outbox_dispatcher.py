@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.domain.interfaces import INotificationSender
+from src.infrastructure.repositories.outbox_repository import OutboxRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """
+    Фоновый разборщик outbox.
+    Забирает сообщения пачками, отправляет через INotificationSender и проставляет статусы.
+    Запросы пользователей доставку не ждут — они только пишут строку в outbox.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            sender: INotificationSender,
+            batch_size: int = int(getenv("OUTBOX_BATCH_SIZE", "100")),
+            poll_interval: float = float(getenv("OUTBOX_POLL_INTERVAL", "1.0")),
+            max_attempts: int = int(getenv("OUTBOX_MAX_ATTEMPTS", "5")),
+            retry_base_delay: float = float(getenv("OUTBOX_RETRY_BASE_DELAY", "5"))
+    ):
+        self.session_factory = session_factory
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+        # Метрики пропускной способности
+        self.sent_total = 0
+        self.failed_total = 0
+        self._busy_seconds = 0.0
+
+    async def dispatch_once(self) -> int:
+        """Один проход: одна пачка. Возвращает количество обработанных сообщений."""
+        started = time.perf_counter()
+        async with self.session_factory() as session:
+            repo = OutboxRepository(session)
+            batch = await repo.claim_batch(self.batch_size)
+            if not batch:
+                return 0
+
+            await repo.resolve_recipients(batch)
+            errors = await self.sender.send_batch(batch)
+
+            await repo.mark_sent([n.id for n in batch if n.id not in errors])
+            for message_id, error in errors.items():
+                await repo.mark_failed(message_id, error, self.max_attempts, self.retry_base_delay)
+            await session.commit()
+
+        self.sent_total += len(batch) - len(errors)
+        self.failed_total += len(errors)
+        self._busy_seconds += time.perf_counter() - started
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatcher error")
+                processed = 0
+
+            # Полная пачка — скорее всего, есть еще; сразу берем следующую
+            if processed >= self.batch_size:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def notify(self) -> None:
+        """Подсказка диспетчеру, что в outbox появились новые сообщения (не обязательна)."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent_total,
+            "failed": self.failed_total,
+            "messages_per_sec": round(self.sent_total / self._busy_seconds, 1) if self._busy_seconds else 0.0,
+        }
@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.infrastructure.repositories.task_repository import TaskRepository
+from src.core.config import getenv
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class TextVectorizer:
+    """
+    Локальная векторизация без сети и словаря: feature hashing + IDF.
+    Признаки — слова, пары слов и символьные триграммы (ловят опечатки и словоформы).
+    crc32 вместо hash(): хеш str в Python солится на каждый процесс, а индекс переживает рестарты.
+    """
+    DF_BITS = 18
+    TITLE_WEIGHT = 2.0
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+        self.df = np.zeros(1 << self.DF_BITS, dtype=np.int32)
+        self.doc_count = 0
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        words = WORD.findall(text.lower())
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def _hashes(self, text: str) -> np.ndarray:
+        return np.fromiter((zlib.crc32(f.encode()) for f in self._features(text)), dtype=np.uint32)
+
+    def vectorize(self, title: str, description: Optional[str], learn: bool = True) -> np.ndarray:
+        title_h, body_h = self._hashes(title), self._hashes(description or "")
+        hashes = np.concatenate([title_h, body_h])
+        weights = np.concatenate([np.full(title_h.size, self.TITLE_WEIGHT), np.ones(body_h.size)])
+        buckets = hashes & ((1 << self.DF_BITS) - 1)
+
+        if learn:
+            # Документная частота: каждый признак один раз на документ
+            self.df[np.unique(buckets)] += 1
+            self.doc_count += 1
+        idf = np.log((1 + self.doc_count) / (1 + self.df[buckets])) + 1.0
+
+        dims = (hashes >> self.DF_BITS) % self.dim
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        vector = np.bincount(dims, weights=signs * weights * idf, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """
+    Приближенный поиск ближайших соседей по косинусу (IVF): векторы разбиты на кластеры k-means,
+    запрос сравнивается с центроидами и проверяет только nprobe ближайших кластеров.
+    Пока векторов меньше train_min — точный перебор.
+    Векторы хранятся в int8 с масштабом на строку: в 4 раза меньше памяти, чем float32, и быстрее float16,
+    который NumPy переводит в float32 без SIMD.
+    """
+
+    def __init__(self, dim: int, nprobe: int = 16, train_min: int = 20000):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_min = train_min
+        self.vectors = np.zeros((1024, dim), dtype=np.int8)
+        self.scales = np.zeros(1024, dtype=np.float32)
+        self.ids: List[UUID] = []
+        self.row_of: Dict[UUID, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.list_of = np.zeros(1024, dtype=np.int32)
+        self.members: List[List[int]] = []
+        self.trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _grow(self) -> None:
+        capacity = self.vectors.shape[0] * 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.int8)
+        vectors[:len(self)] = self.vectors[:len(self)]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:len(self)] = self.scales[:len(self)]
+        list_of = np.zeros(capacity, dtype=np.int32)
+        list_of[:len(self)] = self.list_of[:len(self)]
+        self.vectors, self.scales, self.list_of = vectors, scales, list_of
+
+    def upsert(self, task_id: UUID, vector: np.ndarray) -> bool:
+        """Добавляет или обновляет вектор задачи. False — задача уже в индексе с тем же вектором."""
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = np.float32(peak / 127 if peak else 1.0)
+        quantized = np.round(vector / scale).astype(np.int8)
+
+        row = self.row_of.get(task_id)
+        if row is None:
+            if len(self) == self.vectors.shape[0]:
+                self._grow()
+            row = len(self)
+            self.ids.append(task_id)
+            self.row_of[task_id] = row
+        elif self.scales[row] == scale and np.array_equal(self.vectors[row], quantized):
+            return False
+        elif self.centroids is not None:
+            self.members[self.list_of[row]].remove(row)
+
+        self.vectors[row] = quantized
+        self.scales[row] = scale
+        if self.centroids is not None:
+            cluster = int(np.argmax(self.centroids @ vector))
+            self.list_of[row] = cluster
+            self.members[cluster].append(row)
+        return True
+
+    def search(self, vector: np.ndarray, k: int, exclude: Optional[UUID] = None) -> List[Tuple[UUID, float]]:
+        if self.centroids is None:
+            rows = np.arange(len(self))
+        else:
+            probe = np.argpartition(-(self.centroids @ vector), min(self.nprobe, len(self.members)) - 1)[:self.nprobe]
+            rows = np.fromiter(
+                (row for cluster in probe for row in self.members[cluster]), dtype=np.int64
+            )
+        if rows.size == 0:
+            return []
+
+        scores = (self.vectors[rows].astype(np.float32) @ vector) * self.scales[rows]
+        top = min(k + 1, rows.size)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        result = [(self.ids[rows[i]], float(scores[i])) for i in best if self.ids[rows[i]] != exclude]
+        return result[:k]
+
+    # --- КЛАСТЕРИЗАЦИЯ ---
+    def needs_training(self) -> bool:
+        # Переобучаем при первом достижении порога и когда индекс вырос в 4 раза: кластеры "расплываются"
+        return len(self) >= self.train_min and len(self) >= 4 * self.trained_size
+
+    def train(self, iterations: int = 8, sample_size: int = 100000, chunk: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Сферический k-means по выборке, затем назначение всех векторов кластерам.
+        Только вычисления — работает в потоке; результат применяет apply_training в event loop.
+        """
+        count = len(self)
+        vectors = self.vectors[:count]
+        k = int(np.clip(np.sqrt(count), 16, 4096))
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(count, min(count, sample_size), replace=False)].astype(np.float32)
+        sample /= np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+
+        centroids = sample[rng.choice(sample.shape[0], k, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Пустой кластер сохраняет прежний центроид
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        # Масштаб строки положителен и на argmax по центроидам не влияет
+        list_of = np.empty(count, dtype=np.int32)
+        for start in range(0, count, chunk):
+            block = vectors[start:start + chunk].astype(np.float32)
+            list_of[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return centroids.astype(np.float32), list_of
+
+    def apply_training(self, centroids: np.ndarray, list_of: np.ndarray) -> None:
+        trained = list_of.size
+        self.centroids = centroids
+        self.list_of[:trained] = list_of
+        # Векторы, добавленные пока шло обучение, назначаем здесь
+        for row in range(trained, len(self)):
+            self.list_of[row] = int(np.argmax(centroids @ self.vectors[row].astype(np.float32)))
+        self.members = [[] for _ in range(centroids.shape[0])]
+        for row, cluster in enumerate(self.list_of[:len(self)].tolist()):
+            self.members[cluster].append(row)
+        self.trained_size = len(self)
+
+
+class SimilarityIndex:
+    """
+    Индекс похожих задач в памяти процесса, с сохранением на диск.
+    Задачи этого воркера добавляются сразу после save; задачи других воркеров и импорта
+    подтягиваются фоновым циклом по updated_at. При старте индекс читается с диска и догоняет БД.
+    Файл перезаписывается, только если индекс изменился, и только воркером-владельцем блокировки.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            path: str = getenv("SIMILARITY_INDEX_PATH", "similarity_index.npz"),
+            dim: int = int(getenv("SIMILARITY_DIM", "128")),
+            sync_interval: float = float(getenv("SIMILARITY_SYNC_INTERVAL", "30"))
+    ):
+        self.session_factory = session_factory
+        self.path = path
+        self.sync_interval = sync_interval
+        self.vectorizer = TextVectorizer(dim)
+        self.index = VectorIndex(dim)
+        self.synced_until = datetime.fromtimestamp(0, tz=timezone.utc)
+        self.ready = False
+        self._dirty = False
+        self._training = False
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- ЗАПИСЬ ---
+    def add(self, task_id: UUID, title: str, description: Optional[str]) -> None:
+        # Документную частоту учит только новая задача: _sync перечитывает уже добавленные
+        # (свои задачи воркера, граница updated_at >= since), и повторный учет раздувал бы df и doc_count
+        learn = task_id not in self.index.row_of
+        # Неизменная задача (граница synced_until перечитывается каждый проход) не требует перезаписи файла
+        if self.index.upsert(task_id, self.vectorizer.vectorize(title, description, learn=learn)):
+            self._dirty = True
+
+    async def _sync(self, batch_size: int = 5000) -> int:
+        """Догоняет БД: все задачи, измененные после synced_until (повторное добавление идемпотентно)."""
+        added = 0
+        async with self.session_factory() as session:
+            async for batch in TaskRepository(session).stream_text_since(self.synced_until, batch_size):
+                for task_id, title, description, updated_at in batch:
+                    self.add(task_id, title, description)
+                    self.synced_until = max(self.synced_until, updated_at)
+                added += len(batch)
+                # Полная сборка на миллионе задач не должна морить event loop
+                await asyncio.sleep(0)
+        return added
+
+    async def _maybe_train(self) -> None:
+        if self._training or not self.index.needs_training():
+            return
+        self._training = True
+        try:
+            centroids, list_of = await asyncio.to_thread(self.index.train)
+            self.index.apply_training(centroids, list_of)
+            self._dirty = True
+        finally:
+            self._training = False
+
+    # --- ПОИСК ---
+    def similar(self, title: str, description: Optional[str], k: int, exclude: Optional[UUID] = None) -> List[Tuple[UUID, float]]:
+        vector = self.vectorizer.vectorize(title, description, learn=False)
+        return self.index.search(vector, k, exclude)
+
+    # --- ДИСК ---
+    def _snapshot(self) -> dict:
+        """Согласованный срез состояния — в event loop, пока никто не добавляет задачи. Массивы — без копий."""
+        count = len(self.index)
+        return dict(
+            vectors=self.index.vectors[:count],
+            scales=self.index.scales[:count],
+            ids=self.index.ids[:count],
+            list_of=self.index.list_of[:count].copy(),
+            centroids=self.index.centroids if self.index.centroids is not None else np.zeros((0, self.index.dim), np.float32),
+            trained_size=self.index.trained_size,
+            df=self.vectorizer.df.copy(),
+            doc_count=self.vectorizer.doc_count,
+            synced_until=self.synced_until.timestamp()
+        )
+
+    def _save(self, snapshot: dict) -> None:
+        # UUID как 16 байт; не dtype "S16" — он срезает завершающие нулевые байты
+        snapshot["ids"] = np.frombuffer(b"".join(task_id.bytes for task_id in snapshot["ids"]), dtype=np.uint8).reshape(-1, 16)
+        # Свой временный файл на каждую запись: общий путь .tmp два процесса писали бы одновременно
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(dir=directory, prefix=".similarity-", suffix=".npz", delete=False) as tmp:
+            try:
+                np.savez(tmp, **snapshot)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+        # Атомарная замена: упавший на середине процесс не оставит битый файл
+        os.replace(tmp.name, self.path)
+
+    def _acquire_file(self) -> bool:
+        """
+        Файл индекса пишет один воркер — владелец блокировки {path}.lock (flock, снимается ОС при смерти процесса).
+        Остальные только читают файл при старте. Без fcntl (Windows) пишет каждый воркер.
+        """
+        if self._lock_file is not None or fcntl is None:
+            return True
+        lock_file = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_file(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            if data["vectors"].shape[1] != self.index.dim:
+                return False
+            count = data["vectors"].shape[0]
+            index = VectorIndex(self.index.dim, self.index.nprobe, self.index.train_min)
+            index.vectors = np.zeros((max(1024, count * 2), index.dim), dtype=np.int8)
+            index.vectors[:count] = data["vectors"]
+            index.scales = np.zeros(index.vectors.shape[0], dtype=np.float32)
+            index.scales[:count] = data["scales"]
+            index.list_of = np.zeros(index.vectors.shape[0], dtype=np.int32)
+            raw = data["ids"].tobytes()
+            index.ids = [UUID(bytes=raw[i:i + 16]) for i in range(0, len(raw), 16)]
+            index.row_of = {task_id: row for row, task_id in enumerate(index.ids)}
+            if data["centroids"].shape[0]:
+                index.apply_training(data["centroids"], data["list_of"])
+                index.trained_size = int(data["trained_size"])
+            self.vectorizer.df = data["df"].copy()
+            self.vectorizer.doc_count = int(data["doc_count"])
+            self.synced_until = datetime.fromtimestamp(float(data["synced_until"]), tz=timezone.utc)
+        self.index = index
+        return True
+
+    async def persist(self) -> None:
+        # Не владелец пробует перехватить блокировку на каждом проходе: владелец мог завершиться
+        if self._dirty and self._acquire_file():
+            self._dirty = False
+            await asyncio.to_thread(self._save, self._snapshot())
+
+    # --- ЖИЗНЕННЫЙ ЦИКЛ ---
+    async def _run(self) -> None:
+        try:
+            started = time.perf_counter()
+            loaded = await asyncio.to_thread(self._load)
+            added = await self._sync()
+            await self._maybe_train()
+            self.ready = True
+            logger.info(
+                "Similarity index ready: %s tasks (%s%s synced) in %.1fs",
+                len(self.index), "disk + " if loaded else "", added, time.perf_counter() - started
+            )
+            await self.persist()
+        except Exception:
+            logger.exception("Similarity index build error")
+
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self._sync()
+                await self._maybe_train()
+                await self.persist()
+                self.ready = True
+            except Exception:
+                logger.exception("Similarity index sync error")
+
+    def start(self) -> None:
+        # Сборка с нуля на больших базах долгая — идет в фоне, старт приложения не ждет
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.ready:
+            await self.persist()
+        self._release_file()
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.infrastructure.repositories.user_repository import UserRepository
+from src.core.config import getenv
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersionCache:
+    """
+    Текущие token_version пользователей в памяти процесса — проверка отзыва токена без запроса в БД.
+    Изменения этого воркера применяются сразу (bump), изменения других воркеров — не позже,
+    чем через TOKEN_VERSION_REFRESH секунд. Это и есть верхняя граница окна, в котором живет отозванный токен.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            refresh_interval: float = float(getenv("TOKEN_VERSION_REFRESH", "10"))
+    ):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.versions: Dict[UUID, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def current(self, user_id: UUID) -> int:
+        return self.versions.get(user_id, 0)
+
+    def bump(self, user_id: UUID, version: int) -> None:
+        self.versions[user_id] = max(version, self.current(user_id))
+
+    async def reload(self) -> None:
+        async with self.session_factory() as session:
+            loaded = await UserRepository(session).get_token_versions()
+        # Версии только растут: bump, сделанный пока шел запрос, не должен откатиться
+        for user_id, version in self.versions.items():
+            if version > loaded.get(user_id, 0):
+                loaded[user_id] = version
+        self.versions = loaded
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Token version refresh error")
+
+    async def start(self) -> None:
+        await self.reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -8,12 +8,8 @@ from src.infrastructure.database.session import engine, AsyncSessionLocal
 from src.infrastructure.database.models import Base
 from src.infrastructure.repositories.order_repository import PostgresOrderRepository
 from src.domain.entities import Order, Currency, OrderStatus
+from src.core.log import setup_logging, shutdown_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
 logger = logging.getLogger("SystemIntegration")
 
 
@@ -77,4 +73,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # Те же JSON-логи через поток-писатель, что и у приложения; stop() дописывает очередь перед выходом
+    setup_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        shutdown_logging()
\ No newline at end of file
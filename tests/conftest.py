@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+# Окружение задается до импорта src: модули читают переменные при импорте.
+# Основная БД — SQLite в памяти (одно соединение на процесс), файлы фоновых задач — во временном каталоге.
+_tmp = tempfile.mkdtemp(prefix="task-manager-tests-")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("AI_PROVIDERS", "local")
+os.environ.setdefault("SIMILARITY_INDEX_PATH", os.path.join(_tmp, "similarity_index.npz"))
+os.environ.setdefault("NOTIFICATION_FILE", os.path.join(_tmp, "notifications.jsonl"))
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    # async-тесты (pytest.mark.anyio) — только на asyncio: asyncpg/aiosqlite с trio не работают
+    return "asyncio"
@@ -0,0 +1,194 @@
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.routes import _check_if_match, _etag, _get_for_update, _save_versioned
+from src.domain.entities import Task, TaskStatus, Comment
+from src.domain.interfaces import ConcurrentModificationError
+from src.infrastructure.repositories.cached_task_repository import CachedTaskRepository, TaskCache
+from src.infrastructure.repositories.memory_task_repository import InMemoryTaskRepository
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingRepository(InMemoryTaskRepository):
+    """InMemoryTaskRepository, который считает обращения мимо кэша."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads: List[UUID] = []
+        self.comment_reads: List[UUID] = []
+
+    async def get_by_id(self, task_id: UUID, include_archived: bool = False) -> Optional[Task]:
+        self.reads.append(task_id)
+        return await super().get_by_id(task_id, include_archived)
+
+    async def get_comments(self, task_id: UUID, include_archived: bool = False) -> List[Comment]:
+        self.comment_reads.append(task_id)
+        return await super().get_comments(task_id, include_archived)
+
+
+@pytest.fixture
+def inner() -> CountingRepository:
+    return CountingRepository()
+
+
+@pytest.fixture
+def cache() -> TaskCache:
+    return TaskCache(max_size=100, ttl=60)
+
+
+@pytest.fixture
+def repository(inner, cache) -> CachedTaskRepository:
+    return CachedTaskRepository(inner, cache)
+
+
+async def _new_task(repository) -> Task:
+    return await repository.save(Task(title="Prepare release", owner_id=uuid4()))
+
+
+# --- InMemoryTaskRepository: оптимистичные блокировки ---
+async def test_save_bumps_version(inner):
+    task = await inner.save(Task(title="Prepare release", owner_id=uuid4()))
+    assert task.version == 1
+    task.update_status(TaskStatus.IN_PROGRESS)
+    assert (await inner.save(task)).version == 2
+
+
+async def test_save_with_stale_version_conflicts(inner):
+    task = await inner.save(Task(title="Prepare release", owner_id=uuid4()))
+    first, second = task.model_copy(), task.model_copy()
+    await inner.save(first)
+    with pytest.raises(ConcurrentModificationError):
+        await inner.save(second)
+
+
+# --- CachedTaskRepository: чтение через кэш и инвалидация ---
+async def test_get_by_id_reads_through_cache(repository, inner):
+    task = await _new_task(repository)
+    inner.reads.clear()
+
+    assert (await repository.get_by_id(task.id)).id == task.id
+    assert (await repository.get_by_id(task.id)).id == task.id
+    # save кладет сохраненную задачу в кэш — внутренний репозиторий не читается вовсе
+    assert inner.reads == []
+
+
+async def test_missing_task_is_not_cached(repository, inner):
+    missing = uuid4()
+    assert await repository.get_by_id(missing) is None
+    assert await repository.get_by_id(missing) is None
+    assert inner.reads == [missing, missing]
+
+
+async def test_returned_copies_do_not_leak_into_cache(repository):
+    task = await _new_task(repository)
+    copy = await repository.get_by_id(task.id)
+    copy.title = "Changed but never saved"
+    assert (await repository.get_by_id(task.id)).title == "Prepare release"
+
+
+async def test_save_replaces_cached_task(repository):
+    task = await _new_task(repository)
+    task.update_status(TaskStatus.IN_PROGRESS)
+    await repository.save(task)
+
+    cached = await repository.get_by_id(task.id)
+    assert cached.status == TaskStatus.IN_PROGRESS
+    assert cached.version == 2
+
+
+async def test_failed_save_evicts_stale_copy(repository, inner):
+    task = await _new_task(repository)
+    # Соседний воркер меняет задачу мимо кэша этого процесса
+    await inner.save(task.model_copy(update={"status": TaskStatus.IN_PROGRESS}))
+
+    stale = await repository.get_by_id(task.id)
+    assert stale.version == 1
+    with pytest.raises(ConcurrentModificationError):
+        await repository.save(stale)
+    inner.reads.clear()
+    assert (await repository.get_by_id(task.id)).version == 2
+    assert inner.reads == [task.id]
+
+
+async def test_add_comment_invalidates_task_and_comments(repository, inner):
+    task = await _new_task(repository)
+    assert await repository.get_comments(task.id) == []
+    await repository.get_by_id(task.id)
+
+    await repository.add_comment(Comment(task_id=task.id, author_id=task.owner_id, text="Looks good"))
+
+    assert [c.text for c in await repository.get_comments(task.id)] == ["Looks good"]
+    assert (await repository.get_by_id(task.id)).comment_count == 1
+    assert inner.comment_reads == [task.id, task.id]
+
+
+async def test_get_comments_many_fills_only_misses(repository, inner):
+    first, second = await _new_task(repository), await _new_task(repository)
+    await repository.get_comments(first.id)
+    inner.comment_reads.clear()
+
+    found = await repository.get_comments_many([first.id, second.id])
+    assert set(found) == {first.id, second.id}
+    # first уже в кэше; second пришел пачкой через get_comments_many внутреннего репозитория
+    await repository.get_comments(second.id)
+    assert first.id not in inner.comment_reads
+    assert second.id in inner.comment_reads
+
+
+# --- Роуты: If-Match, 412 и 409 ---
+async def test_if_match_with_current_version_passes(repository):
+    task = await _new_task(repository)
+    _check_if_match(task, None)
+    _check_if_match(task, "*")
+    _check_if_match(task, f'"0", {_etag(task)}')
+
+
+async def test_if_match_with_old_version_is_412(repository):
+    task = await _new_task(repository)
+    with pytest.raises(HTTPException) as error:
+        _check_if_match(task, '"0"')
+    assert error.value.status_code == 412
+    assert error.value.headers["ETag"] == _etag(task)
+
+
+async def test_get_for_update_rereads_stale_cached_copy(repository, inner, cache):
+    task = await _new_task(repository)
+    # Новая версия пришла от соседнего воркера; клиент знает ее ETag из некэшируемого GET
+    fresh = await inner.save(task.model_copy(update={"status": TaskStatus.IN_PROGRESS}))
+    assert (await repository.get_by_id(task.id)).version == 1
+
+    loaded = await _get_for_update(repository, cache, task.id, _etag(fresh))
+    assert loaded.version == fresh.version
+    _check_if_match(loaded, _etag(fresh))
+
+
+async def test_get_for_update_without_if_match_reads_database(repository, inner, cache):
+    task = await _new_task(repository)
+    fresh = await inner.save(task.model_copy(update={"status": TaskStatus.IN_PROGRESS}))
+    assert (await repository.get_by_id(task.id)).version == 1
+
+    # SPA не присылает If-Match: запись по устаревшей копии из кэша дала бы ложный 409
+    loaded = await _get_for_update(repository, cache, task.id, None)
+    assert loaded.version == fresh.version
+    loaded.update_status(TaskStatus.DONE)
+    assert (await _save_versioned(repository, loaded, None)).version == fresh.version + 1
+
+
+async def test_get_for_update_unknown_task_is_404(repository, cache):
+    with pytest.raises(HTTPException) as error:
+        await _get_for_update(repository, cache, uuid4(), None)
+    assert error.value.status_code == 404
+
+
+@pytest.mark.parametrize("if_match, status_code", [('"1"', 412), (None, 409)])
+async def test_lost_race_is_412_with_if_match_and_409_without(repository, if_match, status_code):
+    task = await _new_task(repository)
+    winner, loser = task.model_copy(), task.model_copy()
+    await repository.save(winner)
+    with pytest.raises(HTTPException) as error:
+        await _save_versioned(repository, loser, if_match)
+    assert error.value.status_code == status_code
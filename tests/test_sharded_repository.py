@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.domain.entities import Task, TaskPriority, TaskSort, TaskStatus, User, UserRole
+from src.infrastructure.database.models import Base, DepartmentModel, DepartmentShardModel, UserModel, UserWorkloadModel
+from src.infrastructure.database.portable import engine_options, install_sqlite_pragmas
+from src.infrastructure.database.sharding import ShardSet
+from src.infrastructure.repositories.sharded_task_repository import ShardedTaskRepository
+from src.infrastructure.repositories.workload_repository import WorkloadRepository
+
+pytestmark = pytest.mark.anyio
+
+DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+
+@pytest.fixture
+async def primary():
+    engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+    install_sqlite_pragmas(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def world(primary):
+    """Основная БД (шард 0) и шард 1 в памяти; отдел hot живет на шарде 1, отдел home — в основной БД."""
+    home, hot, executor = uuid4(), uuid4(), uuid4()
+    async with primary() as session:
+        await session.execute(insert(DepartmentModel), [{"id": home, "name": "Home"}, {"id": hot, "name": "Hot"}])
+        await session.execute(insert(UserModel), [{
+            "id": executor, "email": "executor@example.com", "hashed_password": "!",
+            "full_name": "Anna Ivanova", "role": UserRole.EMPLOYEE.value, "is_active": True,
+        }])
+        await session.execute(insert(DepartmentShardModel), [{"department_id": hot, "shard": 1}])
+        await session.commit()
+
+    shards = ShardSet(primary, urls=[DATABASE_URL])
+    await shards.init_schema()
+    await shards.reload()
+    yield shards, {"home": home, "hot": hot, "executor": executor}
+    await shards.stop()
+
+
+@pytest.fixture
+async def repository(primary, world):
+    shards, _ = world
+    async with primary() as session:
+        repository = ShardedTaskRepository(shards, session)
+        yield repository
+        await repository.close()
+
+
+ADMIN = User(email="admin@example.com", hashed_password="!", full_name="Admin", role=UserRole.ADMIN)
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def _spread(repository, ids, count: int, **fields) -> list:
+    """count задач: каждая третья в отделе home (шард 0), остальные в hot (шард 1); created_at растет с номером."""
+    tasks = []
+    for i in range(count):
+        task = Task(
+            title=f"Task {i}", owner_id=ids["executor"], target_dept_id=ids["hot" if i % 3 else "home"],
+            created_at=BASE + timedelta(minutes=i), updated_at=BASE + timedelta(minutes=i), **fields
+        )
+        tasks.append(await repository.save(task))
+    return tasks
+
+
+async def test_tasks_land_on_their_department_shard(repository, world):
+    shards, ids = world
+    await _spread(repository, ids, 6)
+    assert await shards.counts() == [2, 4]
+
+
+@pytest.mark.parametrize("sort", [TaskSort.CREATED_AT, TaskSort.LAST_ACTIVITY])
+async def test_get_all_pages_merge_shards_in_order(repository, world, sort):
+    _, ids = world
+    tasks = await _spread(repository, ids, 10)
+    expected = [task.id for task in sorted(tasks, key=lambda t: t.created_at, reverse=True)]
+
+    pages = [await repository.get_all(ADMIN, limit=3, offset=offset, sort=sort) for offset in range(0, 12, 3)]
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert [task.id for page in pages for task in page] == expected
+
+
+async def test_get_all_breaks_ties_by_id_across_shards(repository, world):
+    _, ids = world
+    # Одинаковое время создания: порядок задает id, как в ORDER BY каждого шарда
+    tasks = [
+        await repository.save(Task(
+            title=f"Task {i}", owner_id=ids["executor"], target_dept_id=ids["hot" if i % 2 else "home"], created_at=BASE
+        ))
+        for i in range(6)
+    ]
+    pages = [await repository.get_all(ADMIN, limit=2, offset=offset) for offset in (0, 2, 4)]
+    assert [task.id for page in pages for task in page] == sorted((task.id for task in tasks), reverse=True)
+
+
+async def test_get_all_applies_filters_on_every_shard(repository, world):
+    _, ids = world
+    tasks = await _spread(repository, ids, 6)
+    for task in tasks[::2]:
+        await repository.save(task.model_copy(update={"status": TaskStatus.IN_PROGRESS}))
+    found = await repository.get_all(ADMIN, limit=10, offset=0, status=TaskStatus.IN_PROGRESS)
+    assert [task.id for task in found] == [task.id for task in reversed(tasks[::2])]
+
+
+async def test_due_and_overdue_merge_by_deadline(repository, world):
+    _, ids = world
+    now = datetime.now(timezone.utc)
+    deadlines = [now + timedelta(hours=h) for h in (5, -3, 1, -1, 3, -5, 2)]
+    for i, deadline in enumerate(deadlines):
+        task = await repository.save(Task(
+            title=f"Task {i}", owner_id=ids["executor"], target_dept_id=ids["hot" if i % 2 else "home"],
+            deadline=now + timedelta(days=1)
+        ))
+        # Прошедший дедлайн модель не примет — ставим его в обход валидации, как будто время прошло
+        await repository.save(task.model_copy(update={"deadline": deadline}))
+
+    due = await repository.get_due(ADMIN, now + timedelta(hours=4), limit=2)
+    assert [task.deadline for task in due] == sorted(d for d in deadlines if now < d <= now + timedelta(hours=4))[:2]
+    overdue = await repository.get_overdue(ADMIN, limit=10)
+    assert [task.deadline for task in overdue] == sorted(d for d in deadlines if d < now)
+
+
+async def test_get_by_id_finds_task_without_or_with_stale_location_hint(repository, world):
+    shards, ids = world
+    [home_task, hot_task] = await _spread(repository, ids, 2)
+    assert shards.locations.get(hot_task.id) == 1
+
+    shards.locations.clear()
+    assert (await repository.get_by_id(hot_task.id)).id == hot_task.id
+    assert shards.locations.get(hot_task.id) == 1
+
+    # Подсказка устарела (отдел переехал): промах на шарде из подсказки — поиск по всем шардам
+    shards.locations.put(hot_task.id, 0)
+    assert (await repository.get_by_id(hot_task.id)).id == hot_task.id
+    assert shards.locations.get(hot_task.id) == 1
+    assert (await repository.get_by_id(home_task.id)).id == home_task.id
+    assert await repository.get_by_id(uuid4()) is None
+
+
+async def test_workload_rebuild_sums_every_shard(primary, world):
+    shards, ids = world
+    async with primary() as session:
+        repository = ShardedTaskRepository(shards, session)
+        for dept, priority in (("home", TaskPriority.LOW), ("hot", TaskPriority.HIGH), ("hot", TaskPriority.CRITICAL)):
+            await repository.save(Task(
+                title="Imported", owner_id=ids["executor"], executor_id=ids["executor"],
+                target_dept_id=ids[dept], priority=priority
+            ))
+        await repository.close()
+
+        await WorkloadRepository(session).rebuild(shards)
+        row = (await session.execute(select(UserWorkloadModel))).scalar_one()
+    assert row.user_id == ids["executor"]
+    assert (row.open_count, row.weighted_load) == (3, 1 + 4 + 8)
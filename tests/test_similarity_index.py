@@ -0,0 +1,69 @@
+import os
+from uuid import uuid4
+
+import pytest
+
+from src.infrastructure.services import similarity
+from src.infrastructure.services.similarity import SimilarityIndex
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "similarity_index.npz")
+
+
+async def test_unchanged_task_does_not_mark_index_dirty(path):
+    index = SimilarityIndex(session_factory=None, path=path)
+    task_id = uuid4()
+    index.add(task_id, "Prepare release notes", "Collect merged changes")
+    await index.persist()
+    assert os.path.exists(path)
+    written = os.stat(path).st_ino
+
+    # Повторное чтение той же задачи (граница synced_until) — индекс и файл не меняются (os.replace дал бы новый inode)
+    index.add(task_id, "Prepare release notes", "Collect merged changes")
+    assert not index._dirty
+    await index.persist()
+    assert os.stat(path).st_ino == written
+
+    index.add(task_id, "Prepare release notes for 2.0", "Collect merged changes")
+    assert index._dirty
+    index._release_file()
+
+
+async def test_save_leaves_no_temp_files_and_loads_back(path, tmp_path):
+    index = SimilarityIndex(session_factory=None, path=path)
+    ids = [uuid4() for _ in range(3)]
+    for task_id, title in zip(ids, ["Fix login bug", "Update invoice template", "Fix logout bug"]):
+        index.add(task_id, title, None)
+    await index.persist()
+    index._release_file()
+    assert sorted(os.listdir(tmp_path)) == ["similarity_index.npz", "similarity_index.npz.lock"]
+
+    restored = SimilarityIndex(session_factory=None, path=path)
+    assert restored._load()
+    assert restored.index.ids == ids
+    assert restored.similar("Fix login bug", None, k=1, exclude=ids[0])[0][0] == ids[2]
+
+
+@pytest.mark.skipif(similarity.fcntl is None, reason="flock недоступен")
+async def test_only_lock_owner_writes_index_file(path):
+    owner = SimilarityIndex(session_factory=None, path=path)
+    other = SimilarityIndex(session_factory=None, path=path)
+    owner.add(uuid4(), "Prepare release notes", None)
+    other.add(uuid4(), "Rotate credentials", None)
+
+    await owner.persist()
+    written = os.stat(path).st_ino
+    await other.persist()
+    assert os.stat(path).st_ino == written
+    assert other._dirty
+
+    # Владелец завершился — следующий проход другого воркера перехватывает запись
+    owner._release_file()
+    await other.persist()
+    assert not other._dirty
+    assert os.stat(path).st_ino != written
+    other._release_file()
@@ -0,0 +1,227 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.api.routes import _save_versioned
+from src.domain.entities import ReminderStage, Task, TaskStatus, UserRole
+from src.domain.interfaces import ConcurrentModificationError
+from src.infrastructure.database.models import Base, UserModel
+from src.infrastructure.database.portable import engine_options, install_sqlite_pragmas
+from src.infrastructure.repositories.archive_repository import ArchiveRepository
+from src.infrastructure.repositories.dependency_repository import DependencyRepository
+from src.infrastructure.repositories.task_repository import TaskRepository
+from src.infrastructure.repositories.user_repository import UserRepository
+from src.infrastructure.services.idempotency import (
+    IdempotencyInProgress, IdempotencyKeyReused, IdempotencyStore, StoredResponse
+)
+
+pytestmark = pytest.mark.anyio
+
+DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+
+@pytest.fixture
+async def session_factory():
+    # Свой движок на тест: схема из моделей, PRAGMA и casefold() — как у движка приложения
+    engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+    install_sqlite_pragmas(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+    await engine.dispose()
+
+
+async def _add_users(session_factory, *names: str) -> list:
+    rows = [
+        {
+            "id": uuid4(), "email": f"user{i}@example.com", "hashed_password": "!",
+            "full_name": name, "role": UserRole.EMPLOYEE.value, "is_active": True,
+        }
+        for i, name in enumerate(names)
+    ]
+    async with session_factory() as session:
+        await session.execute(insert(UserModel), rows)
+        await session.commit()
+    return [row["id"] for row in rows]
+
+
+# --- TaskRepository: оптимистичные блокировки ---
+async def test_task_save_with_stale_version_conflicts(session_factory):
+    [owner_id] = await _add_users(session_factory, "Anna Ivanova")
+    async with session_factory() as session:
+        task = await TaskRepository(session).save(Task(title="Prepare release", owner_id=owner_id))
+    assert task.version == 1
+
+    winner = task.model_copy(update={"status": TaskStatus.IN_PROGRESS})
+    async with session_factory() as session:
+        assert (await TaskRepository(session).save(winner)).version == 2
+    async with session_factory() as session:
+        with pytest.raises(ConcurrentModificationError):
+            await TaskRepository(session).save(task.model_copy(update={"status": TaskStatus.DONE}))
+        assert (await TaskRepository(session).get_by_id(task.id)).status == TaskStatus.IN_PROGRESS
+
+
+@pytest.mark.parametrize("if_match, status_code", [('"1"', 412), (None, 409)])
+async def test_lost_race_is_412_with_if_match_and_409_without(session_factory, if_match, status_code):
+    [owner_id] = await _add_users(session_factory, "Anna Ivanova")
+    async with session_factory() as session:
+        task = await TaskRepository(session).save(Task(title="Prepare release", owner_id=owner_id))
+        await TaskRepository(session).save(task.model_copy())
+        with pytest.raises(HTTPException) as error:
+            await _save_versioned(TaskRepository(session), task.model_copy(), if_match)
+    assert error.value.status_code == status_code
+
+
+async def test_claim_reminder_keeps_updated_at_and_claims_once(session_factory):
+    [owner_id] = await _add_users(session_factory, "Anna Ivanova")
+    deadline = datetime.now(timezone.utc) + timedelta(minutes=30)
+    async with session_factory() as session:
+        task = await TaskRepository(session).save(Task(title="Prepare release", owner_id=owner_id, deadline=deadline))
+    async with session_factory() as session:
+        claimed = await TaskRepository(session).claim_reminder(task.id, deadline, ReminderStage.APPROACHING)
+        await session.commit()
+        assert claimed is not None
+        assert await TaskRepository(session).claim_reminder(task.id, deadline, ReminderStage.APPROACHING) is None
+        stored = await TaskRepository(session).get_by_id(task.id)
+    assert stored.updated_at == task.updated_at
+
+
+# --- ArchiveRepository: связи не теряются ---
+async def test_archive_keeps_parents_of_hot_subtasks_and_blockers_of_open_tasks(session_factory):
+    [owner_id] = await _add_users(session_factory, "Anna Ivanova")
+    cutoff = datetime.now(timezone.utc) + timedelta(days=1)
+    async with session_factory() as session:
+        repository = TaskRepository(session)
+        done = dict(owner_id=owner_id, status=TaskStatus.DONE)
+        parent = await repository.save(Task(title="Parent", **done))
+        child = await repository.save(Task(title="Child", owner_id=owner_id, parent_id=parent.id))
+        blocker = await repository.save(Task(title="Blocker", **done))
+        blocked = await repository.save(Task(title="Blocked", owner_id=owner_id))
+        lonely = await repository.save(Task(title="Lonely", **done))
+        await DependencyRepository(session).add(blocked.id, blocker.id)
+
+        assert await ArchiveRepository(session).archive_batch(cutoff, 100) == (1, 0)
+        assert await repository.get_by_id(lonely.id) is None
+        assert (await repository.get_by_id(child.id)).parent_id == parent.id
+        assert await DependencyRepository(session).exists(blocked.id, blocker.id)
+
+        # Подзадача и зависящая задача завершены: сначала уходят они, следующим проходом — родитель
+        for task in (child, blocked):
+            await repository.save(task.model_copy(update={"status": TaskStatus.DONE}))
+        assert (await ArchiveRepository(session).archive_batch(cutoff, 100))[0] == 3
+        assert (await ArchiveRepository(session).archive_batch(cutoff, 100))[0] == 1
+        assert await repository.get_by_id(parent.id) is None
+
+
+# --- IdempotencyStore: повтор запроса ---
+class Producer:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self) -> StoredResponse:
+        self.calls += 1
+        return StoredResponse(201, {"n": self.calls}, fingerprint="")
+
+
+async def test_replay_returns_first_response(session_factory):
+    [user_id] = await _add_users(session_factory, "Anna Ivanova")
+    produce = Producer()
+    store = IdempotencyStore(session_factory)
+
+    first, replayed = await store.run(user_id, "key-1", "fp", produce)
+    assert (first.status_code, first.body, replayed) == (201, {"n": 1}, False)
+    second, replayed = await store.run(user_id, "key-1", "fp", produce)
+    assert (second.body, replayed) == ({"n": 1}, True)
+
+    # Другой воркер: кэш в памяти пуст, ответ читается из таблицы
+    third, replayed = await IdempotencyStore(session_factory).run(user_id, "key-1", "fp", produce)
+    assert (third.status_code, third.body, replayed) == (201, {"n": 1}, True)
+    assert produce.calls == 1
+
+
+async def test_key_reused_for_other_request_is_rejected(session_factory):
+    [user_id] = await _add_users(session_factory, "Anna Ivanova")
+    produce = Producer()
+    await IdempotencyStore(session_factory).run(user_id, "key-1", "fp", produce)
+    with pytest.raises(IdempotencyKeyReused):
+        await IdempotencyStore(session_factory).run(user_id, "key-1", "other-fp", produce)
+    assert produce.calls == 1
+
+
+async def test_failed_request_releases_key(session_factory):
+    [user_id] = await _add_users(session_factory, "Anna Ivanova")
+    store = IdempotencyStore(session_factory)
+
+    async def fail() -> StoredResponse:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await store.run(user_id, "key-1", "fp", fail)
+    response, replayed = await store.run(user_id, "key-1", "fp", Producer())
+    assert (response.status_code, replayed) == (201, False)
+
+
+async def test_live_lease_is_in_progress_and_expired_lease_is_taken_over(session_factory):
+    [user_id] = await _add_users(session_factory, "Anna Ivanova")
+    produce = Producer()
+
+    # Воркер занял ключ и еще выполняет запрос
+    assert await IdempotencyStore(session_factory, lease_seconds=60)._claim(user_id, "live", "fp")
+    with pytest.raises(IdempotencyInProgress):
+        await IdempotencyStore(session_factory).run(user_id, "live", "fp", produce)
+
+    # Воркер упал посреди запроса: аренда истекла, повтор клиента перезанимает ключ
+    assert await IdempotencyStore(session_factory, lease_seconds=-1)._claim(user_id, "crashed", "fp")
+    response, replayed = await IdempotencyStore(session_factory).run(user_id, "crashed", "fp", produce)
+    assert (response.body, replayed) == ({"n": 1}, False)
+
+
+# --- UserRepository.search: keyset-курсор и поиск ---
+NAMES = [
+    "Anna Ivanova", "Anna Ivanova", "Boris Petrov", "Chen Kim", "Daria Novak", "Emil Rossi",
+    "Fatima Haddad", "Georg Müller", "Hana Tanaka", "Иван Петров", "Ирина Смирнова",
+]
+
+
+async def test_keyset_pages_cover_every_user_once_in_order(session_factory):
+    ids = await _add_users(session_factory, *NAMES)
+    seen, cursor = [], None
+    async with session_factory() as session:
+        repository = UserRepository(session)
+        while True:
+            users, cursor = await repository.search(limit=3, after=cursor)
+            assert len(users) <= 3
+            seen.extend(users)
+            if cursor is None:
+                break
+            assert cursor == (users[-1].full_name, users[-1].id)
+
+    assert sorted(user.id for user in seen) == sorted(ids)
+    keys = [(user.full_name, user.id) for user in seen]
+    assert keys == sorted(keys)
+
+
+async def test_search_is_case_insensitive_for_cyrillic(session_factory):
+    await _add_users(session_factory, *NAMES)
+    async with session_factory() as session:
+        repository = UserRepository(session)
+        users, _ = await repository.search(limit=10, query="иван")
+        assert [user.full_name for user in users] == ["Иван Петров"]
+        users, _ = await repository.search(limit=10, query="ИРИ")
+        assert [user.full_name for user in users] == ["Ирина Смирнова"]
+        users, _ = await repository.search(limit=10, query="anna")
+        assert [user.full_name for user in users] == ["Anna Ivanova", "Anna Ivanova"]
+
+
+async def test_search_filters_combine_with_cursor(session_factory):
+    ids = await _add_users(session_factory, *NAMES)
+    async with session_factory() as session:
+        users, cursor = await UserRepository(session).search(limit=1, query="anna")
+        assert cursor is not None
+        rest, cursor = await UserRepository(session).search(limit=1, query="anna", after=cursor)
+    assert cursor is None
+    assert {users[0].id, rest[0].id} == set(ids[:2])